@@ -8,12 +8,50 @@ class Settings(BaseSettings):
     api_port: int = 8000
     cache_ttl_seconds: int = 7 * 24 * 3600  # 7 days
     cache_404_ttl_seconds: int = 24 * 3600  # 24 hours
+    # verify: entries past their soft TTL are served stale and refreshed in the background
+    cache_soft_ttl_seconds: int = 24 * 3600
+    cache_404_soft_ttl_seconds: int = 6 * 3600
+    cache_soft_ttl_jitter: float = 0.2
+    l1_cache_max_bytes: int = 64 * 1024 * 1024  # per worker
+    l1_cache_ttl_seconds: int = 300
+    cache_compression: str = "zlib"  # zlib | zstd (needs zstandard)
+    cache_compress_min_bytes: int = 1024
     free_tier_monthly_limit: int = 100
+    api_key_cache_ttl_seconds: int = 300  # changes are also pushed via NOTIFY
+    api_key_last_used_flush_seconds: float = 10.0
+    usage_flush_interval_ms: int = 500
+    usage_flush_rows: int = 1000  # flush early once this many rows are buffered
+    usage_buffer_max_rows: int = 100_000
+    usage_overflow: str = "drop"  # drop | spill (to usage_spill_path)
+    usage_spill_path: str = "data/usage_spill.jsonl"
+    usage_retention_months: int = 13  # raw api_usage rows; rollups are kept
+    usage_partitions_ahead: int = 2
+    job_workers: int = 2  # job queue consumers per API process; 0 = dedicated workers only
+    job_chunk_size: int = 500  # EINs per queue entry and result page
+    job_worker_concurrency: int = 10  # cache misses verified at once per chunk
+    job_claim_idle_seconds: int = 300  # retry chunks unacked this long
+    job_max_deliveries: int = 5  # then the chunk's EINs fail and it goes to jobs:dead
+    job_result_ttl_seconds: int = 7 * 24 * 3600
+    job_stream_maxlen: int = 100_000
     stripe_secret_key: str = ""
     stripe_webhook_secret: str = ""
     stripe_pro_price_id: str = ""
     stripe_enterprise_price_id: str = ""
     base_url: str = "http://localhost:8000"
+    filing_index_path: str = ""  # empty = stream IRS index CSVs per lookup
+    zip_catalog_path: str = ""  # empty = read each archive's central directory per lookup
+    parser_executor: str = "thread"  # thread | process | inline
+    parser_workers: int = 4
+    parser_max_pending: int = 64
+    http_2: bool = False  # needs the h2 package
+    http_max_connections: int = 20  # per upstream host
+    http_keepalive_seconds: float = 30.0
+    propublica_timeout: float = 10.0
+    irs_timeout: float = 30.0
+    state_registry_timeout: float = 15.0
+    singleflight_lease_seconds: int = 30  # max wait on another worker's lookup
+    filing_store: bool = False  # read 990 data from the bulk-ingested filings tables
+    ingest_work_dir: str = "data/ingest"
 
     model_config = {"env_file": ".env"}
 
@@ -1,24 +1,72 @@
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 
+from app.config import settings
 from app.database import close_pool, get_pool
+from app.middleware.auth import listen_for_key_changes, run_last_used_flusher
+from app.middleware.rate_limit import load_scripts
 from app.routes.billing import router as billing_router
+from app.routes.bulk_csv import router as bulk_csv_router
+from app.routes.jobs import router as jobs_router
 from app.routes.public import router as public_router
+from app.routes.usage import router as usage_router
 from app.routes.verify import router as verify_router
-from app.utils.cache import close_redis, get_redis
+from app.services import filing_index, jobs, usage, zip_catalog
+from app.utils.cache import close_redis, get_redis, l1_stats, listen_for_invalidations
+from app.utils.executor import parser_stats, shutdown_executor
+from app.utils.http import close_clients
 
 STATIC_DIR = Path(__file__).parent / "static"
 
+# How often workers check whether a refresh job replaced the local indexes
+INDEX_RELOAD_SECONDS = 60
+
+
+async def _watch_local_indexes():
+    """Remap the filing index and ZIP catalog after they are rewritten on disk."""
+    while True:
+        await asyncio.sleep(INDEX_RELOAD_SECONDS)
+        filing_index.reload_if_changed()
+        zip_catalog.reload_if_changed()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await get_pool()
     await get_redis()
+    await load_scripts()
+    filing_index.open_index()
+    zip_catalog.open_catalog()
+    cache_invalidations = asyncio.create_task(listen_for_invalidations())
+    key_changes = asyncio.create_task(listen_for_key_changes())
+    last_used_flusher = asyncio.create_task(run_last_used_flusher())
+    usage_recorder = asyncio.create_task(usage.run_usage_recorder())
+    job_workers = [
+        asyncio.create_task(jobs.run_worker(jobs.consumer_name(i))) for i in range(settings.job_workers)
+    ]
+    index_watcher = None
+    if settings.filing_index_path or settings.zip_catalog_path:
+        index_watcher = asyncio.create_task(_watch_local_indexes())
     yield
+    cache_invalidations.cancel()
+    key_changes.cancel()
+    for worker in job_workers:
+        worker.cancel()
+    last_used_flusher.cancel()
+    usage_recorder.cancel()
+    # Let them write what's still buffered before the pool closes
+    await asyncio.gather(last_used_flusher, usage_recorder, *job_workers, return_exceptions=True)
+    if index_watcher:
+        index_watcher.cancel()
+    filing_index.close_index()
+    zip_catalog.close_catalog()
+    await close_clients()
+    shutdown_executor()
     await close_pool()
     await close_redis()
 
@@ -39,7 +87,10 @@ app.add_middleware(
 
 app.include_router(public_router, prefix="/api/v1", tags=["Public"])
 app.include_router(verify_router, prefix="/api/v1", tags=["Verify"])
+app.include_router(bulk_csv_router, prefix="/api/v1", tags=["Verify"])
 app.include_router(billing_router, prefix="/api/v1", tags=["Billing"])
+app.include_router(jobs_router, prefix="/api/v1", tags=["Jobs"])
+app.include_router(usage_router, prefix="/api/v1", tags=["Usage"])
 
 
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
@@ -66,4 +117,12 @@ async def success_page():
 
 @app.get("/health", tags=["System"])
 async def health():
-    return {"status": "ok"}
+    # Not ready until the configured filing index is mapped
+    if settings.filing_index_path and not filing_index.is_ready():
+        return JSONResponse(status_code=503, content={"status": "starting", "filing_index": False})
+    return {
+        "status": "ok",
+        "parser_pool": parser_stats(),
+        "l1_cache": l1_stats(),
+        "usage_buffer": usage.usage_stats(),
+    }
@@ -1,9 +1,37 @@
+"""API key authentication.
+
+Key metadata is cached per worker for API_KEY_CACHE_TTL_SECONDS, so a
+request normally costs no Postgres round trip. A trigger on api_keys
+(migrations/004_api_key_notify.sql) NOTIFYs on every change that matters
+here; listen_for_key_changes() evicts the key at once, so a deactivation
+or plan change takes effect immediately rather than after the TTL.
+
+last_used_at is recorded in memory and written by flush_last_used() in one
+UPDATE ... FROM (VALUES ...) per API_KEY_LAST_USED_FLUSH_SECONDS.
+"""
+
+import asyncio
 import hashlib
+import logging
+import time
+from datetime import datetime, timezone
 
+import asyncpg
 from fastapi import HTTPException, Header
 
+from app.config import settings
 from app.database import get_pool
 
+logger = logging.getLogger(__name__)
+
+KEY_CHANGES_CHANNEL = "api_keys_changed"
+MAX_CACHED_KEYS = 10_000
+
+# key_hash → (key metadata, expires_at)
+_keys: dict[str, tuple[dict, float]] = {}
+# api_keys.id → last time it was used, not yet written
+_last_used: dict[object, datetime] = {}
+
 
 async def verify_api_key(
     x_api_key: str | None = Header(default=None, description="API key for authentication"),
@@ -12,27 +40,112 @@ async def verify_api_key(
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing API key. Pass it via the X-Api-Key header.")
     key_hash = hashlib.sha256(x_api_key.encode()).hexdigest()
-    pool = await get_pool()
 
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT id, name, plan, monthly_limit, is_active FROM api_keys WHERE key_hash = $1",
-            key_hash,
-        )
+    row = _cached_key(key_hash)
+    if row is None:
+        pool = await get_pool()
+        async with pool.acquire() as conn:
+            record = await conn.fetchrow(
+                "SELECT id, name, plan, monthly_limit, is_active FROM api_keys WHERE key_hash = $1",
+                key_hash,
+            )
+        if not record:
+            raise HTTPException(status_code=401, detail="Invalid API key")
+        row = dict(record)
+        _cache_key(key_hash, row)
 
-    if not row:
-        raise HTTPException(status_code=401, detail="Invalid API key")
     if not row["is_active"]:
         raise HTTPException(status_code=403, detail="API key is deactivated")
 
-    # Fire-and-forget: update last_used_at
+    _last_used[row["id"]] = datetime.now(timezone.utc)
+    return dict(row)
+
+
+def _cached_key(key_hash: str) -> dict | None:
+    entry = _keys.get(key_hash)
+    if entry is None:
+        return None
+    row, expires_at = entry
+    if expires_at < time.monotonic():
+        del _keys[key_hash]
+        return None
+    return row
+
+
+def _cache_key(key_hash: str, row: dict):
+    if len(_keys) >= MAX_CACHED_KEYS:
+        # Oldest entry first
+        del _keys[next(iter(_keys))]
+    _keys[key_hash] = (row, time.monotonic() + settings.api_key_cache_ttl_seconds)
+
+
+def evict_key(key_hash: str):
+    _keys.pop(key_hash, None)
+
+
+async def flush_last_used():
+    """Write pending last_used_at times in a single UPDATE.
+
+    The ids and times go in as two array parameters, so the statement has
+    two bind parameters however many keys were used.
+    """
+    if not _last_used:
+        return
+    pending = list(_last_used.items())
+    _last_used.clear()
     try:
+        pool = await get_pool()
         async with pool.acquire() as conn:
             await conn.execute(
-                "UPDATE api_keys SET last_used_at = NOW() WHERE id = $1",
-                row["id"],
+                """UPDATE api_keys AS k SET last_used_at = v.used_at
+                   FROM unnest($1::uuid[], $2::timestamptz[]) AS v(id, used_at)
+                   WHERE k.id = v.id""",
+                [key_id for key_id, _ in pending],
+                [used_at for _, used_at in pending],
             )
-    except Exception:
-        pass
+    except Exception as e:
+        logger.warning("Failed to record last_used_at for %d keys: %s", len(pending), e)
+        # Retry next time, unless the key has been used again since
+        for key_id, used_at in pending:
+            _last_used.setdefault(key_id, used_at)
 
-    return dict(row)
+
+async def run_last_used_flusher():
+    """Flush last_used_at periodically. Runs for the app's lifetime; flushes once more on cancel."""
+    try:
+        while True:
+            await asyncio.sleep(settings.api_key_last_used_flush_seconds)
+            await flush_last_used()
+    finally:
+        await flush_last_used()
+
+
+def _on_key_change(connection, pid, channel, payload):
+    evict_key(payload)
+
+
+async def listen_for_key_changes():
+    """Evict cached keys as api_keys rows change. Runs for the app's lifetime.
+
+    Holds its own connection, outside the pool, for LISTEN. Whenever the
+    subscription is (re)established the whole cache is cleared, since
+    changes made while not listening were missed.
+    """
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(settings.database_url)
+            lost = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(lambda _: lost.done() or lost.set_result(None))
+            await conn.add_listener(KEY_CHANGES_CHANNEL, _on_key_change)
+            _keys.clear()
+            await lost
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("API key change subscription lost: %s", e)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        _keys.clear()
+        await asyncio.sleep(1)
@@ -1,51 +1,126 @@
-from datetime import datetime, timezone
+"""Quota counters in Redis.
+
+Every check is one EVALSHA of _CONSUME_SCRIPT, which increments the
+counter, gives it a TTL if it has none and, where asked, refunds a
+rejected request, atomically. A crash can't leave a counter without a
+TTL, and the result carries everything needed for the X-RateLimit-*
+headers (see rate_limit_headers()).
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
 
 from fastapi import HTTPException
 
 from app.utils.cache import get_redis
 
+logger = logging.getLogger(__name__)
+
+MONTHLY_TTL_SECONDS = 35 * 24 * 3600  # counters auto-clean after the month
+
+# KEYS[1] counter; ARGV: cost, limit, ttl, refund rejected (0/1).
+# Returns the count after this request (before any refund).
+_CONSUME_LUA = """
+local cost = tonumber(ARGV[1])
+local count = redis.call("INCRBY", KEYS[1], cost)
+if redis.call("TTL", KEYS[1]) < 0 then
+    redis.call("EXPIRE", KEYS[1], ARGV[3])
+end
+if count > tonumber(ARGV[2]) and ARGV[4] == "1" then
+    redis.call("DECRBY", KEYS[1], cost)
+end
+return count
+"""
+
+_consume_script = None
+
+
+async def _consume():
+    global _consume_script
+    if _consume_script is None:
+        r = await get_redis()
+        _consume_script = r.register_script(_CONSUME_LUA)
+    return _consume_script
+
+
+async def load_scripts():
+    """Load the scripts into Redis at startup, so the first EVALSHA doesn't miss.
+
+    Not fatal: a missing script is loaded on first use anyway.
+    """
+    try:
+        script = await _consume()
+        r = await get_redis()
+        await r.script_load(script.script)
+    except Exception as e:
+        logger.warning("Failed to preload rate limit scripts: %s", e)
+
 
-async def check_rate_limit(api_key_info: dict) -> int:
-    """Check monthly rate limit for an API key. Returns current count."""
-    r = await get_redis()
-    period = datetime.now(timezone.utc).strftime("%Y-%m")
-    key = f"ratelimit:{api_key_info['id']}:{period}"
+async def consume_quota(key: str, cost: int, limit: int, ttl: int, reset: datetime, *, refund_rejected: bool) -> dict:
+    """Count cost units against key's limit in one round trip.
 
-    count = await r.incr(key)
-    if count == 1:
-        # Expire after ~35 days so counters auto-clean
-        await r.expire(key, 35 * 24 * 3600)
+    Returns {"limit", "remaining", "reset" (epoch seconds), "count", "allowed"}.
+    With refund_rejected, a request that would exceed the limit isn't counted.
+    """
+    script = await _consume()
+    count = await script(keys=[key], args=[cost, limit, ttl, int(refund_rejected)])
+    allowed = count <= limit
+    used = count - cost if refund_rejected and not allowed else count
+    return {
+        "limit": limit,
+        "remaining": max(limit - used, 0),
+        "reset": int(reset.timestamp()),
+        "count": count,
+        "allowed": allowed,
+    }
 
-    limit = api_key_info["monthly_limit"]
-    if count > limit:
+
+def rate_limit_headers(quota: dict) -> dict[str, str]:
+    return {
+        "X-RateLimit-Limit": str(quota["limit"]),
+        "X-RateLimit-Remaining": str(quota["remaining"]),
+        "X-RateLimit-Reset": str(quota["reset"]),
+    }
+
+
+def _next_month(now: datetime) -> datetime:
+    first = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return (first + timedelta(days=32)).replace(day=1)
+
+
+async def _check_monthly(api_key_info: dict, count: int, refund_rejected: bool) -> dict:
+    now = datetime.now(timezone.utc)
+    key = f"ratelimit:{api_key_info['id']}:{now:%Y-%m}"
+    return await consume_quota(
+        key, count, api_key_info["monthly_limit"], MONTHLY_TTL_SECONDS, _next_month(now),
+        refund_rejected=refund_rejected,
+    )
+
+
+async def check_rate_limit(api_key_info: dict) -> dict:
+    """Check monthly rate limit for an API key. Returns the quota (see consume_quota)."""
+    quota = await _check_monthly(api_key_info, 1, refund_rejected=False)
+    if not quota["allowed"]:
+        limit = quota["limit"]
         raise HTTPException(
             status_code=429,
             detail=f"Monthly rate limit exceeded ({limit} requests/month). Upgrade your plan for higher limits.",
-            headers={"Retry-After": "86400"},
+            headers={"Retry-After": "86400", **rate_limit_headers(quota)},
         )
-
-    return count
+    return quota
 
 
-async def check_rate_limit_batch(api_key_info: dict, count: int) -> int:
-    """Check monthly rate limit for a batch request. Increments by count. Returns new total."""
-    r = await get_redis()
-    period = datetime.now(timezone.utc).strftime("%Y-%m")
-    key = f"ratelimit:{api_key_info['id']}:{period}"
+async def check_rate_limit_batch(api_key_info: dict, count: int) -> dict:
+    """Check monthly rate limit for a batch request. Increments by count. Returns the quota.
 
-    new_total = await r.incrby(key, count)
-    if new_total == count:
-        # First increment this month — set expiry
-        await r.expire(key, 35 * 24 * 3600)
-
-    limit = api_key_info["monthly_limit"]
-    if new_total > limit:
-        # Roll back the increment so the caller can retry later
-        await r.decrby(key, count)
+    A rejected batch isn't counted, so the caller can retry later.
+    """
+    quota = await _check_monthly(api_key_info, count, refund_rejected=True)
+    if not quota["allowed"]:
+        limit = quota["limit"]
         raise HTTPException(
             status_code=429,
             detail=f"Monthly rate limit exceeded ({limit} requests/month). This batch of {count} would exceed your limit. Upgrade your plan for higher limits.",
-            headers={"Retry-After": "86400"},
+            headers={"Retry-After": "86400", **rate_limit_headers(quota)},
         )
-
-    return new_total
+    return quota
@@ -1,3 +1,5 @@
+from datetime import date
+
 from pydantic import BaseModel, Field
 
 
@@ -93,3 +95,59 @@ class BatchVerifyResponse(BaseModel):
 
 class ErrorResponse(BaseModel):
     detail: str
+
+
+class LatencySummary(BaseModel):
+    avg: float | None = None
+    p50: float | None = None
+    p95: float | None = None
+    p99: float | None = None
+
+
+class UsageStats(BaseModel):
+    requests: int
+    cache_hits: int
+    cache_hit_ratio: float | None = None
+    not_found: int
+    not_found_rate: float | None = None
+    latency_ms: LatencySummary
+
+
+class UsagePeriod(UsageStats):
+    period: date
+
+
+class UsageReport(BaseModel):
+    granularity: str
+    start: date
+    end: date
+    endpoint: str | None = None
+    periods: list[UsagePeriod]
+    total: UsageStats
+
+
+class JobRequest(BaseModel):
+    eins: list[str] = Field(min_length=1)
+    callback_url: str | None = None
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | complete
+    total: int
+    processed: int
+    succeeded: int
+    failed: int
+    pages: int
+    pages_ready: int
+    created_at: int
+    completed_at: int | None = None
+    callback_url: str | None = None
+    callback_secret: str | None = None  # only in the POST /jobs response
+
+
+class JobResultsPage(BaseModel):
+    job_id: str
+    cursor: str
+    next_cursor: str | None = None
+    results: list[BatchVerifyResult]
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+from tempfile import SpooledTemporaryFile
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from app.middleware.auth import verify_api_key
+from app.middleware.rate_limit import check_rate_limit_batch
+from app.models.schemas import ErrorResponse
+from app.routes.verify import MAX_BATCH_SIZE
+from app.services import usage
+from app.services.verification import cached_verify_many, verify_coalesced
+from app.utils.csv_stream import csv_line, csv_records
+from app.utils.ein import ein_to_digits, validate_ein
+
+MAX_CSV_EINS = 10_000
+MAX_CSV_BYTES = 50 * 1024 * 1024
+SPOOL_MEMORY_BYTES = 1024 * 1024  # larger uploads spool to a temp file
+READ_CHUNK_BYTES = 64 * 1024
+
+# Appended to the uploaded columns; nested fields flattened
+ENRICHED_COLUMNS = (
+    "npv_ein", "npv_legal_name", "npv_status", "npv_subsection", "npv_ruling_date", "npv_revoked",
+    "npv_ntee_code", "npv_city", "npv_state", "npv_tax_year", "npv_revenue", "npv_expenses",
+    "npv_assets", "npv_liabilities", "npv_propublica_url", "npv_error",
+)
+
+router = APIRouter()
+
+
+def _enriched(data: dict | None, ein: str | None, error: str | None) -> list:
+    if data is None:
+        return [ein] + [None] * (len(ENRICHED_COLUMNS) - 2) + [error]
+    financials = data.get("financials") or {}
+    return [
+        data["ein"], data.get("legal_name"), data.get("status"), data.get("subsection"),
+        data.get("ruling_date"), data.get("revoked"), data.get("ntee_code"), data.get("city"),
+        data.get("state"), financials.get("tax_year"), financials.get("revenue"),
+        financials.get("expenses"), financials.get("assets"), financials.get("liabilities"),
+        data.get("propublica_url"), None,
+    ]
+
+
+@router.post(
+    "/verify/csv",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/csv": {}}, "description": "The uploaded rows with npv_* columns appended"},
+        400: {"model": ErrorResponse, "description": "Missing EIN column or empty file"},
+        401: {"model": ErrorResponse, "description": "Invalid API key"},
+        413: {"model": ErrorResponse, "description": "Upload too large"},
+    },
+    summary="Verify a CSV of EINs",
+    description=(
+        f"Send a CSV file as the request body (Content-Type: text/csv) and name its EIN column. "
+        f"Returns a CSV with each row's original columns plus verification columns (npv_*), written "
+        f"as rows resolve, so output order can differ from input order. Each EIN is verified once: "
+        f"rows repeating an EIN get the same columns. Up to {MAX_CSV_EINS:,} unique EINs and "
+        f"{MAX_CSV_BYTES // (1024 * 1024)} MB; each EIN counts against your quota. Invalid EINs come back with npv_error set."
+    ),
+)
+async def verify_csv(
+    request: Request,
+    ein_column: str = Query(default="ein", description="Header of the column holding EINs (case-insensitive)"),
+    api_key_info: dict = Depends(verify_api_key),
+):
+    upload = await _spool_upload(request)
+    try:
+        records = csv_records(_chunks(upload))
+        header = await anext(records, None)
+        if not header:
+            raise HTTPException(status_code=400, detail="Empty CSV upload.")
+        columns = [name.strip().lower() for name in header]
+        if ein_column.strip().lower() not in columns:
+            raise HTTPException(status_code=400, detail=f"No '{ein_column}' column in the CSV header.")
+        ein_index = columns.index(ein_column.strip().lower())
+    except BaseException:
+        await upload.close()
+        raise
+
+    return StreamingResponse(
+        _enrich(records, header, ein_index, api_key_info),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="verified.csv"'},
+        background=BackgroundTask(upload.close),
+    )
+
+
+async def _spool_upload(request: Request) -> UploadFile:
+    """Read the whole request body before the response starts.
+
+    Under ASGI < 2.4 StreamingResponse calls receive() to watch for a
+    disconnect while it sends, which would swallow body messages still
+    arriving; so the upload can't be read while the output streams.
+    """
+    upload = UploadFile(SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES), size=0)
+    try:
+        async for chunk in request.stream():
+            if upload.size + len(chunk) > MAX_CSV_BYTES:
+                raise HTTPException(
+                    status_code=413, detail=f"CSV uploads are limited to {MAX_CSV_BYTES // (1024 * 1024)} MB."
+                )
+            await upload.write(chunk)
+        await upload.seek(0)
+    except BaseException:
+        await upload.close()
+        raise
+    return upload
+
+
+async def _chunks(upload: UploadFile):
+    while chunk := await upload.read(READ_CHUNK_BYTES):
+        yield chunk
+
+
+async def _enrich(records, header: list[str], ein_index: int, api_key_info: dict):
+    """Yield the output CSV, resolving unique EINs in windows of MAX_BATCH_SIZE.
+
+    Rows repeating an EIN get its columns without verifying it again: at
+    once if it has resolved, otherwise alongside the first row.
+    """
+    yield csv_line(header + list(ENRICHED_COLUMNS))
+    resolved: dict[str, list] = {}  # digits -> enriched columns, at most MAX_CSV_EINS
+    waiting: dict[str, list[list[str]]] = {}  # digits -> rows for EINs in the window
+    window: list[str] = []
+    async for row in records:
+        raw = row[ein_index] if ein_index < len(row) else ""
+        normalized = validate_ein(raw)
+        if not normalized:
+            yield csv_line(row + _enriched(None, raw, f"Invalid EIN format: '{raw}'"))
+            continue
+        digits = ein_to_digits(normalized)
+        if digits in resolved:
+            yield csv_line(row + resolved[digits])
+            continue
+        if digits in waiting:
+            waiting[digits].append(row)
+            continue
+        if len(resolved) + len(waiting) >= MAX_CSV_EINS:
+            error = f"More than {MAX_CSV_EINS} EINs; use /api/v1/jobs for larger lists"
+            yield csv_line(row + _enriched(None, normalized, error))
+            continue
+        waiting[digits] = [row]
+        window.append(normalized)
+        if len(window) == MAX_BATCH_SIZE:
+            async for line in _flush_window(window, waiting, resolved, api_key_info):
+                yield line
+            window = []
+    if window:
+        async for line in _flush_window(window, waiting, resolved, api_key_info):
+            yield line
+
+
+async def _flush_window(window: list[str], waiting: dict, resolved: dict, api_key_info: dict):
+    """Write every waiting row of each EIN in window as it resolves."""
+    async for normalized, columns in _resolve_window(window, api_key_info):
+        digits = ein_to_digits(normalized)
+        resolved[digits] = columns
+        for row in waiting.pop(digits):
+            yield csv_line(row + columns)
+
+
+async def _resolve_window(window: list[str], api_key_info: dict):
+    """Yield (EIN, enriched columns) for each EIN in window as it resolves."""
+    try:
+        await check_rate_limit_batch(api_key_info, len(window))
+    except HTTPException as e:
+        for normalized in window:
+            yield normalized, _enriched(None, normalized, e.detail)
+        return
+
+    try:
+        cached = await cached_verify_many(window)
+    except Exception:
+        cached = {}
+    start = time.time()
+
+    async def resolve(normalized: str) -> tuple[str, list]:
+        try:
+            document = cached.get(normalized) or await verify_coalesced(normalized)
+            if document.not_found:
+                data, error = None, f"No nonprofit found with EIN {normalized}"
+            else:
+                data, error = json.loads(document.body), None
+        except Exception as e:
+            data, error = None, str(e)
+        elapsed_ms = int((time.time() - start) * 1000)
+        usage.record(
+            api_key_info["id"], "csv", normalized, 200 if data is not None else 404, elapsed_ms,
+            normalized in cached,
+        )
+        return normalized, _enriched(data, normalized, error)
+
+    tasks = [asyncio.create_task(resolve(normalized)) for normalized in window]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,108 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.middleware.auth import verify_api_key
+from app.middleware.rate_limit import check_rate_limit_batch, rate_limit_headers
+from app.models.schemas import ErrorResponse, JobRequest, JobResultsPage, JobStatus
+from app.services.jobs import MAX_JOB_EINS, check_callback_url, create_job, job_status, result_page
+from app.utils.ein import ein_to_digits, validate_ein
+from app.utils.serialize import json_response
+
+router = APIRouter()
+
+
+async def _owned_job(job_id: str, api_key_info: dict) -> dict:
+    status = await job_status(job_id)
+    if status is None or status.pop("api_key_id") != str(api_key_info["id"]):
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return status
+
+
+@router.post(
+    "/jobs",
+    status_code=202,
+    response_model=JobStatus,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid EIN, callback URL or job too large"},
+        401: {"model": ErrorResponse, "description": "Invalid API key"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+    },
+    summary="Start a bulk verification job",
+    description=f"Queues up to {MAX_JOB_EINS:,} EINs for background verification. Duplicates are verified once; each unique EIN counts against your quota. Poll the job for progress, or pass a callback_url (resolving to a public address) to be notified when it completes. The callback body is signed with the returned callback_secret: X-NPV-Signature is `t=<unix time>,v1=<hex HMAC-SHA256 of \"<t>.<body>\">`.",
+)
+async def start_job(
+    request: JobRequest,
+    api_key_info: dict = Depends(verify_api_key),
+):
+    if len(request.eins) > MAX_JOB_EINS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job size {len(request.eins)} exceeds maximum of {MAX_JOB_EINS} EINs.",
+        )
+    if request.callback_url:
+        problem = await check_callback_url(request.callback_url)
+        if problem:
+            raise HTTPException(status_code=400, detail=problem)
+
+    # Validate and deduplicate by digits, keeping first-seen order
+    unique_eins: dict[str, str] = {}
+    for ein in request.eins:
+        normalized = validate_ein(ein)
+        if not normalized:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid EIN format: '{ein}'. Expected XX-XXXXXXX or XXXXXXXXX.",
+            )
+        unique_eins.setdefault(ein_to_digits(normalized), normalized)
+
+    quota = await check_rate_limit_batch(api_key_info, len(unique_eins))
+
+    status = await create_job(api_key_info["id"], list(unique_eins.values()), request.callback_url)
+    status.pop("api_key_id")
+    return json_response(
+        JobStatus(**status).model_dump_json().encode(), status_code=202, headers=rate_limit_headers(quota)
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=JobStatus,
+    responses={404: {"model": ErrorResponse, "description": "No such job"}},
+    summary="Get a job's progress",
+)
+async def get_job(job_id: str, api_key_info: dict = Depends(verify_api_key)):
+    return await _owned_job(job_id, api_key_info)
+
+
+@router.get(
+    "/jobs/{job_id}/results",
+    response_model=JobResultsPage,
+    responses={
+        202: {"description": "This page isn't finished yet; retry after Retry-After seconds"},
+        404: {"model": ErrorResponse, "description": "No such job or page"},
+    },
+    summary="Page through a job's results",
+    description="Results come in input order (first occurrence of each EIN), one page per request. Start without a cursor and follow next_cursor until it is null.",
+)
+async def get_job_results(
+    job_id: str,
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+    api_key_info: dict = Depends(verify_api_key),
+):
+    status = await _owned_job(job_id, api_key_info)
+    if cursor is None:
+        page = 0
+    else:
+        page = int(cursor) if cursor.isdigit() else -1
+    if not 0 <= page < status["pages"]:
+        raise HTTPException(status_code=404, detail=f"No results page {cursor!r} for job {job_id}")
+
+    body = await result_page(job_id, page)
+    if body is None:
+        return json_response(
+            b'{"detail":"Results page not ready yet"}', status_code=202, headers={"Retry-After": "5"}
+        )
+    next_cursor = b'"%d"' % (page + 1) if page + 1 < status["pages"] else b"null"
+    return json_response(
+        b'{"job_id":"%s","cursor":"%d","next_cursor":%s,"results":[%s]}'
+        % (job_id.encode(), page, next_cursor, body)
+    )
@@ -1,34 +1,32 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, HTTPException, Request
 
-from app.config import settings
+from app.middleware.rate_limit import consume_quota, rate_limit_headers
 from app.models.schemas import VerifyResponse
-from app.services.enricher import verify_organization
-from app.utils.cache import cache_get, cache_set, get_redis
-from app.utils.ein import ein_to_digits, validate_ein
+from app.services.verification import cached_verify, verify_coalesced
+from app.utils.ein import validate_ein
+from app.utils.serialize import json_response
 
 DAILY_LIMIT = 20
 
 router = APIRouter()
 
 
-async def _check_ip_rate_limit(ip: str):
+async def _check_ip_rate_limit(ip: str) -> dict:
     """Simple daily rate limit by IP address for public lookups."""
-    r = await get_redis()
-    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    key = f"public_ratelimit:{ip}:{day}"
+    now = datetime.now(timezone.utc)
+    key = f"public_ratelimit:{ip}:{now:%Y-%m-%d}"
+    tomorrow = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
 
-    count = await r.incr(key)
-    if count == 1:
-        await r.expire(key, 48 * 3600)
-
-    if count > DAILY_LIMIT:
+    quota = await consume_quota(key, 1, DAILY_LIMIT, 48 * 3600, tomorrow, refund_rejected=False)
+    if not quota["allowed"]:
         raise HTTPException(
             status_code=429,
             detail=f"Daily lookup limit exceeded ({DAILY_LIMIT}/day). Get a free API key for more.",
-            headers={"Retry-After": "3600"},
+            headers={"Retry-After": "3600", **rate_limit_headers(quota)},
         )
+    return quota
 
 
 @router.get(
@@ -43,7 +41,7 @@ async def public_verify(ein: str, request: Request):
     if "," in client_ip:
         client_ip = client_ip.split(",")[0].strip()
 
-    await _check_ip_rate_limit(client_ip)
+    quota = await _check_ip_rate_limit(client_ip)
 
     normalized = validate_ein(ein)
     if not normalized:
@@ -52,17 +50,13 @@ async def public_verify(ein: str, request: Request):
             detail=f"Invalid EIN format: '{ein}'. Expected XX-XXXXXXX or XXXXXXXXX.",
         )
 
-    cache_key = f"verify:{ein_to_digits(normalized)}"
-    cached = await cache_get(cache_key)
-    if cached is not None:
-        if cached.get("_not_found"):
-            raise HTTPException(status_code=404, detail=f"No nonprofit found with EIN {normalized}")
-        return cached
-
-    result = await verify_organization(normalized)
-    if result is None:
-        await cache_set(cache_key, {"_not_found": True}, settings.cache_404_ttl_seconds)
-        raise HTTPException(status_code=404, detail=f"No nonprofit found with EIN {normalized}")
-
-    await cache_set(cache_key, result.model_dump(), settings.cache_ttl_seconds)
-    return result
+    document = await cached_verify(normalized)
+    if document is None:
+        document = await verify_coalesced(normalized)
+    if document.not_found:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No nonprofit found with EIN {normalized}",
+            headers=rate_limit_headers(quota),
+        )
+    return json_response(document.body, headers=rate_limit_headers(quota))
@@ -0,0 +1,70 @@
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.database import get_pool
+from app.middleware.auth import verify_api_key
+from app.models.schemas import ErrorResponse, UsageReport
+from app.services.usage import usage_report
+
+MAX_DAYS = 366
+MAX_MONTHS = 36
+
+router = APIRouter()
+
+_RESPONSES = {
+    400: {"model": ErrorResponse, "description": "Invalid date range"},
+    401: {"model": ErrorResponse, "description": "Invalid API key"},
+}
+
+
+def _range(start: date | None, end: date | None, default_days: int, max_days: int) -> tuple[date, date]:
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=default_days - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end.")
+    if (end - start).days >= max_days:
+        raise HTTPException(status_code=400, detail=f"Date range too long (max {max_days} days).")
+    return start, end
+
+
+async def _report(api_key_info: dict, granularity: str, start: date, end: date, endpoint: str | None) -> dict:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        return await usage_report(conn, api_key_info["id"], granularity, start, end, endpoint)
+
+
+@router.get(
+    "/usage/daily",
+    response_model=UsageReport,
+    responses=_RESPONSES,
+    summary="Daily usage for your API key",
+    description="Request counts, cache-hit ratio, 404 rate and latency percentiles per UTC day (default: the last 30 days). Does not count against your quota.",
+)
+async def usage_daily(
+    start: date | None = Query(default=None, description="First day (YYYY-MM-DD)"),
+    end: date | None = Query(default=None, description="Last day, inclusive (default: today)"),
+    endpoint: str | None = Query(default=None, description="Only this endpoint (verify, batch)"),
+    api_key_info: dict = Depends(verify_api_key),
+):
+    start, end = _range(start, end, 30, MAX_DAYS)
+    return await _report(api_key_info, "day", start, end, endpoint)
+
+
+@router.get(
+    "/usage/monthly",
+    response_model=UsageReport,
+    responses=_RESPONSES,
+    summary="Monthly usage for your API key",
+    description="The same figures per UTC month (default: the last 12 months). Does not count against your quota.",
+)
+async def usage_monthly(
+    start: date | None = Query(default=None, description="Any day in the first month"),
+    end: date | None = Query(default=None, description="Any day in the last month (default: today)"),
+    endpoint: str | None = Query(default=None, description="Only this endpoint (verify, batch)"),
+    api_key_info: dict = Depends(verify_api_key),
+):
+    end = end or datetime.now(timezone.utc).date()
+    start = start or (end.replace(day=1) - timedelta(days=335)).replace(day=1)
+    start, end = _range(start, end, 0, MAX_MONTHS * 31)
+    return await _report(api_key_info, "month", start, end, endpoint)
@@ -1,24 +1,27 @@
 import asyncio
 import time
+from collections import Counter
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
 
-from app.config import settings
-from app.database import get_pool
 from app.middleware.auth import verify_api_key
-from app.middleware.rate_limit import check_rate_limit, check_rate_limit_batch
+from app.middleware.rate_limit import check_rate_limit, check_rate_limit_batch, rate_limit_headers
 from app.models.schemas import (
     BatchVerifyRequest,
     BatchVerifyResponse,
-    BatchVerifyResult,
     ErrorResponse,
     VerifyResponse,
 )
-from app.services.enricher import verify_organization
-from app.utils.cache import cache_get, cache_set
+from app.services import usage
+from app.services.verification import cached_verify, cached_verify_many, verify_coalesced
+from app.utils.codec import Document
 from app.utils.ein import ein_to_digits, validate_ein
+from app.utils.serialize import batch_body, batch_result, json_response
 
 MAX_BATCH_SIZE = 50
+NDJSON = "application/x-ndjson"
 
 router = APIRouter()
 
@@ -50,33 +53,31 @@ async def verify_nonprofit(
         )
 
     # Rate limit check
-    await check_rate_limit(api_key_info)
+    headers = rate_limit_headers(await check_rate_limit(api_key_info))
 
     # Check cache
-    cache_key = f"verify:{ein_to_digits(normalized)}"
-    cached = await cache_get(cache_key)
+    cached = await cached_verify(normalized)
     if cached is not None:
         elapsed_ms = int((time.time() - start) * 1000)
-        await _record_usage(api_key_info, normalized, 200 if not cached.get("_not_found") else 404, elapsed_ms, True)
-        if cached.get("_not_found"):
-            raise HTTPException(status_code=404, detail=f"No nonprofit found with EIN {normalized}")
-        return cached
+        _record_usage(api_key_info, normalized, 404 if cached.not_found else 200, elapsed_ms, True)
+        if cached.not_found:
+            raise HTTPException(
+                status_code=404, detail=f"No nonprofit found with EIN {normalized}", headers=headers
+            )
+        return json_response(cached.body, headers=headers)
 
-    # Fetch fresh data from all sources
-    result = await verify_organization(normalized)
+    # Fetch fresh data from all sources, shared with concurrent lookups
+    document = await verify_coalesced(normalized)
     elapsed_ms = int((time.time() - start) * 1000)
 
-    if result is None:
-        await cache_set(cache_key, {"_not_found": True}, settings.cache_404_ttl_seconds)
-        await _record_usage(api_key_info, normalized, 404, elapsed_ms, False)
-        raise HTTPException(status_code=404, detail=f"No nonprofit found with EIN {normalized}")
-
-    # Cache and return
-    response_dict = result.model_dump()
-    await cache_set(cache_key, response_dict, settings.cache_ttl_seconds)
-    await _record_usage(api_key_info, normalized, 200, elapsed_ms, False)
+    if document.not_found:
+        _record_usage(api_key_info, normalized, 404, elapsed_ms, False)
+        raise HTTPException(
+            status_code=404, detail=f"No nonprofit found with EIN {normalized}", headers=headers
+        )
 
-    return result
+    _record_usage(api_key_info, normalized, 200, elapsed_ms, False)
+    return json_response(document.body, headers=headers)
 
 
 @router.post(
@@ -88,11 +89,12 @@ async def verify_nonprofit(
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
     },
     summary="Verify multiple nonprofit organizations by EIN",
-    description="Returns verification data for up to 50 EINs in a single request. Each EIN is processed independently; individual failures don't affect other results.",
+    description="Returns verification data for up to 50 EINs in a single request. Each EIN is processed independently; individual failures don't affect other results. With `Accept: application/x-ndjson` the response is streamed instead: one BatchVerifyResult per line as each EIN resolves (in completion order, one line per requested EIN), then a final line with the total, succeeded and failed counts.",
 )
 async def verify_batch(
     request: BatchVerifyRequest,
     api_key_info: dict = Depends(verify_api_key),
+    accept: Annotated[str | None, Header()] = None,
 ):
     # Validate batch size
     if len(request.eins) > MAX_BATCH_SIZE:
@@ -120,86 +122,105 @@ async def verify_batch(
             unique_eins[digits] = normalized
 
     # Rate limit check (costs 1 per unique EIN)
-    await check_rate_limit_batch(api_key_info, len(unique_eins))
+    quota = await check_rate_limit_batch(api_key_info, len(unique_eins))
 
-    # Process all unique EINs concurrently
-    async def _process_ein(normalized: str) -> tuple[str, VerifyResponse | None, str | None]:
-        """Returns (normalized_ein, data_or_none, error_or_none)."""
+    # Resolve every cached EIN in one round trip; only misses fan out
+    try:
+        cached_by_ein = await cached_verify_many(list(unique_eins.values()))
+    except Exception:
+        cached_by_ein = {}
+
+    # Process the misses concurrently
+    async def _process_ein(normalized: str) -> tuple[str, Document | None, str | None]:
+        """Returns (normalized_ein, document_or_none, error_or_none)."""
         try:
-            cache_key = f"verify:{ein_to_digits(normalized)}"
-            cached = await cache_get(cache_key)
-            if cached is not None:
-                if cached.get("_not_found"):
-                    return (normalized, None, f"No nonprofit found with EIN {normalized}")
-                return (normalized, VerifyResponse(**cached), None)
-
-            result = await verify_organization(normalized)
-            if result is None:
-                await cache_set(cache_key, {"_not_found": True}, settings.cache_404_ttl_seconds)
+            document = cached_by_ein.get(normalized)
+            if document is None:
+                document = await verify_coalesced(normalized)
+            if document.not_found:
                 return (normalized, None, f"No nonprofit found with EIN {normalized}")
-
-            await cache_set(cache_key, result.model_dump(), settings.cache_ttl_seconds)
-            return (normalized, result, None)
+            return (normalized, document, None)
         except Exception as e:
             return (normalized, None, str(e))
 
+    if accept and NDJSON in accept:
+        return StreamingResponse(
+            _stream_batch(request, normalized_map, unique_eins, _process_ein, api_key_info),
+            media_type=NDJSON,
+            headers=rate_limit_headers(quota),
+        )
+
     tasks = [_process_ein(normalized) for normalized in unique_eins.values()]
     results_raw = await asyncio.gather(*tasks)
 
     # Index results by digits for lookup
-    results_by_digits: dict[str, tuple[VerifyResponse | None, str | None]] = {}
-    for normalized, data, error in results_raw:
-        results_by_digits[ein_to_digits(normalized)] = (data, error)
+    results_by_digits: dict[str, tuple[Document | None, str | None]] = {}
+    for normalized, document, error in results_raw:
+        results_by_digits[ein_to_digits(normalized)] = (document, error)
 
-    # Assemble response in original request order
-    results: list[BatchVerifyResult] = []
+    # Assemble response in original request order, splicing in each cached
+    # body as is rather than rebuilding a VerifyResponse per EIN
+    results: list[bytes] = []
     succeeded = 0
     failed = 0
     for ein in request.eins:
         normalized = normalized_map[ein]
         digits = ein_to_digits(normalized)
-        data, error = results_by_digits[digits]
-        if data is not None:
-            results.append(BatchVerifyResult(ein=normalized, success=True, data=data))
+        document, error = results_by_digits[digits]
+        if document is not None:
+            results.append(batch_result(normalized, document.body, None))
             succeeded += 1
         else:
-            results.append(BatchVerifyResult(ein=normalized, success=False, error=error))
+            results.append(batch_result(normalized, None, error))
             failed += 1
 
     # Record usage (best-effort, one row per unique EIN)
     start = time.time()
     for normalized in unique_eins.values():
         digits = ein_to_digits(normalized)
-        data, error = results_by_digits[digits]
-        status_code = 200 if data is not None else 404
+        document, error = results_by_digits[digits]
+        status_code = 200 if document is not None else 404
         elapsed_ms = int((time.time() - start) * 1000)
-        await _record_usage(api_key_info, normalized, status_code, elapsed_ms, False, endpoint="batch")
+        _record_usage(api_key_info, normalized, status_code, elapsed_ms, False, endpoint="batch")
 
-    return BatchVerifyResponse(
-        total=len(request.eins),
-        succeeded=succeeded,
-        failed=failed,
-        results=results,
+    return json_response(
+        batch_body(len(request.eins), succeeded, failed, results), headers=rate_limit_headers(quota)
     )
 
 
-async def _record_usage(
+async def _stream_batch(request, normalized_map, unique_eins, process_ein, api_key_info):
+    """NDJSON lines for verify_batch, each written as soon as its EIN resolves."""
+    # How many request entries each unique EIN answers
+    occurrences = Counter(ein_to_digits(normalized_map[ein]) for ein in request.eins)
+    tasks = [asyncio.create_task(process_ein(normalized)) for normalized in unique_eins.values()]
+    succeeded = failed = 0
+    start = time.time()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            normalized, document, error = await next_done
+            count = occurrences[ein_to_digits(normalized)]
+            if document is not None:
+                line = batch_result(normalized, document.body, None)
+                succeeded += count
+            else:
+                line = batch_result(normalized, None, error)
+                failed += count
+            elapsed_ms = int((time.time() - start) * 1000)
+            _record_usage(
+                api_key_info, normalized, 200 if document is not None else 404, elapsed_ms, False,
+                endpoint="batch",
+            )
+            yield (line + b"\n") * count
+        yield b'{"total":%d,"succeeded":%d,"failed":%d}\n' % (len(request.eins), succeeded, failed)
+    finally:
+        # Client went away mid-stream
+        for task in tasks:
+            task.cancel()
+
+
+def _record_usage(
     api_key_info: dict, ein: str, status: int, elapsed_ms: int, cache_hit: bool,
     *, endpoint: str = "verify",
 ):
-    """Record API usage in PostgreSQL. Best-effort (won't fail the request)."""
-    try:
-        pool = await get_pool()
-        async with pool.acquire() as conn:
-            await conn.execute(
-                """INSERT INTO api_usage (api_key_id, endpoint, ein, response_status, response_time_ms, cache_hit)
-                   VALUES ($1, $2, $3, $4, $5, $6)""",
-                api_key_info["id"],
-                endpoint,
-                ein,
-                status,
-                elapsed_ms,
-                cache_hit,
-            )
-    except Exception:
-        pass  # Usage tracking is non-critical
+    """Record API usage. Buffered and written in bulk (see services.usage); never blocks."""
+    usage.record(api_key_info["id"], endpoint, ein, status, elapsed_ms, cache_hit)
@@ -0,0 +1,199 @@
+"""Async ranged ZIP reader over httpx.
+
+Reads individual members of a remote ZIP archive with HTTP Range requests,
+without blocking the event loop (remotezip is built on requests and is
+synchronous). Supports stored and deflated members and ZIP64 archives.
+
+Members are dicts with keys: name, header_offset, compress_size, file_size,
+crc32, compress_type, name_len.
+"""
+
+import struct
+import zlib
+
+import httpx
+
+# End of central directory record
+EOCD = struct.Struct("<IHHHHIIH")
+EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP64_LOCATOR = struct.Struct("<IIQI")
+ZIP64_LOCATOR_SIGNATURE = 0x07064B50
+ZIP64_EOCD = struct.Struct("<IQHHIIQQQQ")
+ZIP64_EOCD_SIGNATURE = 0x06064B50
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+CENTRAL_HEADER_SIGNATURE = 0x02014B50
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+LOCAL_HEADER_SIGNATURE = 0x04034B50
+ZIP64_EXTRA_ID = 0x0001
+
+# EOCD (22 bytes) + max comment (64 KB)
+TAIL_SIZE = EOCD.size + 0xFFFF
+# The local extra field can differ from the central one; over-fetch a little
+# so the common case stays a single request.
+LOCAL_EXTRA_SLACK = 1024
+
+STORED = 0
+DEFLATED = 8
+
+
+class ZipReadError(Exception):
+    pass
+
+
+async def _get_range(client: httpx.AsyncClient, url: str, byte_range: str) -> httpx.Response:
+    resp = await client.get(url, headers={"Range": f"bytes={byte_range}"})
+    if resp.status_code != 206:
+        raise ZipReadError(f"Range request to {url} returned {resp.status_code}")
+    return resp
+
+
+async def read_central_directory(client: httpx.AsyncClient, url: str) -> list[dict]:
+    """Fetch and parse a remote archive's central directory.
+
+    One suffix-range request for the tail, plus one for the central
+    directory itself when it doesn't fit in the tail.
+    """
+    resp = await _get_range(client, url, f"-{TAIL_SIZE}")
+    tail = resp.content
+    total_size = int(resp.headers["content-range"].rsplit("/", 1)[1])
+    tail_start = total_size - len(tail)
+
+    eocd_pos = tail.rfind(EOCD_SIGNATURE)
+    if eocd_pos < 0:
+        raise ZipReadError(f"No end of central directory record in {url}")
+    _, _, _, _, count, cd_size, cd_offset, _ = EOCD.unpack_from(tail, eocd_pos)
+
+    if count == 0xFFFF or cd_size == 0xFFFFFFFF or cd_offset == 0xFFFFFFFF:
+        locator_pos = eocd_pos - ZIP64_LOCATOR.size
+        signature, _, zip64_offset, _ = ZIP64_LOCATOR.unpack_from(tail, locator_pos)
+        if signature != ZIP64_LOCATOR_SIGNATURE:
+            raise ZipReadError(f"Bad ZIP64 locator in {url}")
+        if zip64_offset >= tail_start:
+            zip64_record = tail[zip64_offset - tail_start:]
+        else:
+            zip64_record = (await _get_range(
+                client, url, f"{zip64_offset}-{zip64_offset + ZIP64_EOCD.size - 1}"
+            )).content
+        fields = ZIP64_EOCD.unpack_from(zip64_record, 0)
+        if fields[0] != ZIP64_EOCD_SIGNATURE:
+            raise ZipReadError(f"Bad ZIP64 end of central directory in {url}")
+        count, cd_size, cd_offset = fields[7], fields[8], fields[9]
+
+    if cd_offset >= tail_start:
+        directory = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+    else:
+        directory = (await _get_range(client, url, f"{cd_offset}-{cd_offset + cd_size - 1}")).content
+
+    return parse_central_directory(directory, count)
+
+
+def parse_central_directory(directory: bytes, count: int) -> list[dict]:
+    """Parse count central directory headers from raw bytes."""
+    members = []
+    pos = 0
+    for _ in range(count):
+        fields = CENTRAL_HEADER.unpack_from(directory, pos)
+        if fields[0] != CENTRAL_HEADER_SIGNATURE:
+            raise ZipReadError(f"Bad central directory header at {pos}")
+        method, crc, compress_size, file_size = fields[4], fields[7], fields[8], fields[9]
+        name_len, extra_len, comment_len = fields[10], fields[11], fields[12]
+        header_offset = fields[16]
+
+        name_start = pos + CENTRAL_HEADER.size
+        raw_name = directory[name_start:name_start + name_len]
+        extra = directory[name_start + name_len:name_start + name_len + extra_len]
+        if 0xFFFFFFFF in (file_size, compress_size, header_offset):
+            file_size, compress_size, header_offset = _apply_zip64_extra(
+                extra, file_size, compress_size, header_offset
+            )
+
+        members.append({
+            "name": raw_name.decode("utf-8", "replace"),
+            "header_offset": header_offset,
+            "compress_size": compress_size,
+            "file_size": file_size,
+            "crc32": crc,
+            "compress_type": method,
+            "name_len": name_len,
+        })
+        pos = name_start + name_len + extra_len + comment_len
+    return members
+
+
+def _apply_zip64_extra(extra: bytes, file_size: int, compress_size: int, header_offset: int):
+    """Replace 0xFFFFFFFF placeholders with values from the ZIP64 extra field."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        field_id, size = struct.unpack_from("<HH", extra, pos)
+        if field_id == ZIP64_EXTRA_ID:
+            values = iter(struct.unpack_from(f"<{size // 8}Q", extra, pos + 4))
+            if file_size == 0xFFFFFFFF:
+                file_size = next(values)
+            if compress_size == 0xFFFFFFFF:
+                compress_size = next(values)
+            if header_offset == 0xFFFFFFFF:
+                header_offset = next(values)
+            break
+        pos += 4 + size
+    return file_size, compress_size, header_offset
+
+
+def _decompressor(member: dict):
+    if member["compress_type"] == DEFLATED:
+        return zlib.decompressobj(-zlib.MAX_WBITS)
+    if member["compress_type"] == STORED:
+        return None
+    raise ZipReadError(f"Unsupported compression method {member['compress_type']}")
+
+
+async def read_member(client: httpx.AsyncClient, url: str, member: dict) -> bytes:
+    """Fetch and inflate one member, streaming.
+
+    Normally a single ranged GET covering the local header and the
+    compressed data; the data is inflated chunk by chunk as it arrives.
+    """
+    start = member["header_offset"]
+    compress_size = member["compress_size"]
+    end = start + LOCAL_HEADER.size + member["name_len"] + LOCAL_EXTRA_SLACK + compress_size - 1
+    decompressor = _decompressor(member)
+    out = []
+    remaining = compress_size
+    header = b""
+    data_offset = None
+
+    async with client.stream("GET", url, headers={"Range": f"bytes={start}-{end}"}) as resp:
+        if resp.status_code != 206:
+            raise ZipReadError(f"Range request to {url} returned {resp.status_code}")
+        async for chunk in resp.aiter_bytes():
+            if data_offset is None:
+                header += chunk
+                if len(header) < LOCAL_HEADER.size:
+                    continue
+                fields = LOCAL_HEADER.unpack_from(header, 0)
+                if fields[0] != LOCAL_HEADER_SIGNATURE:
+                    raise ZipReadError(f"Bad local header at {start} in {url}")
+                data_offset = LOCAL_HEADER.size + fields[9] + fields[10]
+                if len(header) < data_offset:
+                    data_offset = None
+                    continue
+                chunk = header[data_offset:]
+            if remaining <= 0:
+                break
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            out.append(decompressor.decompress(chunk) if decompressor else chunk)
+
+    if data_offset is None:
+        raise ZipReadError(f"Truncated local header at {start} in {url}")
+    if remaining > 0:
+        # Local extra field was larger than our slack — fetch the rest
+        more_start = start + data_offset + compress_size - remaining
+        resp = await _get_range(client, url, f"{more_start}-{start + data_offset + compress_size - 1}")
+        out.append(decompressor.decompress(resp.content) if decompressor else resp.content)
+    if decompressor:
+        out.append(decompressor.flush())
+
+    raw = b"".join(out)
+    if zlib.crc32(raw) != member["crc32"]:
+        raise ZipReadError(f"CRC mismatch for member at {start} in {url}")
+    return raw
@@ -0,0 +1,283 @@
+"""Bulk ingestion of IRS 990 e-file archives into Postgres.
+
+Instead of pulling one filing per cache miss, each yearly ZIP is downloaded
+once and every return in it is parsed and loaded into the filings tables
+(migrations/003_filings.sql). get_filing_data then reads an EIN's latest
+filing with one indexed SELECT (FILING_STORE=true).
+
+Pipeline, per archive:
+
+    download → member names → process pool (extract) → batched COPY
+
+parse_archive() keeps at most max_pending members in flight and only
+submits more as the loader consumes results, so memory stays bounded by
+max_pending + batch_size filings regardless of archive size. Workers are
+handed member names, not XML bytes; each process opens the ZIP itself.
+
+Each archive loads in one transaction that also records it in
+filing_ingest_progress, so an interrupted run resumes at the first
+unfinished archive. Re-loading an archive replaces its rows.
+
+Run with:
+    python -m scripts.ingest_990s [archive...]
+"""
+
+import asyncio
+import logging
+import os
+import zipfile
+from concurrent.futures import Executor
+
+import httpx
+
+from app.config import settings
+from app.services.efile_extractor import RETURN_TYPES, SECTIONS, extract
+from app.services.zip_catalog import archive_url, object_id_from_name
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+MAX_PENDING = 256
+DOWNLOAD_CHUNK = 1 << 20
+
+FILING_COLUMNS = (
+    "object_id", "ein", "tax_period", "return_type", "archive",
+    "contributions_and_grants", "program_service_revenue", "investment_income",
+    "other_revenue", "total_revenue",
+    "program_services", "management_and_general", "fundraising", "total_expenses",
+)
+REVENUE_KEYS = FILING_COLUMNS[5:10]
+EXPENSE_KEYS = FILING_COLUMNS[10:14]
+OFFICER_COLUMNS = ("object_id", "position", "name", "title", "compensation", "hours_per_week")
+SCHEDULE_J_COLUMNS = (
+    "object_id", "position", "name",
+    "base_compensation", "bonus_and_incentive", "other_compensation",
+    "deferred_compensation", "nontaxable_benefits", "total_compensation",
+)
+
+_STAGE_SQL = """
+CREATE TEMP TABLE stage_filings (LIKE filings INCLUDING DEFAULTS) ON COMMIT DROP;
+CREATE TEMP TABLE stage_officers (LIKE filing_officers) ON COMMIT DROP;
+CREATE TEMP TABLE stage_schedule_j (LIKE filing_schedule_j) ON COMMIT DROP;
+"""
+
+# Drop the archive's previous rows, and any return re-published in it
+_REPLACE_SQL = (
+    "DELETE FROM filings WHERE archive = $1 OR object_id IN (SELECT object_id FROM stage_filings)"
+)
+_MERGE_SQL = """
+INSERT INTO filings SELECT * FROM stage_filings;
+INSERT INTO filing_officers SELECT * FROM stage_officers;
+INSERT INTO filing_schedule_j SELECT * FROM stage_schedule_j;
+"""
+
+
+# --- Worker side (runs in the process pool) ---
+
+_zip: tuple[str, zipfile.ZipFile] | None = None
+
+
+def _open_zip(path: str) -> zipfile.ZipFile:
+    """Per-process ZipFile, reused across members of the same archive."""
+    global _zip
+    if _zip is None or _zip[0] != path:
+        if _zip is not None:
+            _zip[1].close()
+        _zip = (path, zipfile.ZipFile(path))
+    return _zip[1]
+
+
+def _tax_period(tax_period_end: str | None) -> int | None:
+    """'2023-12-31' → 202312, matching the filing index's TAX_PERIOD."""
+    if not tax_period_end or len(tax_period_end) < 7:
+        return None
+    digits = tax_period_end[:4] + tax_period_end[5:7]
+    return int(digits) if digits.isdigit() else None
+
+
+def rows_from_filing(object_id: int, archive: str, parsed: dict) -> tuple | None:
+    """Turn extract() output into (filing row, officer rows, Schedule J rows).
+
+    Returns None for returns we don't store (990-T, missing EIN, ...).
+    """
+    filer = parsed.get("filer") or {}
+    ein = filer.get("ein")
+    if not ein or filer.get("return_type") not in RETURN_TYPES:
+        return None
+
+    revenue = parsed.get("revenue_breakdown") or {}
+    expense = parsed.get("expense_breakdown") or {}
+    filing = (
+        object_id, ein, _tax_period(filer.get("tax_period_end")), filer["return_type"], archive,
+        *(revenue.get(k) for k in REVENUE_KEYS),
+        *(expense.get(k) for k in EXPENSE_KEYS),
+    )
+    officers = [
+        (object_id, i, o["name"], o["title"], o["compensation"], o["hours_per_week"])
+        for i, o in enumerate(parsed.get("officers") or [])
+    ]
+    schedule_j = [
+        (object_id, i, *(entry[k] for k in SCHEDULE_J_COLUMNS[2:]))
+        for i, entry in enumerate(parsed.get("schedule_j") or [])
+    ]
+    return filing, officers, schedule_j
+
+
+def parse_member(path: str, archive: str, name: str) -> tuple | None:
+    """Read and parse one member of a local archive into table rows."""
+    object_id = object_id_from_name(name)
+    if object_id is None:
+        return None
+    xml_data = _open_zip(path).read(name)
+    return rows_from_filing(object_id, archive, extract(xml_data, SECTIONS + ("filer",)))
+
+
+def member_names(path: str) -> list[str]:
+    with zipfile.ZipFile(path) as zf:
+        return [name for name in zf.namelist() if object_id_from_name(name) is not None]
+
+
+# --- Pipeline ---
+
+
+async def parse_archive(path: str, archive: str, names, executor: Executor | None,
+                        max_pending: int = MAX_PENDING):
+    """Yield parsed row tuples for every member, at most max_pending in flight.
+
+    New members are only submitted as results are consumed, so a slow loader
+    throttles parsing. executor=None parses inline (tests, debugging).
+    """
+    loop = asyncio.get_running_loop()
+    names = iter(names)
+    pending: set[asyncio.Future] = set()
+    try:
+        while True:
+            while len(pending) < max_pending:
+                name = next(names, None)
+                if name is None:
+                    break
+                if executor is None:
+                    future = loop.create_future()
+                    try:
+                        future.set_result(parse_member(path, archive, name))
+                    except Exception as e:
+                        future.set_exception(e)
+                else:
+                    future = loop.run_in_executor(executor, parse_member, path, archive, name)
+                pending.add(future)
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logger.warning("Failed to parse member of %s: %s", archive, e)
+                    continue
+                if rows is not None:
+                    yield rows
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def _copy_batch(conn, filings: list, officers: list, schedule_j: list):
+    await conn.copy_records_to_table("stage_filings", records=filings, columns=FILING_COLUMNS)
+    if officers:
+        await conn.copy_records_to_table("stage_officers", records=officers, columns=OFFICER_COLUMNS)
+    if schedule_j:
+        await conn.copy_records_to_table(
+            "stage_schedule_j", records=schedule_j, columns=SCHEDULE_J_COLUMNS
+        )
+
+
+async def load_archive(conn, archive: str, parsed, batch_size: int = BATCH_SIZE) -> int:
+    """COPY parsed rows into the filings tables in one transaction.
+
+    Rows are staged in temp tables batch by batch, then swapped in for the
+    archive's previous rows and the archive is marked complete. Returns the
+    number of filings loaded.
+    """
+    count = 0
+    async with conn.transaction():
+        await conn.execute(_STAGE_SQL)
+        filings, officers, schedule_j = [], [], []
+        async for filing, filing_officers, filing_schedule_j in parsed:
+            filings.append(filing)
+            officers.extend(filing_officers)
+            schedule_j.extend(filing_schedule_j)
+            if len(filings) >= batch_size:
+                await _copy_batch(conn, filings, officers, schedule_j)
+                count += len(filings)
+                filings, officers, schedule_j = [], [], []
+        if filings:
+            await _copy_batch(conn, filings, officers, schedule_j)
+            count += len(filings)
+
+        await conn.execute(_REPLACE_SQL, archive)
+        await conn.execute(_MERGE_SQL)
+        await conn.execute(
+            "INSERT INTO filing_ingest_progress (archive, filings) VALUES ($1, $2) "
+            "ON CONFLICT (archive) DO UPDATE SET filings = EXCLUDED.filings, completed_at = NOW()",
+            archive, count,
+        )
+    return count
+
+
+async def download_archive(client: httpx.AsyncClient, archive: str, work_dir: str) -> str:
+    """Download an archive to work_dir once; resumes a partial .part file."""
+    path = os.path.join(work_dir, archive.replace("/", "_") + ".zip")
+    if os.path.exists(path):
+        return path
+    os.makedirs(work_dir, exist_ok=True)
+    part_path = f"{path}.part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    async with client.stream("GET", archive_url(archive), headers=headers) as resp:
+        if resp.status_code not in (200, 206):
+            raise httpx.HTTPStatusError(
+                f"Download of {archive} returned {resp.status_code}",
+                request=resp.request, response=resp,
+            )
+        # 200 means the server ignored the Range; start over
+        with open(part_path, "ab" if resp.status_code == 206 else "wb") as f:
+            async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK):
+                f.write(chunk)
+    os.replace(part_path, path)
+    return path
+
+
+async def completed_archives(pool) -> set[str]:
+    rows = await pool.fetch("SELECT archive FROM filing_ingest_progress")
+    return {row["archive"] for row in rows}
+
+
+async def ingest(pool, archives: list[str], executor: Executor | None,
+                 work_dir: str | None = None, keep_zips: bool = False) -> int:
+    """Load every archive not yet recorded as complete. Returns archives loaded."""
+    work_dir = work_dir or settings.ingest_work_dir
+    done = await completed_archives(pool)
+    loop = asyncio.get_running_loop()
+    loaded = 0
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, read=300.0)) as client:
+        for archive in archives:
+            if archive in done:
+                continue
+            try:
+                path = await download_archive(client, archive, work_dir)
+                names = await loop.run_in_executor(None, member_names, path)
+                async with pool.acquire() as conn:
+                    count = await load_archive(
+                        conn, archive, parse_archive(path, archive, names, executor)
+                    )
+            except Exception as e:
+                logger.warning("Failed to ingest %s: %s", archive, e)
+                continue
+            loaded += 1
+            logger.info("Ingested %s (%d filings)", archive, count)
+            if not keep_zips:
+                os.remove(path)
+    return loaded
@@ -0,0 +1,362 @@
+"""Declarative single-pass extractor for IRS e-file returns.
+
+FORM_SPECS maps each return type (990, 990-EZ, 990-PF) to the element that
+roots it in the XML and, per output section, the elements to read. At import
+the table is compiled into per-root tag → handler dispatch tables, so one
+streaming pass serves every return type. Supporting a new form or field is
+one table entry; it adds no extra walk over the document.
+
+Section kinds:
+    Fields    scalar fields found anywhere under the form root (first
+              occurrence wins); None if every field is missing
+    Group     the first occurrence of a group element; None if absent
+    Repeated  every occurrence of a group element; entries without a name
+              are skipped
+
+Field kinds:
+    int    first present tag, parsed as int (None if unparseable)
+    sum    sum of every present tag as int (0 if unparseable); None if none present
+    text   stripped text
+    float  float(text)
+    name   first present tag's text, Title Cased if ALL CAPS (required)
+
+RETURN_HEADER adds a "filer" section (EIN, tax period, return type) that
+any return can provide; it is only extracted when requested.
+
+Tags are matched by local name within the IRS e-file namespace. Within a
+field, tags are listed in priority order (e.g. PersonNm before BusinessName).
+"""
+
+import io
+import xml.etree.ElementTree as ET
+from typing import NamedTuple
+
+IRS_NAMESPACE = "http://www.irs.gov/efile"
+_NS = "{" + IRS_NAMESPACE + "}"
+
+
+class Field(NamedTuple):
+    tags: tuple[str, ...]
+    kind: str = "int"
+
+
+class Fields(NamedTuple):
+    fields: dict[str, Field]
+
+
+class Group(NamedTuple):
+    tag: str
+    fields: dict[str, Field]
+
+
+class Repeated(NamedTuple):
+    tag: str
+    fields: dict[str, Field]
+
+
+class FormSpec(NamedTuple):
+    root: str
+    sections: dict
+    schedules: tuple["FormSpec", ...] = ()
+
+
+def _int(tag: str) -> Field:
+    return Field((tag,))
+
+
+_PERSON_NAME = Field(("PersonNm", "BusinessNameLine1Txt"), "name")
+
+SCHEDULE_J = FormSpec(
+    root="IRS990ScheduleJ",
+    sections={
+        "schedule_j": Repeated("RptCmpOrganizationGrp", {
+            "name": _PERSON_NAME,
+            "base_compensation": _int("BaseCompensationFilingOrgAmt"),
+            "bonus_and_incentive": _int("BonusFilingOrganizationAmount"),
+            "other_compensation": _int("OtherCompensationFilingOrgAmt"),
+            "deferred_compensation": _int("DeferredCompensationFlngOrgAmt"),
+            "nontaxable_benefits": _int("NontaxableBenefitsFilingOrgAmt"),
+            "total_compensation": _int("TotalCompensationFilingOrgAmt"),
+        }),
+    },
+)
+
+# Part IV (990-EZ) and Part VIII (990-PF) officer lists share one layout
+_EZ_PF_OFFICER_FIELDS = {
+    "name": _PERSON_NAME,
+    "title": Field(("TitleTxt",), "text"),
+    "compensation": Field(
+        ("CompensationAmt", "EmployeeBenefitProgramAmt", "ExpenseAccountOtherAllwncAmt"), "sum"
+    ),
+    "hours_per_week": Field(("AverageHrsPerWkDevotedToPosRt",), "float"),
+}
+
+FORM_SPECS = {
+    "990": FormSpec(
+        root="IRS990",
+        sections={
+            # Part VII Section A
+            "officers": Repeated("Form990PartVIISectionAGrp", {
+                "name": _PERSON_NAME,
+                "title": Field(("TitleTxt",), "text"),
+                "compensation": Field(("ReportableCompFromOrgAmt", "OtherCompensationAmt"), "sum"),
+                "hours_per_week": Field(("AverageHoursPerWeekRt",), "float"),
+            }),
+            # Part VIII
+            "revenue_breakdown": Fields({
+                "contributions_and_grants": _int("CYContributionsGrantsAmt"),
+                "program_service_revenue": _int("CYProgramServiceRevenueAmt"),
+                "investment_income": _int("CYInvestmentIncomeAmt"),
+                "other_revenue": _int("CYOtherRevenueAmt"),
+                "total_revenue": _int("CYTotalRevenueAmt"),
+            }),
+            # Part IX line 25
+            "expense_breakdown": Group("TotalFunctionalExpensesGrp", {
+                "program_services": _int("ProgramServicesAmt"),
+                "management_and_general": _int("ManagementAndGeneralAmt"),
+                "fundraising": _int("FundraisingAmt"),
+                "total_expenses": _int("TotalAmt"),
+            }),
+        },
+        schedules=(SCHEDULE_J,),
+    ),
+    "990EZ": FormSpec(
+        root="IRS990EZ",
+        sections={
+            # Part IV
+            "officers": Repeated("OfficerDirectorTrusteeEmplGrp", _EZ_PF_OFFICER_FIELDS),
+            # Part I
+            "revenue_breakdown": Fields({
+                "contributions_and_grants": _int("ContributionsGiftsGrantsEtcAmt"),
+                "program_service_revenue": _int("ProgramServiceRevenueAmt"),
+                "investment_income": _int("InvestmentIncomeAmt"),
+                "other_revenue": _int("OtherRevenueTotalAmt"),
+                "total_revenue": _int("TotalRevenueAmt"),
+            }),
+            # Part I line 17 and Part III line 32; no functional split on the EZ
+            "expense_breakdown": Fields({
+                "program_services": _int("TotalProgramServiceExpensesAmt"),
+                "management_and_general": Field(()),
+                "fundraising": Field(()),
+                "total_expenses": _int("TotalExpensesAmt"),
+            }),
+        },
+    ),
+    "990PF": FormSpec(
+        root="IRS990PF",
+        sections={
+            # Part VIII
+            "officers": Repeated("OfficerDirTrstKeyEmplGrp", _EZ_PF_OFFICER_FIELDS),
+            # Part I column (a)
+            "revenue_breakdown": Fields({
+                "contributions_and_grants": _int("ContriRcvdRevAndExpnssAmt"),
+                "program_service_revenue": Field(()),
+                "investment_income": Field(
+                    ("InterestOnSavRevAndExpnssAmt", "DividendsRevAndExpnssAmt"), "sum"
+                ),
+                "other_revenue": _int("OtherIncomeRevAndExpnssAmt"),
+                "total_revenue": _int("TotalRevAndExpnssAmt"),
+            }),
+            # Part I lines 26 (a) and (d)
+            "expense_breakdown": Fields({
+                "program_services": _int("TotalExpensesDsbrsChrtblAmt"),
+                "management_and_general": Field(()),
+                "fundraising": Field(()),
+                "total_expenses": _int("TotalExpensesRevAndExpnssAmt"),
+            }),
+        },
+    ),
+}
+
+# Present on every return, ahead of the form itself
+RETURN_HEADER = FormSpec(
+    root="ReturnHeader",
+    sections={
+        "filer": Fields({
+            "ein": Field(("EIN",), "text"),
+            "tax_period_end": Field(("TaxPeriodEndDt",), "text"),
+            "tax_year": _int("TaxYr"),
+            "return_type": Field(("ReturnTypeCd",), "text"),
+        }),
+    },
+)
+
+RETURN_TYPES = tuple(FORM_SPECS)
+SECTIONS = ("officers", "revenue_breakdown", "expense_breakdown", "schedule_j")
+_LIST_SECTIONS = {"officers", "schedule_j"}
+
+
+# --- Compilation ---
+
+
+class _CompiledRoot(NamedTuple):
+    sections: frozenset[str]
+    # leaf tag → [(section, field key, priority)] for Fields sections
+    scalars: dict[str, list[tuple[str, str, int]]]
+    # group tag → (section, is_repeated, fields, leaf tag → [(field key, priority)])
+    groups: dict[str, tuple[str, bool, dict[str, Field], dict[str, list[tuple[str, int]]]]]
+
+
+def _leaf_map(fields: dict[str, Field]) -> dict[str, list[tuple[str, int]]]:
+    leaves: dict[str, list[tuple[str, int]]] = {}
+    for key, field in fields.items():
+        for priority, tag in enumerate(field.tags):
+            leaves.setdefault(_NS + tag, []).append((key, priority))
+    return leaves
+
+
+def _compile_root(spec: FormSpec) -> _CompiledRoot:
+    scalars: dict[str, list[tuple[str, str, int]]] = {}
+    groups = {}
+    for section, section_spec in spec.sections.items():
+        if isinstance(section_spec, Fields):
+            for key, field in section_spec.fields.items():
+                for priority, tag in enumerate(field.tags):
+                    scalars.setdefault(_NS + tag, []).append((section, key, priority))
+        else:
+            groups[_NS + section_spec.tag] = (
+                section,
+                isinstance(section_spec, Repeated),
+                section_spec.fields,
+                _leaf_map(section_spec.fields),
+            )
+    return _CompiledRoot(frozenset(spec.sections), scalars, groups)
+
+
+def _compile(specs: dict[str, FormSpec], common: tuple[FormSpec, ...]):
+    roots: dict[str, _CompiledRoot] = {}
+    # Sections a return can contain, by main form root
+    provides: dict[str, frozenset[str]] = {}
+    # Fields sections need their field specs at finalize time
+    scalar_fields: dict[tuple[str, str], dict[str, Field]] = {}
+    for form in common:
+        roots[_NS + form.root] = _compile_root(form)
+        for section, section_spec in form.sections.items():
+            if isinstance(section_spec, Fields):
+                scalar_fields[(_NS + form.root, section)] = section_spec.fields
+    for spec in specs.values():
+        sections = set(spec.sections)
+        for form in (spec, *spec.schedules):
+            roots[_NS + form.root] = _compile_root(form)
+            sections |= set(form.sections)
+            for section, section_spec in form.sections.items():
+                if isinstance(section_spec, Fields):
+                    scalar_fields[(_NS + form.root, section)] = section_spec.fields
+        provides[_NS + spec.root] = frozenset(sections)
+    return roots, provides, scalar_fields
+
+
+_ROOTS, _PROVIDES, _SCALAR_FIELDS = _compile(FORM_SPECS, common=(RETURN_HEADER,))
+
+
+# --- Field finalization ---
+
+
+def _to_int(text: str | None) -> int | None:
+    if text:
+        try:
+            return int(float(text))
+        except (ValueError, TypeError):
+            return None
+    return None
+
+
+def title_case(s: str) -> str:
+    """Convert ALL CAPS name to Title Case."""
+    if s and s == s.upper():
+        return s.title()
+    return s
+
+
+def _finalize(fields: dict[str, Field], raw: dict[str, dict[int, str | None]]) -> dict:
+    """Turn captured text (field key → {priority: text}) into output values."""
+    out = {}
+    for key, field in fields.items():
+        present = raw.get(key, {})
+        first = present[min(present)] if present else None
+        if field.kind == "int":
+            out[key] = _to_int(first)
+        elif field.kind == "sum":
+            out[key] = sum(_to_int(t) or 0 for t in present.values()) if present else None
+        elif field.kind == "text":
+            out[key] = first.strip() if first else None
+        elif field.kind == "float":
+            out[key] = float(first) if first else None
+        elif field.kind == "name":
+            out[key] = title_case(first) if first else None
+        else:
+            raise ValueError(f"Unknown field kind {field.kind!r}")
+    return out
+
+
+# --- Extraction ---
+
+
+def extract(xml_data: bytes, sections=SECTIONS) -> dict:
+    """Extract the requested sections from a 990, 990-EZ or 990-PF return.
+
+    Single streaming pass: dispatches on fully qualified tag names, clears
+    elements once handled, and stops as soon as every requested section the
+    return can contain is complete.
+    """
+    wanted = set(sections)
+    pending = set(wanted)
+    result: dict = {s: ([] if s in _LIST_SECTIONS else None) for s in wanted}
+    scalars: dict[tuple[str, str], dict[str, dict[int, str | None]]] = {}
+
+    active: _CompiledRoot | None = None
+    active_tag = None
+    group = None  # (section, is_repeated, fields, leaves, raw)
+    group_depth = 0
+
+    for event, elem in ET.iterparse(io.BytesIO(xml_data), events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag in _ROOTS:
+                active, active_tag = _ROOTS[tag], tag
+                if tag in _PROVIDES:
+                    # Main form: sections it can't contain will never appear
+                    pending &= _PROVIDES[tag]
+            elif active is not None and tag in active.groups:
+                if group is None:
+                    section, repeated, fields, leaves = active.groups[tag]
+                    if section in wanted:
+                        group = (section, repeated, fields, leaves, {})
+                group_depth += 1
+            continue
+
+        if group is not None:
+            section, repeated, fields, leaves, raw = group
+            for key, priority in leaves.get(tag, ()):
+                raw.setdefault(key, {}).setdefault(priority, elem.text)
+        elif active is not None and tag in active.scalars:
+            for section, key, priority in active.scalars[tag]:
+                if section in wanted:
+                    raw = scalars.setdefault((active_tag, section), {})
+                    raw.setdefault(key, {}).setdefault(priority, elem.text)
+
+        if active is not None and tag in active.groups:
+            group_depth -= 1
+            if group is not None and group_depth == 0:
+                section, repeated, fields, leaves, raw = group
+                record = _finalize(fields, raw)
+                if repeated:
+                    if record.get("name"):
+                        result[section].append(record)
+                elif result[section] is None:
+                    result[section] = record
+                group = None
+        elif tag == active_tag:
+            pending -= active.sections
+            active, active_tag = None, None
+
+        if group_depth == 0:
+            elem.clear()
+        if not pending:
+            break
+
+    for (root_tag, section), raw in scalars.items():
+        values = _finalize(_SCALAR_FIELDS[(root_tag, section)], raw)
+        if any(v is not None for v in values.values()):
+            result[section] = values
+    return result
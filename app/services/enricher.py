@@ -1,3 +1,4 @@
+import asyncio
 from datetime import date
 
 from app.models.schemas import (
@@ -32,25 +33,51 @@ SUBSECTION_MAP = {
 ACTIVE_STATUS_CODES = {1, 2, "01", "02", "1", "2"}
 
 
+def _is_stub(org: dict) -> bool:
+    """ProPublica returns stub records for any EIN — detect by checking key fields."""
+    return not org.get("subsection_code") and not org.get("ruling_date") and org.get("name") == "Unknown Organization"
+
+
+async def _cancel(*tasks: asyncio.Task):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
 async def verify_organization(ein_raw: str) -> VerifyResponse | None:
-    """Fetch and combine data from all sources for a given EIN."""
+    """Fetch and combine data from all sources for a given EIN.
+
+    The 990 and state lookups start speculatively alongside ProPublica, so a
+    cold lookup costs the slowest upstream rather than the sum of all three.
+    If ProPublica has no record (or only a stub) they are cancelled.
+    """
     normalized = validate_ein(ein_raw)
     if not normalized:
         return None
 
     digits = ein_to_digits(normalized)
 
+    filing_task = asyncio.create_task(irs_990.get_filing_data(digits))
+    state_task = asyncio.create_task(state_registry.check_all_states(digits))
+
     # Primary data source: ProPublica (includes IRS BMF data)
-    pp_data = await propublica.fetch_organization(digits)
-    if not pp_data:
+    try:
+        pp_data = await propublica.fetch_organization(digits)
+    except BaseException:
+        await _cancel(filing_task, state_task)
+        raise
+
+    org = pp_data.get("organization", {}) if pp_data else {}
+    if not pp_data or _is_stub(org):
+        await _cancel(filing_task, state_task)
         return None
 
-    org = pp_data.get("organization", {})
     filings = pp_data.get("filings_with_data", [])
-
-    # ProPublica returns stub records for any EIN — detect by checking key fields
-    if not org.get("subsection_code") and not org.get("ruling_date") and org.get("name") == "Unknown Organization":
-        return None
+    try:
+        filing_data, state_reg_data = await asyncio.gather(filing_task, state_task)
+    except BaseException:
+        await _cancel(filing_task, state_task)
+        raise
 
     # Status — ProPublica returns status_code as int or string depending on org
     raw_status = org.get("exempt_organization_status_code")
@@ -65,8 +92,6 @@ async def verify_organization(ein_raw: str) -> VerifyResponse | None:
         subsection = f"501(c)({sub_code})"
 
     # 990 XML filing data (officers, revenue/expense breakdown, schedule J)
-    filing_data = await irs_990.get_filing_data(digits)
-
     revenue_breakdown = None
     expense_breakdown = None
     schedule_j_map: dict[str, dict] = {}
@@ -118,7 +143,6 @@ async def verify_organization(ein_raw: str) -> VerifyResponse | None:
             personnel.append(Person(**p, compensation_detail=comp_detail))
 
     # State registrations (stub — Phase 4)
-    state_reg_data = await state_registry.check_all_states(digits)
     state_regs = [StateRegistration(**sr) for sr in state_reg_data]
 
     # Data source timestamps
@@ -0,0 +1,393 @@
+"""Local memory-mapped EIN → 990/990-EZ/990-PF filing index.
+
+Built once from the IRS yearly e-file index CSVs so that filing lookups on
+the request path are a binary search over a local file instead of streaming
+50-200 MB of CSV per year over HTTP.
+
+File layout (all integers little-endian):
+
+    header   magic(8s) count(I) zips_offset(Q) zips_len(I)
+    eins     count x uint32, sorted ascending
+    records  count x RECORD, parallel to eins
+    zips     newline-joined ZIP filenames referenced by RECORD.zip_idx
+
+Only the latest filing per EIN is kept (by tax period, then index year).
+
+Build with:
+    python -m scripts.build_filing_index [path] [year ...]
+
+Refresh with (fetches only bytes appended since the last run):
+    python -m scripts.build_filing_index --refresh [path]
+
+Refresh state lives next to the index in {path}.state.json: per year, the
+byte length ingested so far plus the ETag/Last-Modified validators. The
+next run sends `Range: bytes={length}-` with `If-Range`, so an unchanged
+file costs a 416, an appended file costs only the new tail, and a replaced
+file (validator mismatch → 200) is re-ingested in full.
+"""
+
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+from datetime import date
+
+import httpx
+
+from app.config import settings
+from app.services.efile_extractor import RETURN_TYPES
+
+logger = logging.getLogger(__name__)
+
+IRS_XML_BASE = "https://apps.irs.gov/pub/epostcard/990/xml"
+MAGIC = b"NPVFIDX1"
+HEADER = struct.Struct("<8sIQI")
+EIN_ENTRY = struct.Struct("<I")
+# year, object_id, tax_period (YYYYMM), zip_idx, return_type
+RECORD = struct.Struct("<H20sIH6s")
+
+# Return types we index (RETURN_TYPE column values) — those the extractor parses
+INDEXED_RETURN_TYPES = set(RETURN_TYPES)
+
+_index: "FilingIndex | None" = None
+
+
+class FilingIndex:
+    """Read-only view over a built index file, memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.identity = (st.st_ino, st.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, zips_offset, zips_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a filing index")
+        self._eins_offset = HEADER.size
+        self._records_offset = self._eins_offset + self.count * EIN_ENTRY.size
+        blob = self._mm[zips_offset:zips_offset + zips_len].decode()
+        self._zips = blob.split("\n") if blob else []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    def _ein_at(self, i: int) -> int:
+        return EIN_ENTRY.unpack_from(self._mm, self._eins_offset + i * EIN_ENTRY.size)[0]
+
+    def _find(self, ein: int) -> int | None:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ein_at(mid) < ein:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._ein_at(lo) == ein:
+            return lo
+        return None
+
+    def _record_at(self, i: int) -> tuple:
+        year, object_id, tax_period, zip_idx, return_type = RECORD.unpack_from(
+            self._mm, self._records_offset + i * RECORD.size
+        )
+        return (
+            tax_period,
+            year,
+            object_id.rstrip(b"\0").decode(),
+            self._zips[zip_idx],
+            return_type.rstrip(b"\0").decode(),
+        )
+
+    def lookup(self, ein_digits: str) -> dict | None:
+        """Return {year, object_id, zip_filename, tax_period, return_type} or None."""
+        if not ein_digits.isdigit():
+            return None
+        i = self._find(int(ein_digits))
+        if i is None:
+            return None
+        return _record_to_filing(self._record_at(i))
+
+    def records(self) -> dict[int, tuple]:
+        """Load every entry into a dict, for merging into a rebuilt index."""
+        return {self._ein_at(i): self._record_at(i) for i in range(self.count)}
+
+    def archives(self) -> list[str]:
+        """Every "{year}/{zip_filename}" archive referenced by the index."""
+        return sorted({f"{r[1]}/{r[3]}" for r in self.records().values()})
+
+
+def _record_to_filing(record: tuple) -> dict:
+    tax_period, year, object_id, zip_filename, return_type = record
+    return {
+        "year": year,
+        "object_id": object_id,
+        "zip_filename": zip_filename,
+        "tax_period": str(tax_period) if tax_period else "",
+        "return_type": return_type,
+    }
+
+
+# --- Process-wide index ---
+
+
+def open_index(path: str | None = None) -> bool:
+    """Map the index file for this process. Returns the readiness flag."""
+    global _index
+    path = path or settings.filing_index_path
+    if not path:
+        return False
+    try:
+        new_index = FilingIndex(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Filing index unavailable at %s: %s", path, e)
+        return False
+    old, _index = _index, new_index
+    if old is not None:
+        old.close()
+    logger.info("Mapped filing index %s (%d EINs)", path, len(new_index))
+    return True
+
+
+def close_index():
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
+
+
+def reload_if_changed() -> bool:
+    """Remap the index if its file was replaced (e.g. by refresh_index).
+
+    Returns True if a new file was mapped.
+    """
+    if _index is None:
+        return open_index()
+    try:
+        st = os.stat(_index.path)
+    except OSError:
+        return False
+    if (st.st_ino, st.st_mtime_ns) == _index.identity:
+        return False
+    return open_index(_index.path)
+
+
+def is_ready() -> bool:
+    """True once the index is mapped and lookups need no network I/O."""
+    return _index is not None
+
+
+def lookup(ein_digits: str) -> dict | None:
+    """Find the latest indexed filing for an EIN. Requires is_ready()."""
+    if _index is None:
+        return None
+    return _index.lookup(ein_digits)
+
+
+# --- Building ---
+
+
+def ingest_rows(rows, year: int, records: dict[int, tuple]) -> int:
+    """Fold parsed IRS index CSV rows into records, keeping the latest per EIN.
+
+    Returns the number of rows accepted.
+    """
+    return sum(_ingest_row(parts, year, records) for parts in rows)
+
+
+def _ingest_row(parts: list[str], year: int, records: dict[int, tuple]) -> bool:
+    """CSV: RETURN_ID,FILING_TYPE,EIN,TAX_PERIOD,SUB_DATE,NAME,RETURN_TYPE,DLN,OBJECT_ID,ZIP_FILE"""
+    if len(parts) < 10:
+        return False
+    ein = parts[2].strip()
+    return_type = parts[6].strip()
+    if not ein.isdigit() or return_type not in INDEXED_RETURN_TYPES:
+        return False
+    tax_period = parts[3].strip()
+    zip_filename = parts[9].strip()
+    if not zip_filename:
+        return False
+
+    record = (
+        int(tax_period) if tax_period.isdigit() else 0,
+        year,
+        parts[8].strip(),
+        zip_filename,
+        return_type,
+    )
+    key = int(ein)
+    existing = records.get(key)
+    # Later rows win ties — amended returns appear after the original
+    if existing is None or record[:2] >= existing[:2]:
+        records[key] = record
+    return True
+
+
+def write_index(path: str, records: dict[int, tuple]):
+    """Write records to path atomically (tmp file + rename)."""
+    eins = sorted(records)
+    zips: dict[str, int] = {}
+    for record in records.values():
+        zips.setdefault(record[3], len(zips))
+    zips_blob = "\n".join(zips).encode()
+
+    zips_offset = HEADER.size + len(eins) * (EIN_ENTRY.size + RECORD.size)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(eins), zips_offset, len(zips_blob)))
+        for ein in eins:
+            f.write(EIN_ENTRY.pack(ein))
+        for ein in eins:
+            tax_period, year, object_id, zip_filename, return_type = records[ein]
+            f.write(RECORD.pack(year, object_id.encode(), tax_period, zips[zip_filename], return_type.encode()))
+        f.write(zips_blob)
+    os.replace(tmp_path, path)
+
+
+def default_years() -> list[int]:
+    """Years to include in a build: current year and 2 prior."""
+    current = date.today().year
+    return [current - 2, current - 1, current]
+
+
+def _state_path(path: str) -> str:
+    return f"{path}.state.json"
+
+
+def load_state(path: str) -> dict[str, dict]:
+    """Per-year refresh state: {year: {length, etag, last_modified}}."""
+    try:
+        with open(_state_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: str, state: dict[str, dict]):
+    tmp_path = f"{_state_path(path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, _state_path(path))
+
+
+async def _ingest_year(
+    client: httpx.AsyncClient, year: int, records: dict[int, tuple], state: dict | None,
+) -> tuple[dict | None, int]:
+    """Fold a year's index CSV (or just its new tail) into records.
+
+    The recorded length always ends on a line boundary. A last row without
+    a trailing newline is still ingested once the response is complete, and
+    the next refresh reads it again (merging is idempotent). Returns
+    (new state, rows accepted).
+    """
+    url = f"{IRS_XML_BASE}/{year}/index_{year}.csv"
+    # Byte offsets must refer to the file on disk, not a compressed transfer
+    headers = {"Accept-Encoding": "identity"}
+    offset = 0
+    if state:
+        offset = state["length"]
+        headers["Range"] = f"bytes={offset}-"
+        validator = state.get("etag") or state.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+
+    async with client.stream("GET", url, headers=headers) as resp:
+        if resp.status_code == 416:
+            # Nothing appended since last run
+            return state, 0
+        if resp.status_code == 200:
+            # First ingest, or the file was replaced and If-Range failed
+            offset = 0
+        elif resp.status_code != 206:
+            logger.warning("Index %s returned %s", url, resp.status_code)
+            return state, 0
+
+        accepted = 0
+        consumed = 0
+        pending = b""
+        async for chunk in resp.aiter_bytes():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                consumed += len(line) + 1
+                for parts in csv.reader([line.decode("utf-8", "replace")]):
+                    accepted += _ingest_row(parts, year, records)
+        # The stream ended cleanly, so an unterminated tail is the file's last row
+        if pending.strip():
+            for parts in csv.reader([pending.decode("utf-8", "replace")]):
+                accepted += _ingest_row(parts, year, records)
+
+        new_state = {
+            "length": offset + consumed,
+            "etag": resp.headers.get("etag") or (state or {}).get("etag"),
+            "last_modified": resp.headers.get("last-modified") or (state or {}).get("last_modified"),
+        }
+    return new_state, accepted
+
+
+async def build_index(path: str | None = None, years: list[int] | None = None) -> int:
+    """Download the yearly index CSVs and write a fresh index file.
+
+    Returns the number of EINs indexed.
+    """
+    path = path or settings.filing_index_path
+    if not path:
+        raise ValueError("No filing index path configured (FILING_INDEX_PATH)")
+    records: dict[int, tuple] = {}
+    state: dict[str, dict] = {}
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for year in sorted(years or default_years()):
+            year_state, accepted = await _ingest_year(client, year, records, None)
+            if year_state:
+                state[str(year)] = year_state
+            logger.info("Indexed %d filings from %s", accepted, year)
+    write_index(path, records)
+    _save_state(path, state)
+    return len(records)
+
+
+async def refresh_index(path: str | None = None, years: list[int] | None = None) -> int:
+    """Fetch only new tail bytes of each yearly CSV and merge them into the index.
+
+    Falls back to build_index when there is no existing index or state.
+    Returns the number of new rows merged.
+    """
+    path = path or settings.filing_index_path
+    if not path:
+        raise ValueError("No filing index path configured (FILING_INDEX_PATH)")
+    state = load_state(path)
+    try:
+        existing = FilingIndex(path)
+    except (OSError, ValueError):
+        existing = None
+    if existing is None or not state:
+        if existing is not None:
+            existing.close()
+        await build_index(path, years)
+        return 0
+
+    try:
+        records = existing.records()
+    finally:
+        existing.close()
+
+    merged = 0
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for year in sorted(years or default_years()):
+            year_state, accepted = await _ingest_year(client, year, records, state.get(str(year)))
+            if year_state:
+                state[str(year)] = year_state
+            merged += accepted
+            logger.info("Merged %d new filings from %s", accepted, year)
+
+    if merged:
+        write_index(path, records)
+    _save_state(path, state)
+    return merged
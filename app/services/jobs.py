@@ -0,0 +1,386 @@
+"""Asynchronous bulk verification jobs.
+
+POST /api/v1/jobs (app/routes/jobs.py) validates and dedupes up to
+MAX_JOB_EINS EINs, charges them with check_rate_limit_batch, and
+create_job() splits them into chunks of JOB_CHUNK_SIZE:
+
+    job:{id}            hash: owner, status, counters, callback URL and secret
+    job:{id}:input:{n}  chunk n's EINs (codec-encoded list)
+    job:{id}:page:{n}   chunk n's results, a codec.Document holding the
+                        serialized BatchVerifyResult list (compressed)
+    job:{id}:done       set of finished chunk numbers
+    jobs:stream         one entry per chunk, read by the "verifiers" group
+
+run_worker() is one consumer: it reads a chunk from the stream, resolves
+its EINs exactly like verify_batch (one cache round trip for hits,
+verify_coalesced for misses), stores the page and acks. Entries a crashed
+worker left unacked are reclaimed with XAUTOCLAIM after
+JOB_CLAIM_IDLE_SECONDS. _FINISH_CHUNK_LUA counts each chunk once (usage
+is only recorded by the attempt it counts) and marks the job complete
+when the last chunk lands; until the callback has been handled it keeps
+telling whoever finishes that chunk, so a worker that stops in between
+leaves the callback to the retry. A chunk delivered more than
+JOB_MAX_DELIVERIES times is given up on: its EINs fail, the job can
+still complete, and the entry is copied to jobs:dead.
+
+Callbacks are sent from inside our network, so check_callback_url() only
+accepts hosts that resolve to public addresses, both when the job is
+created and again before the POST, which then connects to the address
+that was checked (Host header and TLS SNI keep the original name). Each job with a callback gets its own
+secret, returned once by POST /jobs; the callback body is signed with it
+in X-NPV-Signature (t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">).
+
+Workers run inside the API (JOB_WORKERS per process) and/or as dedicated
+processes: python -m scripts.job_worker. Everything under job:{id}
+expires after JOB_RESULT_TTL_SECONDS.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import secrets
+import socket
+import time
+from urllib.parse import urlparse
+
+from app.config import settings
+from app.services import usage
+from app.services.verification import cached_verify_many, verify_coalesced
+from app.utils.cache import cache_get, cache_set, cache_set_many, get_redis
+from app.utils.codec import Document
+from app.utils.http import get_client
+from app.utils.serialize import batch_result
+
+logger = logging.getLogger(__name__)
+
+MAX_JOB_EINS = 100_000
+STREAM = "jobs:stream"
+DEAD_STREAM = "jobs:dead"
+GROUP = "verifiers"
+READ_BLOCK_MS = 5000
+CALLBACK_TIMEOUT = 10.0
+SIGNATURE_HEADER = "X-NPV-Signature"
+
+# KEYS: job hash, done set. ARGV: chunk, succeeded, failed, now.
+# Returns {counted, notify}: counted is 0 if this chunk was already counted;
+# notify is 1 while every chunk is done but the callback isn't handled yet.
+_FINISH_CHUNK_LUA = """
+local counted = redis.call("SADD", KEYS[2], ARGV[1])
+if counted == 1 then
+    redis.call("EXPIRE", KEYS[2], redis.call("TTL", KEYS[1]))
+    redis.call("HINCRBY", KEYS[1], "succeeded", ARGV[2])
+    redis.call("HINCRBY", KEYS[1], "failed", ARGV[3])
+    redis.call("HINCRBY", KEYS[1], "chunks_done", 1)
+end
+local job = redis.call("HMGET", KEYS[1], "chunks_done", "chunks", "notified")
+if not job[2] or tonumber(job[1]) ~= tonumber(job[2]) or job[3] then
+    return {counted, 0}
+end
+if redis.call("HGET", KEYS[1], "status") ~= "complete" then
+    redis.call("HSET", KEYS[1], "status", "complete", "completed_at", ARGV[4])
+end
+return {counted, 1}
+"""
+
+_finish_chunk_script = None
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _input_key(job_id: str, chunk: int) -> str:
+    return f"job:{job_id}:input:{chunk}"
+
+
+def _page_key(job_id: str, chunk: int) -> str:
+    return f"job:{job_id}:page:{chunk}"
+
+
+def _done_key(job_id: str) -> str:
+    return f"job:{job_id}:done"
+
+
+async def _resolve_callback(url: str) -> tuple[str | None, str | None]:
+    """(address to connect to, None) for an acceptable callback URL, else (None, why not).
+
+    Every address the host resolves to must be public: loopback, private,
+    link-local (e.g. cloud metadata at 169.254.169.254), reserved and
+    multicast ranges are refused.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return None, "callback_url must be an http(s) URL."
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        infos = await asyncio.get_running_loop().getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM)
+    except (OSError, ValueError):
+        infos = []
+    if not infos:
+        return None, f"callback_url host '{parsed.hostname}' could not be resolved."
+    addresses = [ipaddress.ip_address(sockaddr[0].split("%")[0]) for *_, sockaddr in infos]
+    for address in addresses:
+        if not address.is_global or address.is_multicast:
+            return None, "callback_url must resolve to a public address."
+    return str(addresses[0]), None
+
+
+async def check_callback_url(url: str) -> str | None:
+    """Why url can't be a callback target, or None if it can."""
+    return (await _resolve_callback(url))[1]
+
+
+def sign_callback(secret: str, body: bytes, timestamp: int) -> str:
+    """The X-NPV-Signature value for a callback body."""
+    digest = hmac.new(secret.encode(), b"%d." % timestamp + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+async def create_job(api_key_id, normalized_eins: list[str], callback_url: str | None) -> dict:
+    """Store a job's input chunks and queue them.
+
+    Returns the job's status, plus the callback_secret that signs its
+    callback (only ever returned here).
+    """
+    job_id = secrets.token_hex(12)
+    callback_secret = secrets.token_hex(32) if callback_url else ""
+    ttl = settings.job_result_ttl_seconds
+    size = settings.job_chunk_size
+    chunks = [normalized_eins[i:i + size] for i in range(0, len(normalized_eins), size)]
+
+    await cache_set_many([(_input_key(job_id, n), chunk, ttl) for n, chunk in enumerate(chunks)])
+    r = await get_redis()
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(job_id), mapping={
+            "api_key_id": str(api_key_id),
+            "status": "queued",
+            "total": len(normalized_eins),
+            "chunks": len(chunks),
+            "chunks_done": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "created_at": int(time.time()),
+            "callback_url": callback_url or "",
+            "callback_secret": callback_secret,
+        })
+        pipe.expire(_job_key(job_id), ttl)
+        for n in range(len(chunks)):
+            pipe.xadd(STREAM, {"job": job_id, "chunk": n}, maxlen=settings.job_stream_maxlen, approximate=True)
+        await pipe.execute()
+    status = await job_status(job_id)
+    status["callback_secret"] = callback_secret or None
+    return status
+
+
+async def job_status(job_id: str) -> dict | None:
+    r = await get_redis()
+    job = await r.hgetall(_job_key(job_id))
+    if not job:
+        return None
+    chunks, chunks_done = int(job["chunks"]), int(job["chunks_done"])
+    succeeded, failed = int(job["succeeded"]), int(job["failed"])
+    return {
+        "job_id": job_id,
+        "api_key_id": job["api_key_id"],
+        "status": job["status"],
+        "total": int(job["total"]),
+        "processed": succeeded + failed,
+        "succeeded": succeeded,
+        "failed": failed,
+        "pages": chunks,
+        "pages_ready": chunks_done,
+        "created_at": int(job["created_at"]),
+        "completed_at": int(job["completed_at"]) if job.get("completed_at") else None,
+        "callback_url": job["callback_url"] or None,
+    }
+
+
+async def result_page(job_id: str, page: int) -> bytes | None:
+    """Serialized results of one page (a JSON array body without brackets), or None if not ready."""
+    document = await cache_get(_page_key(job_id, page))
+    return document.body if document is not None else None
+
+
+async def _finish_chunk():
+    global _finish_chunk_script
+    if _finish_chunk_script is None:
+        r = await get_redis()
+        _finish_chunk_script = r.register_script(_FINISH_CHUNK_LUA)
+    return _finish_chunk_script
+
+
+async def process_chunk(job_id: str, chunk: int):
+    """Verify one chunk's EINs, store its result page and update the job."""
+    r = await get_redis()
+    job = await r.hmget(_job_key(job_id), "api_key_id", "status")
+    eins = await cache_get(_input_key(job_id, chunk))
+    if job[0] is None or eins is None:
+        logger.warning("Job %s chunk %d expired before it was processed", job_id, chunk)
+        return
+    if await r.sismember(_done_key(job_id), chunk):
+        # A retry after the page was stored and counted; only the ending may be missing
+        await _finish(job_id, chunk, 0, 0, [])
+        return
+    if job[1] == "queued":
+        await r.hset(_job_key(job_id), "status", "running")
+
+    try:
+        cached = await cached_verify_many(eins)
+    except Exception:
+        cached = {}
+    limit = asyncio.Semaphore(settings.job_worker_concurrency)
+
+    async def resolve(normalized: str) -> tuple[bytes, bool, tuple]:
+        start = time.time()
+        try:
+            document = cached.get(normalized)
+            if document is None:
+                async with limit:
+                    document = await verify_coalesced(normalized)
+            error = f"No nonprofit found with EIN {normalized}" if document.not_found else None
+        except Exception as e:
+            document, error = None, str(e)
+        ok = error is None
+        usage_row = (
+            job[0], "job", normalized, 200 if ok else 404, int((time.time() - start) * 1000),
+            normalized in cached,
+        )
+        return batch_result(normalized, document.body if ok else None, error), ok, usage_row
+
+    results = await asyncio.gather(*[resolve(normalized) for normalized in eins])
+    succeeded = sum(ok for _, ok, _ in results)
+    await _store_page(job_id, chunk, [fragment for fragment, _, _ in results])
+    await _finish(job_id, chunk, succeeded, len(eins) - succeeded, [row for _, _, row in results])
+
+
+async def fail_chunk(job_id: str, chunk: int, reason: str):
+    """Give up on a chunk: each of its EINs fails with reason, so the job can still complete."""
+    eins = await cache_get(_input_key(job_id, chunk))
+    if eins is None:
+        return
+    await _store_page(job_id, chunk, [batch_result(normalized, None, reason) for normalized in eins])
+    await _finish(job_id, chunk, 0, len(eins), [])
+
+
+async def _store_page(job_id: str, chunk: int, fragments: list[bytes]):
+    r = await get_redis()
+    ttl = max(await r.ttl(_job_key(job_id)), 1)
+    expires_at = time.time() + ttl
+    await cache_set(_page_key(job_id, chunk), Document(b",".join(fragments), expires_at, expires_at), ttl)
+
+
+async def _finish(job_id: str, chunk: int, succeeded: int, failed: int, usage_rows: list[tuple]):
+    """Count the chunk (once), record its usage if this attempt counted it, and complete the job."""
+    script = await _finish_chunk()
+    counted, notify = await script(
+        keys=[_job_key(job_id), _done_key(job_id)],
+        args=[chunk, succeeded, failed, int(time.time())],
+    )
+    if counted:
+        for row in usage_rows:
+            usage.record(*row)
+    if notify:
+        await _notify(job_id)
+
+
+async def _notify(job_id: str):
+    """Send a complete job's callback, then mark it handled."""
+    status = await job_status(job_id)
+    if status["callback_url"]:
+        await _send_callback(status)
+    r = await get_redis()
+    await r.hset(_job_key(job_id), "notified", 1)
+
+
+async def _send_callback(status: dict):
+    """POST the finished job's status to its callback URL, signed. Best-effort."""
+    url = status["callback_url"]
+    # Check again, since the host may resolve elsewhere by now, and connect
+    # to exactly the address checked rather than letting httpx resolve it
+    address, problem = await _resolve_callback(url)
+    if problem:
+        logger.warning("Skipping callback for job %s to %s: %s", status["job_id"], url, problem)
+        return
+    parsed = urlparse(url)
+    host = f"[{address}]" if ":" in address else address
+    pinned_url = parsed._replace(netloc=f"{host}:{parsed.port}" if parsed.port else host).geturl()
+    auth = (parsed.username, parsed.password or "") if parsed.username else None
+    r = await get_redis()
+    secret = await r.hget(_job_key(status["job_id"]), "callback_secret")
+    payload = {k: v for k, v in status.items() if k not in ("api_key_id", "callback_url")}
+    payload["results_url"] = f"{settings.base_url}/api/v1/jobs/{status['job_id']}/results"
+    body = json.dumps(payload).encode()
+    headers = {"Content-Type": "application/json", "Host": parsed.netloc.rpartition("@")[2]}
+    if secret:
+        headers[SIGNATURE_HEADER] = sign_callback(secret, body, int(time.time()))
+    try:
+        # Redirects aren't followed, so the checked address is the only one contacted
+        client = get_client("callbacks", timeout=CALLBACK_TIMEOUT)
+        resp = await client.post(
+            pinned_url, content=body, headers=headers, auth=auth,
+            extensions={"sni_hostname": parsed.hostname},
+        )
+        resp.raise_for_status()
+    except Exception as e:
+        logger.warning("Callback for job %s to %s failed: %s", status["job_id"], url, e)
+
+
+async def _ensure_group(r):
+    try:
+        await r.xgroup_create(STREAM, GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def consumer_name(index: int = 0) -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{index}"
+
+
+async def _deliveries(r, entry_id: str) -> int:
+    """How many times a pending entry has been delivered, this time included."""
+    pending = await r.xpending_range(STREAM, GROUP, min=entry_id, max=entry_id, count=1)
+    return pending[0]["times_delivered"] if pending else 1
+
+
+async def _dead_letter(r, entry_id: str, fields: dict, deliveries: int):
+    job_id, chunk = fields["job"], int(fields["chunk"])
+    logger.warning("Giving up on job %s chunk %d after %d deliveries", job_id, chunk, deliveries)
+    await r.xadd(
+        DEAD_STREAM, {"job": job_id, "chunk": chunk, "entry": entry_id, "deliveries": deliveries},
+        maxlen=settings.job_stream_maxlen, approximate=True,
+    )
+    await fail_chunk(job_id, chunk, f"Verification failed after {deliveries} attempts")
+
+
+async def run_worker(consumer: str):
+    """Process job chunks until cancelled."""
+    while True:
+        try:
+            r = await get_redis()
+            await _ensure_group(r)
+            while True:
+                # Chunks a crashed worker left behind first, then new ones
+                claimed = (await r.xautoclaim(
+                    STREAM, GROUP, consumer, min_idle_time=settings.job_claim_idle_seconds * 1000, count=1
+                ))[1]
+                entries = claimed
+                if not entries:
+                    streams = await r.xreadgroup(GROUP, consumer, {STREAM: ">"}, count=1, block=READ_BLOCK_MS)
+                    entries = streams[0][1] if streams else []
+                for entry_id, fields in entries:
+                    deliveries = await _deliveries(r, entry_id) if claimed else 1
+                    if deliveries > settings.job_max_deliveries:
+                        await _dead_letter(r, entry_id, fields, deliveries)
+                    else:
+                        await process_chunk(fields["job"], int(fields["chunk"]))
+                    await r.xack(STREAM, GROUP, entry_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Job worker %s failed, restarting: %s", consumer, e)
+            await asyncio.sleep(1)
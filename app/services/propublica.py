@@ -1,5 +1,8 @@
 import httpx
 
+from app.config import settings
+from app.utils.http import get_client
+
 PROPUBLICA_BASE = "https://projects.propublica.org/nonprofits/api/v2"
 
 
@@ -13,12 +16,12 @@ async def fetch_organization(ein_digits: str) -> dict | None:
         Full API response dict, or None if not found / error.
     """
     url = f"{PROPUBLICA_BASE}/organizations/{ein_digits}.json"
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            resp = await client.get(url)
-            if resp.status_code == 404:
-                return None
-            resp.raise_for_status()
-            return resp.json()
-        except httpx.HTTPError:
+    client = get_client("propublica", timeout=settings.propublica_timeout)
+    try:
+        resp = await client.get(url)
+        if resp.status_code == 404:
             return None
+        resp.raise_for_status()
+        return resp.json()
+    except httpx.HTTPError:
+        return None
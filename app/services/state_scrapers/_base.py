@@ -2,15 +2,30 @@
 
 import httpx
 
-TIMEOUT = 15.0
+from app.config import settings
+from app.utils import http
+
 USER_AGENT = "NonprofitVerify/1.0 (nonprofit verification service)"
 
 
-def get_client(**kwargs) -> httpx.AsyncClient:
-    """Create a configured httpx client for state scraping."""
-    return httpx.AsyncClient(
-        timeout=TIMEOUT,
+def get_client(state: str) -> httpx.AsyncClient:
+    """Shared keep-alive client for one state's registry site.
+
+    The client is app-lifetime; don't close it after a lookup.
+    """
+    return http.get_client(
+        f"state:{state}",
+        timeout=settings.state_registry_timeout,
         follow_redirects=True,
         headers={"User-Agent": USER_AGENT},
-        **kwargs,
     )
+
+
+def session_cookies(resp: httpx.Response) -> dict[str, str]:
+    """Cookie header for replaying a response's session cookies.
+
+    Shared clients keep no cookie jar, so multi-step flows forward them.
+    """
+    if not resp.cookies:
+        return {}
+    return {"Cookie": "; ".join(f"{name}={value}" for name, value in resp.cookies.items())}
@@ -13,8 +13,9 @@ import re
 
 from bs4 import BeautifulSoup
 
-from app.services.state_scrapers._base import get_client
+from app.services.state_scrapers._base import get_client, session_cookies
 from app.utils.cache import cache_get, cache_set
+from app.utils.executor import run_parser
 
 logger = logging.getLogger(__name__)
 
@@ -40,37 +41,37 @@ async def check_california(ein_digits: str) -> dict | None:
 async def _scrape(ein_digits: str) -> dict | None:
     """Perform the two-step ASP.NET form search."""
     try:
-        async with get_client() as client:
-            # Step 1: GET the page to obtain viewstate tokens
-            get_resp = await client.get(SEARCH_URL)
-            if get_resp.status_code != 200:
-                logger.warning("CA search GET returned %s", get_resp.status_code)
-                return None
-
-            tokens = _extract_asp_tokens(get_resp.text)
-            if not tokens:
-                logger.warning("CA search: could not extract ASP.NET tokens")
-                return None
-
-            # Step 2: POST with FEIN
-            form_data = {
-                **tokens,
-                "t_web_lookup__federal_id": ein_digits,
-                "t_web_lookup__license_no": "",
-                "t_web_lookup__charter_number": "",
-                "t_web_lookup__full_name": "",
-                "t_web_lookup__doing_business_as": "",
-                "t_web_lookup__profession_name": "",
-                "t_web_lookup__license_type_name": "",
-                "t_web_lookup__license_status_name": "",
-                "sch_button": "Search",
-            }
-            post_resp = await client.post(SEARCH_URL, data=form_data)
-            if post_resp.status_code != 200:
-                logger.warning("CA search POST returned %s", post_resp.status_code)
-                return None
-
-            return parse_ca_results(post_resp.text, ein_digits)
+        client = get_client("CA")
+        # Step 1: GET the page to obtain viewstate tokens
+        get_resp = await client.get(SEARCH_URL)
+        if get_resp.status_code != 200:
+            logger.warning("CA search GET returned %s", get_resp.status_code)
+            return None
+
+        tokens = await run_parser(_extract_asp_tokens, get_resp.text)
+        if not tokens:
+            logger.warning("CA search: could not extract ASP.NET tokens")
+            return None
+
+        # Step 2: POST with FEIN
+        form_data = {
+            **tokens,
+            "t_web_lookup__federal_id": ein_digits,
+            "t_web_lookup__license_no": "",
+            "t_web_lookup__charter_number": "",
+            "t_web_lookup__full_name": "",
+            "t_web_lookup__doing_business_as": "",
+            "t_web_lookup__profession_name": "",
+            "t_web_lookup__license_type_name": "",
+            "t_web_lookup__license_status_name": "",
+            "sch_button": "Search",
+        }
+        post_resp = await client.post(SEARCH_URL, data=form_data, headers=session_cookies(get_resp))
+        if post_resp.status_code != 200:
+            logger.warning("CA search POST returned %s", post_resp.status_code)
+            return None
+
+        return await run_parser(parse_ca_results, post_resp.text, ein_digits)
     except Exception:
         logger.exception("CA scraper failed for EIN %s", ein_digits)
         return None
@@ -13,6 +13,7 @@ from bs4 import BeautifulSoup
 
 from app.services.state_scrapers._base import get_client
 from app.utils.cache import cache_get, cache_set
+from app.utils.executor import run_parser
 
 logger = logging.getLogger(__name__)
 
@@ -56,13 +57,13 @@ async def _scrape(ein_digits: str) -> dict | None:
     }
 
     try:
-        async with get_client() as client:
-            resp = await client.post(SEARCH_URL, data=form_data)
-            if resp.status_code != 200:
-                logger.warning("NY search returned %s", resp.status_code)
-                return None
+        client = get_client("NY")
+        resp = await client.post(SEARCH_URL, data=form_data)
+        if resp.status_code != 200:
+            logger.warning("NY search returned %s", resp.status_code)
+            return None
 
-            return parse_ny_results(resp.text, ein_digits)
+        return await run_parser(parse_ny_results, resp.text, ein_digits)
     except Exception:
         logger.exception("NY scraper failed for EIN %s", ein_digits)
         return None
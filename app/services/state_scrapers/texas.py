@@ -59,14 +59,14 @@ async def _search(ein_digits: str) -> dict | None:
     candidates = _ein_to_tp_candidates(ein_digits)
 
     try:
-        async with get_client() as client:
-            # The API returns all records; we request a small page and check
-            # if any candidate tp_id appears in the first results.
-            # Since we can't filter server-side, we try fetching by tp_id directly.
-            for tp_id in candidates:
-                result = await _try_tp_id(client, tp_id)
-                if result:
-                    return result
+        client = get_client("TX")
+        # The API returns all records; we request a small page and check
+        # if any candidate tp_id appears in the first results.
+        # Since we can't filter server-side, we try fetching by tp_id directly.
+        for tp_id in candidates:
+            result = await _try_tp_id(client, tp_id)
+            if result:
+                return result
     except Exception:
         logger.exception("TX scraper failed for EIN %s", ein_digits)
 
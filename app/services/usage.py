@@ -0,0 +1,352 @@
+"""Buffered recording of API usage.
+
+record() appends a row to an in-process buffer and returns at once; no
+request waits on Postgres. run_usage_recorder() drains the buffer with
+copy_records_to_table every USAGE_FLUSH_INTERVAL_MS, or sooner once
+USAGE_FLUSH_ROWS rows are waiting, and once more on shutdown.
+
+The buffer holds at most USAGE_BUFFER_MAX_ROWS rows. While Postgres is
+slow or down, failed batches go back into it, and rows beyond the cap are
+handled per USAGE_OVERFLOW:
+
+- drop: discarded and counted (usage is for analytics; requests matter more)
+- spill: appended to USAGE_SPILL_PATH as JSON lines, and loaded back once
+  a flush succeeds again
+
+api_usage is partitioned by month (migrations/005_usage_partitions.sql);
+every COPY is also folded into usage_aggregates by a trigger.
+ensure_partitions() and drop_expired_partitions() keep the partitions
+ahead of time and within USAGE_RETENTION_MONTHS; run them daily with
+scripts/maintain_usage_partitions.py.
+
+usage_report() answers /api/v1/usage from the usage_daily and
+usage_aggregates rollups: one row per day or month, whatever the traffic.
+Latency percentiles come from the rollups' fixed-bucket histograms, which
+add element-wise, so any range merges exactly.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import deque
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+from app.config import settings
+from app.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+USAGE_COLUMNS = (
+    "api_key_id", "endpoint", "ein", "response_status", "response_time_ms", "cache_hit", "created_at",
+)
+
+# Histogram bucket bounds; must match usage_latency_bounds() in migrations/005.
+# Bucket i counts latencies in [LATENCY_BOUNDS_MS[i - 1], LATENCY_BOUNDS_MS[i]),
+# the last one everything from 10 s up.
+LATENCY_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_ROLLUP_COLUMNS = """sum(requests)::BIGINT AS requests,
+           sum(cache_hits)::BIGINT AS cache_hits,
+           sum(not_found)::BIGINT AS not_found,
+           sum(latency_sum_ms)::BIGINT AS latency_sum_ms,
+           usage_histogram_sum(latency_buckets) AS latency_buckets"""
+
+_DAILY_SQL = f"""
+    SELECT day AS period, {_ROLLUP_COLUMNS}
+    FROM usage_daily
+    WHERE api_key_id = $1 AND day BETWEEN $2 AND $3 AND ($4::TEXT IS NULL OR endpoint = $4)
+    GROUP BY day ORDER BY day
+"""
+
+_MONTHLY_SQL = f"""
+    SELECT month AS period, {_ROLLUP_COLUMNS}
+    FROM usage_aggregates
+    WHERE api_key_id = $1 AND month BETWEEN $2 AND $3 AND ($4::TEXT IS NULL OR endpoint = $4)
+    GROUP BY month ORDER BY month
+"""
+
+PARTITION_NAME = re.compile(r"^api_usage_(\d{4})_(\d{2})$")
+
+_buffer: deque[tuple] = deque()
+_flush_due = asyncio.Event()
+_stats = {"recorded": 0, "written": 0, "dropped": 0, "spilled": 0, "failed_flushes": 0}
+
+
+def record(
+    api_key_id, endpoint: str, ein: str | None, status: int, elapsed_ms: int, cache_hit: bool,
+):
+    """Queue one api_usage row. Never blocks or raises."""
+    _stats["recorded"] += 1
+    _add([(api_key_id, endpoint, ein, status, elapsed_ms, cache_hit, datetime.now(timezone.utc))])
+
+
+def _add(rows: list[tuple], front: bool = False):
+    room = settings.usage_buffer_max_rows - len(_buffer)
+    keep, overflow = rows[:max(room, 0)], rows[max(room, 0):]
+    if front:
+        _buffer.extendleft(reversed(keep))
+    else:
+        _buffer.extend(keep)
+    if overflow:
+        _overflow(overflow)
+    if len(_buffer) >= settings.usage_flush_rows:
+        _flush_due.set()
+
+
+def _overflow(rows: list[tuple]):
+    if settings.usage_overflow == "spill":
+        try:
+            _spill(rows)
+            _stats["spilled"] += len(rows)
+            return
+        except OSError as e:
+            logger.warning("Failed to spill %d usage rows: %s", len(rows), e)
+    _stats["dropped"] += len(rows)
+
+
+def _from_spill(line: str) -> tuple:
+    api_key_id, endpoint, ein, status, elapsed_ms, cache_hit, created_at = json.loads(line)
+    return (
+        UUID(api_key_id) if api_key_id else None, endpoint, ein, status, elapsed_ms, cache_hit,
+        datetime.fromisoformat(created_at),
+    )
+
+
+async def _copy(rows: list[tuple]):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table("api_usage", records=rows, columns=USAGE_COLUMNS)
+
+
+async def flush() -> int:
+    """Write everything buffered (and any spilled rows). Returns rows written."""
+    written = 0
+    while _buffer:
+        batch = [_buffer.popleft() for _ in range(min(len(_buffer), settings.usage_flush_rows))]
+        try:
+            await _copy(batch)
+        except Exception as e:
+            _stats["failed_flushes"] += 1
+            logger.warning("Failed to write %d usage rows: %s", len(batch), e)
+            _add(batch, front=True)
+            return written
+        written += len(batch)
+    written += await _load_spill()
+    _stats["written"] += written
+    _flush_due.clear()
+    return written
+
+
+def _spill(rows: list[tuple]):
+    with open(settings.usage_spill_path, "a") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str) + "\n")
+
+
+def _read_spill_batch(f, size: int) -> tuple[list[tuple], int]:
+    """Up to size parsed rows from the spill file, and how many unreadable lines were skipped."""
+    rows: list[tuple] = []
+    bad = 0
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            rows.append(_from_spill(line))
+        except (ValueError, TypeError) as e:
+            # e.g. a line cut short by a crash mid-_spill
+            logger.warning("Dropping unreadable spilled usage row %r: %s", line[:200], e)
+            bad += 1
+        if len(rows) == size:
+            break
+    return rows, bad
+
+
+def _respill(rows: list[tuple], f):
+    """Append a batch that failed to COPY, then the unread rest of f, to a fresh spill file."""
+    _spill(rows)
+    with open(settings.usage_spill_path, "a") as spill:
+        for line in f:
+            if line.strip():
+                spill.write(line)
+
+
+async def _load_spill() -> int:
+    """COPY spilled rows back in, USAGE_FLUSH_ROWS at a time, then remove the file.
+
+    The file is read as it is copied, so a spill left by a long outage never
+    has to fit in memory; file I/O runs in a thread. Unreadable lines are
+    dropped and counted; only a failed COPY puts rows back for the next try.
+    """
+    path = settings.usage_spill_path
+    if settings.usage_overflow != "spill" or not await asyncio.to_thread(os.path.exists, path):
+        return 0
+    loading = path + ".loading"
+    await asyncio.to_thread(os.replace, path, loading)  # new spills go to a fresh file meanwhile
+    loaded = 0
+    f = await asyncio.to_thread(open, loading)
+    try:
+        while True:
+            rows, bad = await asyncio.to_thread(_read_spill_batch, f, settings.usage_flush_rows)
+            _stats["dropped"] += bad
+            if not rows:
+                break
+            try:
+                await _copy(rows)
+            except Exception as e:
+                logger.warning("Failed to load spilled usage rows, will retry: %s", e)
+                await asyncio.to_thread(_respill, rows, f)
+                break
+            loaded += len(rows)
+    finally:
+        f.close()
+    await asyncio.to_thread(os.remove, loading)
+    return loaded
+
+
+async def run_usage_recorder():
+    """Drain the buffer periodically. Runs for the app's lifetime; flushes once more on cancel."""
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_flush_due.wait(), settings.usage_flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            await flush()
+            if _flush_due.is_set():
+                # Still full after a failed flush; don't spin on Postgres
+                await asyncio.sleep(settings.usage_flush_interval_ms / 1000)
+    finally:
+        await flush()
+        if _buffer:
+            # Postgres is unreachable; keep what the policy allows
+            _overflow(list(_buffer))
+            _buffer.clear()
+
+
+def usage_stats() -> dict:
+    return {"buffered": len(_buffer), **_stats}
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def ensure_partitions(conn, months_ahead: int) -> list[date]:
+    """Create api_usage partitions for this month and the next months_ahead.
+
+    Also creates one for any month whose rows ended up in api_usage_default
+    (say the job didn't run for a while); ensure_usage_partition() moves
+    them in. Returns the months, ascending.
+    """
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    months = {_add_months(this_month, n) for n in range(months_ahead + 1)}
+    stranded = await conn.fetch(
+        "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::DATE AS month FROM api_usage_default"
+    )
+    months.update(row["month"] for row in stranded)
+    for month in sorted(months):
+        await conn.execute("SELECT ensure_usage_partition($1)", month)
+    return sorted(months)
+
+
+async def drop_expired_partitions(conn, retention_months: int) -> list[str]:
+    """Drop partitions whose month ended more than retention_months ago.
+
+    Their rows are already counted in usage_aggregates, which is kept.
+    """
+    cutoff = _add_months(datetime.now(timezone.utc).date().replace(day=1), -retention_months)
+    rows = await conn.fetch(
+        """SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+           WHERE i.inhparent = 'api_usage'::regclass"""
+    )
+    dropped = []
+    for row in rows:
+        match = PARTITION_NAME.match(row["relname"])
+        if match and date(int(match[1]), int(match[2]), 1) < cutoff:
+            await conn.execute(f'DROP TABLE "{row["relname"]}"')
+            dropped.append(row["relname"])
+    return sorted(dropped)
+
+
+def latency_percentile(buckets: list[int], q: float) -> float | None:
+    """Estimate the q-quantile (0-1) latency from a histogram, interpolating within its bucket."""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(buckets):
+        if n and seen + n >= rank:
+            lower = LATENCY_BOUNDS_MS[i - 1] if i else 0
+            if i == len(LATENCY_BOUNDS_MS):
+                return float(lower)  # open-ended last bucket
+            return lower + (LATENCY_BOUNDS_MS[i] - lower) * (rank - seen) / n
+        seen += n
+    return float(LATENCY_BOUNDS_MS[-1])
+
+
+def merge_histograms(histograms: list[list[int]]) -> list[int]:
+    merged = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+    for buckets in histograms:
+        for i, n in enumerate(buckets):
+            merged[i] += n
+    return merged
+
+
+def _ratio(part: int, whole: int) -> float | None:
+    return round(part / whole, 4) if whole else None
+
+
+def _summary(requests: int, cache_hits: int, not_found: int, latency_sum_ms: int, buckets: list[int]) -> dict:
+    return {
+        "requests": requests,
+        "cache_hits": cache_hits,
+        "cache_hit_ratio": _ratio(cache_hits, requests),
+        "not_found": not_found,
+        "not_found_rate": _ratio(not_found, requests),
+        "latency_ms": {
+            "avg": round(latency_sum_ms / requests, 1) if requests else None,
+            **{
+                name: None if (p := latency_percentile(buckets, q)) is None else round(p, 1)
+                for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+            },
+        },
+    }
+
+
+async def usage_report(
+    conn, api_key_id, granularity: str, start: date, end: date, endpoint: str | None = None,
+) -> dict:
+    """Per-day or per-month usage for one key between start and end (inclusive), plus the total."""
+    if granularity == "month":
+        start = start.replace(day=1)
+        rows = await conn.fetch(_MONTHLY_SQL, api_key_id, start, end, endpoint)
+    else:
+        rows = await conn.fetch(_DAILY_SQL, api_key_id, start, end, endpoint)
+
+    periods = []
+    for row in rows:
+        buckets = list(row["latency_buckets"])
+        periods.append({
+            "period": row["period"],
+            **_summary(row["requests"], row["cache_hits"], row["not_found"], row["latency_sum_ms"], buckets),
+        })
+    total = _summary(
+        sum(row["requests"] for row in rows),
+        sum(row["cache_hits"] for row in rows),
+        sum(row["not_found"] for row in rows),
+        sum(row["latency_sum_ms"] for row in rows),
+        merge_histograms([row["latency_buckets"] for row in rows]),
+    )
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "endpoint": endpoint,
+        "periods": periods,
+        "total": total,
+    }
@@ -0,0 +1,82 @@
+"""Cached EIN verification shared by every endpoint that verifies.
+
+cached_verify() and cached_verify_many() read verify:{digits} entries,
+refreshing stale ones in the background; verify_coalesced() is the
+cache-miss path, run once per EIN however many requests want it at the
+same time. Results are Documents holding the serialized VerifyResponse.
+"""
+
+from functools import partial
+
+from app.config import settings
+from app.services.enricher import verify_organization
+from app.utils import singleflight
+from app.utils.cache import cache_get, cache_get_many, cache_set, swr_document, swr_unwrap
+from app.utils.codec import Document
+from app.utils.ein import ein_to_digits
+from app.utils.serialize import dump_verify
+
+
+async def cached_verify(normalized: str) -> Document | None:
+    """Cached result (or 404 marker) for an EIN, refreshing it in the background if stale."""
+    cache_key = f"verify:{ein_to_digits(normalized)}"
+    return _unwrap_verify(normalized, await cache_get(cache_key))
+
+
+async def cached_verify_many(normalized_eins: list[str]) -> dict[str, Document]:
+    """cached_verify for several EINs with a single cache round trip.
+
+    Returns {normalized EIN: cached result} for the EINs that were cached.
+    """
+    keys = {f"verify:{ein_to_digits(normalized)}": normalized for normalized in normalized_eins}
+    found = {}
+    for cache_key, entry in (await cache_get_many(list(keys))).items():
+        cached = _unwrap_verify(keys[cache_key], entry)
+        if cached is not None:
+            found[keys[cache_key]] = cached
+    return found
+
+
+def _unwrap_verify(normalized: str, entry) -> Document | None:
+    cached, stale = swr_unwrap(entry)
+    if stale:
+        singleflight.refresh_in_background(
+            f"verify:{ein_to_digits(normalized)}", partial(_verify_and_cache, normalized)
+        )
+    return cached
+
+
+async def _fresh_verify(cache_key: str) -> Document | None:
+    cached, stale = swr_unwrap(await cache_get(cache_key))
+    return None if stale else cached
+
+
+async def _verify_and_cache(normalized: str) -> Document:
+    """Cache-miss path: run the enricher and cache its result (or a 404 marker).
+
+    The response is serialized here, once; these bytes are both cached and
+    sent, now and on every hit.
+    Returns the cached Document, so callers handle it like a cache hit.
+    """
+    cache_key = f"verify:{ein_to_digits(normalized)}"
+    result = await verify_organization(normalized)
+    if result is None:
+        document = swr_document(
+            b"null", settings.cache_404_soft_ttl_seconds, settings.cache_404_ttl_seconds, not_found=True
+        )
+        await cache_set(cache_key, document, settings.cache_404_ttl_seconds)
+        return document
+
+    document = swr_document(
+        dump_verify(result), settings.cache_soft_ttl_seconds, settings.cache_ttl_seconds
+    )
+    await cache_set(cache_key, document, settings.cache_ttl_seconds)
+    return document
+
+
+async def verify_coalesced(normalized: str) -> Document:
+    """_verify_and_cache, shared by every concurrent lookup of the same EIN."""
+    cache_key = f"verify:{ein_to_digits(normalized)}"
+    return await singleflight.run(
+        cache_key, partial(_verify_and_cache, normalized), partial(_fresh_verify, cache_key)
+    )
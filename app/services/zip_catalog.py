@@ -0,0 +1,327 @@
+"""Object-ID → ZIP byte-offset catalog for the IRS 990 e-file archives.
+
+Opening a remote archive for every lookup re-downloads its central
+directory before reading one member. Instead we harvest each archive's
+central directory once and persist, per OBJECT_ID, where its member lives.
+Fetching a filing is then a single HTTP Range request plus an inflate.
+
+File layout (all integers little-endian, same scheme as filing_index):
+
+    header   magic(8s) count(I) archives_offset(Q) archives_len(I)
+    ids      count x uint64 OBJECT_ID, sorted ascending
+    entries  count x ENTRY, parallel to ids
+    archives newline-joined "{year}/{zip_filename}" referenced by ENTRY.archive_idx
+
+Each archive's size and ETag when it was harvested are kept beside the
+catalog in {path}.state.json; an archive the IRS has since republished is
+harvested again.
+
+Build/update with:
+    python -m scripts.build_zip_catalog [path]
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+
+import httpx
+
+from app.config import settings
+from app.services import async_zip
+
+logger = logging.getLogger(__name__)
+
+IRS_XML_BASE = "https://apps.irs.gov/pub/epostcard/990/xml"
+MAGIC = b"NPVZCAT1"
+HEADER = struct.Struct("<8sIQI")
+ID_ENTRY = struct.Struct("<Q")
+# archive_idx, header_offset, compress_size, file_size, crc32, method, name_len
+ENTRY = struct.Struct("<HQIIIHH")
+
+MEMBER_SUFFIX = "_public.xml"
+
+_catalog: "ZipCatalog | None" = None
+
+
+class ZipCatalog:
+    """Read-only view over a built catalog file, memory-mapped."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.identity = (st.st_ino, st.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, archives_offset, archives_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a ZIP catalog")
+        self._ids_offset = HEADER.size
+        self._entries_offset = self._ids_offset + self.count * ID_ENTRY.size
+        blob = self._mm[archives_offset:archives_offset + archives_len].decode()
+        self.archives = blob.split("\n") if blob else []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    def _id_at(self, i: int) -> int:
+        return ID_ENTRY.unpack_from(self._mm, self._ids_offset + i * ID_ENTRY.size)[0]
+
+    def _find(self, object_id: int) -> int | None:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_at(mid) < object_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._id_at(lo) == object_id:
+            return lo
+        return None
+
+    def _entry_at(self, i: int) -> tuple:
+        archive_idx, *rest = ENTRY.unpack_from(self._mm, self._entries_offset + i * ENTRY.size)
+        return (self.archives[archive_idx], *rest)
+
+    def lookup(self, object_id: str) -> dict | None:
+        """Return member location for an OBJECT_ID, or None."""
+        if not object_id.isdigit():
+            return None
+        i = self._find(int(object_id))
+        if i is None:
+            return None
+        return _entry_to_member(self._entry_at(i))
+
+    def entries(self) -> dict[int, tuple]:
+        """Load every entry into a dict, for merging into a rebuilt catalog."""
+        return {self._id_at(i): self._entry_at(i) for i in range(self.count)}
+
+
+def _entry_to_member(entry: tuple) -> dict:
+    archive, header_offset, compress_size, file_size, crc, method, name_len = entry
+    return {
+        "archive": archive,
+        "header_offset": header_offset,
+        "compress_size": compress_size,
+        "file_size": file_size,
+        "crc32": crc,
+        "compress_type": method,
+        "name_len": name_len,
+    }
+
+
+# --- Process-wide catalog ---
+
+
+def open_catalog(path: str | None = None) -> bool:
+    """Map the catalog file for this process. Returns the readiness flag."""
+    global _catalog
+    path = path or settings.zip_catalog_path
+    if not path:
+        return False
+    try:
+        new_catalog = ZipCatalog(path)
+    except (OSError, ValueError) as e:
+        logger.warning("ZIP catalog unavailable at %s: %s", path, e)
+        return False
+    old, _catalog = _catalog, new_catalog
+    if old is not None:
+        old.close()
+    logger.info("Mapped ZIP catalog %s (%d members)", path, len(new_catalog))
+    return True
+
+
+def close_catalog():
+    global _catalog
+    if _catalog is not None:
+        _catalog.close()
+        _catalog = None
+
+
+def reload_if_changed() -> bool:
+    """Remap the catalog if its file was replaced. Returns True if remapped."""
+    if _catalog is None:
+        return open_catalog()
+    try:
+        st = os.stat(_catalog.path)
+    except OSError:
+        return False
+    if (st.st_ino, st.st_mtime_ns) == _catalog.identity:
+        return False
+    return open_catalog(_catalog.path)
+
+
+def is_ready() -> bool:
+    return _catalog is not None
+
+
+def lookup(object_id: str) -> dict | None:
+    """Find where an OBJECT_ID's XML lives. Requires is_ready()."""
+    if _catalog is None:
+        return None
+    return _catalog.lookup(object_id)
+
+
+# --- Reading ---
+
+
+def archive_url(archive: str) -> str:
+    return f"{IRS_XML_BASE}/{archive}.zip"
+
+
+async def read_member(client: httpx.AsyncClient, member: dict) -> bytes:
+    """Fetch and inflate one catalogued member with a single ranged GET."""
+    return await async_zip.read_member(client, archive_url(member["archive"]), member)
+
+
+# --- Building ---
+
+
+def object_id_from_name(name: str) -> int | None:
+    """'2023_TEOS_XML_01A/202301349349300100_public.xml' → 202301349349300100"""
+    base = name.rsplit("/", 1)[-1]
+    if not base.endswith(MEMBER_SUFFIX):
+        return None
+    object_id = base[: -len(MEMBER_SUFFIX)]
+    return int(object_id) if object_id.isdigit() else None
+
+
+def entries_from_members(archive: str, members: list[dict]) -> dict[int, tuple]:
+    """Turn an archive's central directory members into catalog entries."""
+    entries: dict[int, tuple] = {}
+    for member in members:
+        object_id = object_id_from_name(member["name"])
+        if object_id is None:
+            continue
+        entries[object_id] = (
+            archive,
+            member["header_offset"],
+            member["compress_size"],
+            member["file_size"],
+            member["crc32"],
+            member["compress_type"],
+            member["name_len"],
+        )
+    return entries
+
+
+async def archive_version(client: httpx.AsyncClient, archive: str) -> dict:
+    """An archive's current size and ETag, to notice when it is republished."""
+    resp = await client.head(archive_url(archive), headers={"Accept-Encoding": "identity"})
+    resp.raise_for_status()
+    return {"size": int(resp.headers.get("content-length", 0)), "etag": resp.headers.get("etag")}
+
+
+async def harvest_archive(client: httpx.AsyncClient, archive: str) -> dict[int, tuple]:
+    """Read one archive's central directory and return its catalog entries."""
+    members = await async_zip.read_central_directory(client, archive_url(archive))
+    return entries_from_members(archive, members)
+
+
+def write_catalog(path: str, entries: dict[int, tuple], archives: list[str]):
+    """Write entries to path atomically (tmp file + rename).
+
+    archives lists every harvested archive, including ones with no members,
+    so they are not harvested again.
+    """
+    ids = sorted(entries)
+    archive_idx: dict[str, int] = {}
+    for archive in archives:
+        archive_idx.setdefault(archive, len(archive_idx))
+    for entry in entries.values():
+        archive_idx.setdefault(entry[0], len(archive_idx))
+    blob = "\n".join(archive_idx).encode()
+
+    archives_offset = HEADER.size + len(ids) * (ID_ENTRY.size + ENTRY.size)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ids), archives_offset, len(blob)))
+        for object_id in ids:
+            f.write(ID_ENTRY.pack(object_id))
+        for object_id in ids:
+            archive, *rest = entries[object_id]
+            f.write(ENTRY.pack(archive_idx[archive], *rest))
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def _state_path(path: str) -> str:
+    return f"{path}.state.json"
+
+
+def load_state(path: str) -> dict[str, dict]:
+    """Per-archive version when harvested: {archive: {size, etag}}."""
+    try:
+        with open(_state_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(path: str, state: dict[str, dict]):
+    tmp_path = f"{_state_path(path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, _state_path(path))
+
+
+async def update_catalog(archives: list[str], path: str | None = None) -> int:
+    """Harvest archives that are new or changed since harvested, and rewrite the catalog.
+
+    An archive whose size or ETag no longer matches its recorded version
+    (or that has none recorded) has its entries replaced. Returns the number
+    of archives harvested.
+    """
+    path = path or settings.zip_catalog_path
+    if not path:
+        raise ValueError("No ZIP catalog path configured (ZIP_CATALOG_PATH)")
+    try:
+        existing = ZipCatalog(path)
+    except (OSError, ValueError):
+        entries: dict[int, tuple] = {}
+        done: list[str] = []
+    else:
+        try:
+            entries = existing.entries()
+            done = list(existing.archives)
+        finally:
+            existing.close()
+
+    state = load_state(path)
+
+    harvested = 0
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        for archive in archives:
+            try:
+                version = await archive_version(client, archive)
+            except Exception as e:
+                logger.warning("Failed to check %s: %s", archive, e)
+                version = None
+            if archive in done and (version is None or state.get(archive) == version):
+                continue
+            try:
+                archive_entries = await harvest_archive(client, archive)
+            except Exception as e:
+                logger.warning("Failed to harvest %s: %s", archive, e)
+                continue
+            if archive in done:
+                # Republished: its members may have moved or gone
+                entries = {k: v for k, v in entries.items() if v[0] != archive}
+            else:
+                done.append(archive)
+            entries.update(archive_entries)
+            if version is not None:
+                state[archive] = version
+            harvested += 1
+            logger.info("Harvested %s", archive)
+
+    if harvested:
+        write_catalog(path, entries, done)
+        _save_state(path, state)
+    return harvested
@@ -1,10 +1,43 @@
-import json
+"""Redis cache with an in-process L1 for hot keys.
+
+Values are stored through app.utils.codec (compact JSON, compressed above a
+size threshold), on a binary connection separate from get_redis(), which
+the rest of the app uses for plain string keys.
+
+verify:, 990filing: and state: keys are also held decoded in a per-worker
+LocalCache. Writes publish the key on INVALIDATION_CHANNEL; every other
+worker's listen_for_invalidations() task evicts its copy.
+
+swr_document()/swr_unwrap() handle codec.Documents, response bodies cached
+with a soft and hard expiry for stale-while-revalidate: past the soft
+expiry the body is still served but flagged stale so the caller can
+refresh it in the background; the hard expiry is also the Redis TTL.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import secrets
+import time
 
 import redis.asyncio as redis
 
 from app.config import settings
+from app.utils import codec
+from app.utils.codec import Document
+from app.utils.local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+L1_PREFIXES = ("verify:", "990filing:", "state:")
+INVALIDATION_CHANNEL = "cache:invalidate"
+# Tags this worker's invalidations so it can skip its own
+_WORKER_ID = secrets.token_hex(6)
 
 _redis: redis.Redis | None = None
+_cache_redis: redis.Redis | None = None
+_l1 = LocalCache(settings.l1_cache_max_bytes, settings.l1_cache_ttl_seconds)
 
 
 async def get_redis() -> redis.Redis:
@@ -14,21 +47,159 @@ async def get_redis() -> redis.Redis:
     return _redis
 
 
+async def get_cache_redis() -> redis.Redis:
+    """Connection for cached values, which are bytes (see codec)."""
+    global _cache_redis
+    if _cache_redis is None:
+        _cache_redis = redis.from_url(settings.redis_url)
+    return _cache_redis
+
+
 async def close_redis():
-    global _redis
+    global _redis, _cache_redis
     if _redis:
         await _redis.close()
         _redis = None
+    if _cache_redis:
+        await _cache_redis.close()
+        _cache_redis = None
+
+
+def _in_l1(key: str) -> bool:
+    return key.startswith(L1_PREFIXES)
+
 
+async def cache_get(key: str) -> dict | Document | None:
+    if _in_l1(key):
+        value = _l1.get(key)
+        if value is not None:
+            return value
 
-async def cache_get(key: str) -> dict | None:
-    r = await get_redis()
+    r = await get_cache_redis()
     data = await r.get(key)
     if data:
-        return json.loads(data)
+        value, size = codec.decode_sized(data)
+        if _in_l1(key):
+            _l1.set(key, value, size)
+        return value
     return None
 
 
-async def cache_set(key: str, value: dict, ttl: int):
-    r = await get_redis()
-    await r.set(key, json.dumps(value, default=str), ex=ttl)
+async def cache_set(key: str, value: dict | Document, ttl: int):
+    r = await get_cache_redis()
+    data = codec.encode(value)
+    await r.set(key, data, ex=ttl)
+    if _in_l1(key):
+        # Cache what a reader would decode (default=str may have changed types)
+        _l1.set(key, *codec.decode_sized(data), ttl)
+        try:
+            await r.publish(INVALIDATION_CHANNEL, f"{_WORKER_ID} {key}")
+        except Exception as e:
+            logger.warning("Failed to publish cache invalidation for %s: %s", key, e)
+
+
+async def cache_get_many(keys: list[str]) -> dict[str, dict | Document]:
+    """Fetch several keys in one round trip (L1 first, then one MGET).
+
+    Returns only the keys that were found.
+    """
+    found: dict[str, dict | Document] = {}
+    remote: list[str] = []
+    for key in keys:
+        value = _l1.get(key) if _in_l1(key) else None
+        if value is not None:
+            found[key] = value
+        else:
+            remote.append(key)
+    if not remote:
+        return found
+
+    r = await get_cache_redis()
+    for key, data in zip(remote, await r.mget(remote)):
+        if data:
+            value, size = codec.decode_sized(data)
+            if _in_l1(key):
+                _l1.set(key, value, size)
+            found[key] = value
+    return found
+
+
+async def cache_set_many(items: list[tuple[str, dict | Document, int]]):
+    """Write several (key, value, ttl) entries in one pipelined round trip."""
+    if not items:
+        return
+    r = await get_cache_redis()
+    encoded = [(key, codec.encode(value), ttl) for key, value, ttl in items]
+    async with r.pipeline(transaction=False) as pipe:
+        for key, data, ttl in encoded:
+            pipe.set(key, data, ex=ttl)
+        for key, data, ttl in encoded:
+            if _in_l1(key):
+                _l1.set(key, *codec.decode_sized(data), ttl)
+                pipe.publish(INVALIDATION_CHANNEL, f"{_WORKER_ID} {key}")
+        await pipe.execute()
+
+
+def swr_document(body: bytes, soft_ttl: int, hard_ttl: int, *, not_found: bool = False) -> Document:
+    """Document for a serialized response; cache it with ex=hard_ttl.
+
+    The soft expiry is jittered down by up to CACHE_SOFT_TTL_JITTER so keys
+    written together (e.g. by one batch) don't all go stale at once.
+    """
+    now = time.time()
+    soft_ttl *= 1 - random.uniform(0, settings.cache_soft_ttl_jitter)
+    return Document(body, now + min(soft_ttl, hard_ttl), now + hard_ttl, not_found)
+
+
+def swr_unwrap(entry: Document | dict | None) -> tuple[Document | None, bool]:
+    """Return (document, is_stale) for a cached entry; (None, False) if absent or expired.
+
+    Dict entries predate Documents: envelopes ({"_swr": 1, ...}) keep their
+    expiries, bare values count as fresh until Redis expires them. Both
+    are serialized here, once, on their way out.
+    """
+    if entry is None:
+        return None, False
+    if isinstance(entry, dict):
+        if "_swr" in entry:
+            value = entry["value"]
+            soft, hard = entry["soft_expires_at"], entry["hard_expires_at"]
+        else:
+            value, soft, hard = entry, math.inf, math.inf
+        entry = Document(codec.dumps(value), soft, hard, bool(value.get("_not_found")))
+    now = time.time()
+    if now >= entry.hard_expires_at:
+        return None, False
+    return entry, now >= entry.soft_expires_at
+
+
+def l1_stats() -> dict:
+    return _l1.stats()
+
+
+async def listen_for_invalidations():
+    """Evict L1 entries other workers have rewritten. Runs for the app's lifetime.
+
+    After a dropped subscription the whole L1 is cleared, since
+    invalidations sent meanwhile were missed.
+    """
+    while True:
+        try:
+            r = await get_redis()
+            pubsub = r.pubsub()
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    origin, _, key = message["data"].partition(" ")
+                    if origin != _WORKER_ID:
+                        _l1.delete(key)
+            finally:
+                await pubsub.aclose()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Cache invalidation subscription lost: %s", e)
+        _l1.clear()
+        await asyncio.sleep(1)
@@ -0,0 +1,148 @@
+"""Encoding of cached values.
+
+Every value written is compact JSON, prefixed with a one-byte format
+header:
+
+    0x01  JSON
+    0x02  zlib-compressed JSON
+    0x03  zstd-compressed JSON (needs the optional zstandard package)
+    0x04  Document: expiry metadata + a pre-serialized JSON body
+    0x05  Document, body zlib-compressed
+    0x06  Document, body zstd-compressed
+
+Values larger than CACHE_COMPRESS_MIN_BYTES are compressed with
+CACHE_COMPRESSION (zlib or zstd). Header bytes are control characters that
+never start JSON text, so values written before this codec existed
+(plain JSON) still decode, and can be rewritten lazily or with
+scripts/cache_codec_report.py --migrate.
+
+A Document is a response body serialized once, when it was cached: it
+decodes to its bytes, not to a dict, so a cache hit can be sent as is.
+"""
+
+import json
+import logging
+import struct
+import zlib
+from typing import NamedTuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+JSON = 0x01
+ZLIB = 0x02
+ZSTD = 0x03
+DOCUMENT = 0x04
+DOCUMENT_ZLIB = 0x05
+DOCUMENT_ZSTD = 0x06
+
+# soft_expires_at, hard_expires_at, flags
+_DOCUMENT_HEADER = struct.Struct("<ddB")
+_NOT_FOUND = 0x01
+# Document header for each body encoding, and back
+_DOCUMENT_FORMATS = {JSON: DOCUMENT, ZLIB: DOCUMENT_ZLIB, ZSTD: DOCUMENT_ZSTD}
+_BODY_FORMATS = {v: k for k, v in _DOCUMENT_FORMATS.items()}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_warned_no_zstd = False
+
+
+class CodecError(ValueError):
+    pass
+
+
+class Document(NamedTuple):
+    """A cached response: its JSON body plus stale-while-revalidate expiries."""
+
+    body: bytes
+    soft_expires_at: float
+    hard_expires_at: float
+    not_found: bool = False
+
+
+def dumps(value) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _use_zstd() -> bool:
+    global _warned_no_zstd
+    if settings.cache_compression != "zstd":
+        return False
+    if zstandard is None:
+        if not _warned_no_zstd:
+            logger.warning("CACHE_COMPRESSION=zstd but zstandard is not installed; using zlib")
+            _warned_no_zstd = True
+        return False
+    return True
+
+
+def _compress(raw: bytes) -> tuple[int, bytes]:
+    """(JSON, ZLIB or ZSTD header, data) for a JSON payload."""
+    if len(raw) < settings.cache_compress_min_bytes:
+        return JSON, raw
+    if _use_zstd():
+        return ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return ZLIB, zlib.compress(raw, ZLIB_LEVEL)
+
+
+def _decompress(header: int, data: bytes) -> bytes:
+    if header == JSON:
+        return data
+    if header == ZLIB:
+        return zlib.decompress(data)
+    if zstandard is None:
+        raise CodecError("zstd-encoded cache value but zstandard is not installed")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def encode(value) -> bytes:
+    if isinstance(value, Document):
+        header, body = _compress(value.body)
+        meta = _DOCUMENT_HEADER.pack(
+            value.soft_expires_at, value.hard_expires_at, _NOT_FOUND if value.not_found else 0
+        )
+        return bytes((_DOCUMENT_FORMATS[header],)) + meta + body
+    header, data = _compress(dumps(value))
+    return bytes((header,)) + data
+
+
+def _payload(data: bytes) -> bytes:
+    """The JSON text inside an encoded (non-Document) value."""
+    if not data:
+        raise CodecError("Empty cache value")
+    header = data[0]
+    if header in (JSON, ZLIB, ZSTD):
+        return _decompress(header, data[1:])
+    # Legacy plain JSON text
+    return data
+
+
+def _document(data: bytes) -> Document:
+    soft, hard, flags = _DOCUMENT_HEADER.unpack_from(data, 1)
+    body = _decompress(_BODY_FORMATS[data[0]], data[1 + _DOCUMENT_HEADER.size:])
+    return Document(body, soft, hard, bool(flags & _NOT_FOUND))
+
+
+def decode(data: bytes):
+    return decode_sized(data)[0]
+
+
+def decode_sized(data: bytes) -> tuple[object, int]:
+    """Decode, also returning the uncompressed JSON size (for L1 accounting)."""
+    if data and data[0] in _BODY_FORMATS:
+        document = _document(data)
+        return document, len(document.body)
+    payload = _payload(data)
+    return json.loads(payload), len(payload)
+
+
+def is_legacy(data: bytes) -> bool:
+    return bool(data) and data[0] not in (JSON, ZLIB, ZSTD, *_BODY_FORMATS)
@@ -0,0 +1,44 @@
+"""Incremental CSV reading and writing.
+
+csv_records() parses an async stream of byte chunks (e.g. a request body)
+into rows as the chunks arrive, holding at most one unfinished record in
+memory. A record ends at a newline outside quotes, so quoted fields may
+contain newlines and may be split across chunks.
+"""
+
+import codecs
+import csv
+import io
+from typing import AsyncIterator
+
+
+async def csv_records(chunks: AsyncIterator[bytes], encoding: str = "utf-8-sig") -> AsyncIterator[list[str]]:
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""  # text after the last complete line
+    record = ""  # complete lines of a record whose quotes are still open
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            record += line + "\n"
+            if record.count('"') % 2 == 0:
+                row = _parse(record)
+                record = ""
+                if row:
+                    yield row
+    record += pending + decoder.decode(b"", final=True)
+    if record.strip():
+        row = _parse(record)
+        if row:
+            yield row
+
+
+def _parse(record: str) -> list[str]:
+    return next(csv.reader([record]), [])
+
+
+def csv_line(values: list) -> bytes:
+    """One encoded CSV row, CRLF-terminated."""
+    buf = io.StringIO()
+    csv.writer(buf).writerow(["" if v is None else v for v in values])
+    return buf.getvalue().encode()
@@ -0,0 +1,102 @@
+"""Worker pool for CPU-bound parsing (990 XML, state registry HTML).
+
+ElementTree and BeautifulSoup work would otherwise run on the event loop
+thread and stall every other request on the worker. run_parser() hands the
+call to a thread pool (default) or a process pool for true parallelism, set
+via PARSER_EXECUTOR=thread|process|inline.
+
+At most PARSER_MAX_PENDING calls are queued or running at once; further
+callers wait for a slot, so a burst can't grow the pool's queue unbounded.
+Parser functions must be module-level (picklable) for the process pool.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from app.config import settings
+
+_executor: Executor | None = None
+_slots: asyncio.Semaphore | None = None
+
+_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "failed": 0,
+    "waiting": 0,
+    "in_flight": 0,
+    "total_seconds": 0.0,
+    "max_seconds": 0.0,
+}
+
+
+def _get_executor() -> Executor | None:
+    global _executor
+    if _executor is None and settings.parser_executor != "inline":
+        if settings.parser_executor == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.parser_workers)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.parser_workers, thread_name_prefix="parser"
+            )
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.parser_max_pending)
+    return _slots
+
+
+async def run_parser(fn, *args):
+    """Run a CPU-bound parser call off the event loop and return its result."""
+    slots = _get_slots()
+    _stats["waiting"] += 1
+    try:
+        await slots.acquire()
+    finally:
+        _stats["waiting"] -= 1
+
+    _stats["submitted"] += 1
+    _stats["in_flight"] += 1
+    start = time.perf_counter()
+    try:
+        executor = _get_executor()
+        if executor is None:
+            result = fn(*args)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+    except BaseException:
+        _stats["failed"] += 1
+        raise
+    else:
+        _stats["completed"] += 1
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        _stats["in_flight"] -= 1
+        _stats["total_seconds"] += elapsed
+        _stats["max_seconds"] = max(_stats["max_seconds"], elapsed)
+        slots.release()
+
+
+def parser_stats() -> dict:
+    """Snapshot of pool metrics for /health."""
+    finished = _stats["completed"] + _stats["failed"]
+    return {
+        "mode": settings.parser_executor,
+        "workers": settings.parser_workers,
+        "max_pending": settings.parser_max_pending,
+        **_stats,
+        "avg_ms": round(_stats["total_seconds"] / finished * 1000, 2) if finished else None,
+    }
+
+
+def shutdown_executor():
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    _slots = None
@@ -0,0 +1,70 @@
+"""Shared upstream HTTP clients.
+
+One app-lifetime httpx client per upstream host (ProPublica, apps.irs.gov,
+each state registry), so lookups reuse warm keep-alive connections instead
+of paying a TCP + TLS handshake every time. Each client has its own pool,
+which makes HTTP_MAX_CONNECTIONS a per-host limit.
+
+Clients are created on first use and closed from the app lifespan with
+close_clients(). They keep no cookie jar: they are shared across unrelated
+requests, so any session cookie has to be forwarded explicitly.
+
+HTTP_2=true negotiates HTTP/2 where the upstream supports it; it needs the
+optional h2 package (pip install 'httpx[http2]').
+"""
+
+import logging
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    if not settings.http_2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP_2 is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def _no_cookies() -> CookieJar:
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+def get_client(upstream: str, timeout: float, **kwargs) -> httpx.AsyncClient:
+    """Return the shared client for an upstream, creating it on first use.
+
+    timeout and kwargs (headers, follow_redirects, ...) only apply when the
+    client is created.
+    """
+    client = _clients.get(upstream)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_connections,
+                keepalive_expiry=settings.http_keepalive_seconds,
+            ),
+            http2=_http2_available(),
+            cookies=_no_cookies(),
+            **kwargs,
+        )
+        _clients[upstream] = client
+    return client
+
+
+async def close_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
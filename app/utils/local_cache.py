@@ -0,0 +1,78 @@
+"""In-process L1 cache in front of Redis.
+
+Holds decoded values, so a hit skips both the Redis round trip and the JSON
+decode. LRU bounded by the JSON size of its entries, a proxy for their
+in-memory size, not by entry count: a 40 KB VerifyResponse and a 20-byte
+not-found marker cost what they weigh.
+
+Entries also expire after at most ttl seconds, so a missed invalidation
+(see cache.listen_for_invalidations) can only serve stale data briefly.
+Values are shared between callers; treat them as read-only.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key → (value, size, expires_at), least recently used first
+        self._entries: OrderedDict[str, tuple[object, int, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, _, expires_at = entry
+        if expires_at < time.monotonic():
+            self.delete(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value, size: int, ttl: float | None = None):
+        """Store value, whose encoded form is size bytes, for at most ttl seconds."""
+        self.delete(key)
+        # One entry may not crowd out a large share of the hot set
+        if size > self.max_bytes // 16:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._entries[key] = (value, size, time.monotonic() + ttl)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,44 @@
+"""JSON serialization of API responses, done once per result.
+
+A VerifyResponse is serialized by dump_verify() when the enricher produces
+it; the same bytes are cached (as a codec.Document) and sent on this and
+every later request, through json_response(), which FastAPI passes along
+without response_model validation or re-encoding. Batch responses are
+assembled from those bytes by batch_body().
+
+The TypeAdapters are built once at import, so serializing does no schema
+work per call. See scripts/bench_serialization.py for the cost by size.
+"""
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from app.models.schemas import VerifyResponse
+
+_VERIFY = TypeAdapter(VerifyResponse)
+_OPTIONAL_STR = TypeAdapter(str | None)
+
+
+def dump_verify(result: VerifyResponse) -> bytes:
+    return _VERIFY.dump_json(result)
+
+
+def json_response(body: bytes, status_code: int = 200, headers: dict[str, str] | None = None) -> Response:
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def batch_result(ein: str, data: bytes | None, error: str | None) -> bytes:
+    """A serialized BatchVerifyResult around an already-serialized VerifyResponse."""
+    return b'{"ein":%s,"success":%s,"data":%s,"error":%s}' % (
+        _OPTIONAL_STR.dump_json(ein),
+        b"false" if data is None else b"true",
+        b"null" if data is None else data,
+        _OPTIONAL_STR.dump_json(error),
+    )
+
+
+def batch_body(total: int, succeeded: int, failed: int, results: list[bytes]) -> bytes:
+    """A serialized BatchVerifyResponse from batch_result() fragments."""
+    return b'{"total":%d,"succeeded":%d,"failed":%d,"results":[%s]}' % (
+        total, succeeded, failed, b",".join(results),
+    )
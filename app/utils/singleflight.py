@@ -0,0 +1,143 @@
+"""Request coalescing for expensive cache-miss computations.
+
+Concurrent misses for the same key are collapsed on two levels:
+
+- In-process: callers share one task per key; later arrivals await the
+  task the first caller started. The task is shielded, so a caller
+  disconnecting doesn't cancel it for everyone else.
+- Fleet-wide: that task takes a short Redis lease (SET NX EX) before
+  computing. Workers that find the lease taken poll `lookup` (normally the
+  cache read) until the holder's result lands.
+
+If the lease expires, the holder gives up without a result, or Redis is
+unreachable, the waiter computes itself — coalescing only ever saves work,
+it never turns an upstream failure into a stuck request.
+
+refresh_in_background() is the fire-and-forget variant for refreshing a
+stale cached value: nobody waits on it, so if a refresh for the key is
+already running here or holds the lease elsewhere it does nothing.
+"""
+
+import asyncio
+import logging
+import secrets
+import time
+from functools import partial
+from typing import Awaitable, Callable
+
+from app.config import settings
+from app.utils.cache import get_redis
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = "lease:"
+POLL_INITIAL_SECONDS = 0.025
+POLL_MAX_SECONDS = 0.25
+
+# Delete the lease only if we still hold it
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_inflight: dict[str, asyncio.Task] = {}
+_refreshing: dict[str, asyncio.Task] = {}
+
+
+async def run(
+    key: str,
+    compute: Callable[[], Awaitable],
+    lookup: Callable[[], Awaitable],
+):
+    """Return compute()'s result, computing at most once per key at a time.
+
+    lookup() returns the result another worker has published (or None);
+    compute() must publish it where lookup() will find it.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_leased(key, compute, lookup))
+        _inflight[key] = task
+        task.add_done_callback(partial(_forget, key))
+    return await asyncio.shield(task)
+
+
+def _forget(key: str, task: asyncio.Task):
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    if not task.cancelled():
+        task.exception()  # retrieved, even if every caller went away
+
+
+def inflight() -> int:
+    return len(_inflight)
+
+
+def refresh_in_background(key: str, compute: Callable[[], Awaitable]):
+    """Start compute() for key unless a computation for it is already under way."""
+    if key in _inflight or key in _refreshing:
+        return
+    task = asyncio.create_task(_refresh(key, compute))
+    _refreshing[key] = task
+    task.add_done_callback(lambda _: _refreshing.pop(key, None))
+
+
+async def _refresh(key: str, compute):
+    lease_key = LEASE_PREFIX + key
+    token = secrets.token_hex(8)
+    try:
+        r = await get_redis()
+        if not await r.set(lease_key, token, nx=True, ex=settings.singleflight_lease_seconds):
+            return
+        try:
+            await compute()
+        finally:
+            await r.eval(_RELEASE_SCRIPT, 1, lease_key, token)
+    except Exception as e:
+        logger.warning("Background refresh of %s failed: %s", key, e)
+
+
+async def _leased(key: str, compute, lookup):
+    lease_key = LEASE_PREFIX + key
+    token = secrets.token_hex(8)
+    try:
+        r = await get_redis()
+        acquired = await r.set(lease_key, token, nx=True, ex=settings.singleflight_lease_seconds)
+    except Exception as e:
+        logger.warning("Lease for %s unavailable, computing locally: %s", key, e)
+        return await compute()
+
+    if acquired:
+        try:
+            return await compute()
+        finally:
+            try:
+                await r.eval(_RELEASE_SCRIPT, 1, lease_key, token)
+            except Exception as e:
+                logger.warning("Failed to release lease %s: %s", lease_key, e)
+
+    result = await _wait_for_holder(r, lease_key, lookup)
+    if result is not None:
+        return result
+    return await compute()
+
+
+async def _wait_for_holder(r, lease_key: str, lookup):
+    """Poll for another worker's result until its lease goes away."""
+    deadline = time.monotonic() + settings.singleflight_lease_seconds
+    delay = POLL_INITIAL_SECONDS
+    try:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_SECONDS)
+            result = await lookup()
+            if result is not None:
+                return result
+            if not await r.exists(lease_key):
+                # Released without a result, or expired; one last look
+                return await lookup()
+    except Exception as e:
+        logger.warning("Waiting on lease %s failed: %s", lease_key, e)
+    return None
@@ -0,0 +1,56 @@
+-- Bulk-ingested 990 e-file data (see scripts/ingest_990s.py)
+
+-- One row per e-filed return; breakdown columns are NULL when not reported
+CREATE TABLE IF NOT EXISTS filings (
+    object_id BIGINT PRIMARY KEY,
+    ein VARCHAR(9) NOT NULL,
+    tax_period INTEGER,
+    return_type VARCHAR(8) NOT NULL,
+    archive VARCHAR(64) NOT NULL,
+    contributions_and_grants BIGINT,
+    program_service_revenue BIGINT,
+    investment_income BIGINT,
+    other_revenue BIGINT,
+    total_revenue BIGINT,
+    program_services BIGINT,
+    management_and_general BIGINT,
+    fundraising BIGINT,
+    total_expenses BIGINT,
+    ingested_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Officers/directors/key employees (990 Part VII, 990-EZ Part IV, 990-PF Part VIII)
+CREATE TABLE IF NOT EXISTS filing_officers (
+    object_id BIGINT NOT NULL REFERENCES filings(object_id) ON DELETE CASCADE,
+    position SMALLINT NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    title VARCHAR(255),
+    compensation BIGINT,
+    hours_per_week DOUBLE PRECISION,
+    PRIMARY KEY (object_id, position)
+);
+
+-- Schedule J compensation detail
+CREATE TABLE IF NOT EXISTS filing_schedule_j (
+    object_id BIGINT NOT NULL REFERENCES filings(object_id) ON DELETE CASCADE,
+    position SMALLINT NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    base_compensation BIGINT,
+    bonus_and_incentive BIGINT,
+    other_compensation BIGINT,
+    deferred_compensation BIGINT,
+    nontaxable_benefits BIGINT,
+    total_compensation BIGINT,
+    PRIMARY KEY (object_id, position)
+);
+
+-- Archives fully loaded; ingestion skips these on re-run
+CREATE TABLE IF NOT EXISTS filing_ingest_progress (
+    archive VARCHAR(64) PRIMARY KEY,
+    filings INTEGER NOT NULL,
+    completed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Latest filing per EIN
+CREATE INDEX IF NOT EXISTS idx_filings_ein_period ON filings(ein, tax_period DESC NULLS LAST, object_id DESC);
+CREATE INDEX IF NOT EXISTS idx_filings_archive ON filings(archive);
@@ -0,0 +1,14 @@
+-- Tell API workers when a key's metadata changes, so they evict it from
+-- their in-process auth cache (see app/middleware/auth.py). last_used_at
+-- is left out: workers write it themselves, in bulk.
+CREATE OR REPLACE FUNCTION notify_api_key_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('api_keys_changed', OLD.key_hash);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS api_keys_changed ON api_keys;
+CREATE TRIGGER api_keys_changed
+    AFTER UPDATE OF key_hash, name, plan, monthly_limit, is_active OR DELETE ON api_keys
+    FOR EACH ROW EXECUTE FUNCTION notify_api_key_changed();
@@ -0,0 +1,148 @@
+-- Monthly-partitioned api_usage, plus the usage_aggregates rollup that
+-- billing and dashboards read instead of raw rows.
+--
+-- Partitions are named api_usage_YYYY_MM and cover one UTC month. They are
+-- created ahead of time and dropped after USAGE_RETENTION_MONTHS by
+-- scripts/maintain_usage_partitions.py; api_usage_default only catches rows
+-- that arrive before their month's partition exists, and 007 moves them into
+-- the partition once it is created.
+
+-- Latency histogram bucket bounds (ms), numbered as width_bucket() does with
+-- this 1-based array: bucket 0 counts response_time_ms < bounds[1], bucket i
+-- counts bounds[i] <= response_time_ms < bounds[i + 1], and the last bucket
+-- (11) everything from bounds[11] = 10 s up. That is LATENCY_BOUNDS_MS[i - 1]
+-- <= ms < LATENCY_BOUNDS_MS[i] in app/services/usage.py's 0-based tuple.
+CREATE OR REPLACE FUNCTION usage_latency_bounds() RETURNS INTEGER[] AS $$
+    SELECT '{5,10,25,50,100,250,500,1000,2500,5000,10000}'::INTEGER[]
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Histogram array from parallel (bucket, count) arrays
+CREATE OR REPLACE FUNCTION usage_histogram(buckets INTEGER[], counts BIGINT[]) RETURNS BIGINT[] AS $$
+    SELECT array_agg(COALESCE(c.n, 0) ORDER BY i)
+    FROM generate_series(0, cardinality(usage_latency_bounds())) AS i
+    LEFT JOIN unnest(buckets, counts) AS c(bucket, n) ON c.bucket = i
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Element-wise sum of two histograms (either may be NULL)
+CREATE OR REPLACE FUNCTION usage_merge_histograms(a BIGINT[], b BIGINT[]) RETURNS BIGINT[] AS $$
+    SELECT array_agg(COALESCE(x, 0) + COALESCE(y, 0) ORDER BY i)
+    FROM unnest(a, b) WITH ORDINALITY AS t(x, y, i)
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION ensure_usage_partition(month DATE) RETURNS VOID AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month)::DATE;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF api_usage FOR VALUES FROM (%L) TO (%L)',
+        'api_usage_' || to_char(first_day, 'YYYY_MM'),
+        first_day::TIMESTAMP AT TIME ZONE 'UTC',
+        (first_day + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC'
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Swap the original table for a partitioned one, once
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'api_usage' AND relkind = 'r') THEN
+        ALTER TABLE api_usage RENAME TO api_usage_unpartitioned;
+    END IF;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS api_usage (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    api_key_id UUID REFERENCES api_keys(id),
+    endpoint VARCHAR(50) NOT NULL,
+    ein VARCHAR(20),
+    response_status INTEGER,
+    response_time_ms INTEGER,
+    cache_hit BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS api_usage_default PARTITION OF api_usage DEFAULT;
+
+-- Rows arrive in created_at order, so a BRIN index is tiny and enough for
+-- time-range scans; per-key questions go to usage_aggregates
+CREATE INDEX IF NOT EXISTS idx_usage_created_brin ON api_usage USING brin (created_at);
+
+CREATE TABLE IF NOT EXISTS usage_aggregates (
+    api_key_id UUID NOT NULL,
+    month DATE NOT NULL,
+    endpoint VARCHAR(50) NOT NULL,
+    requests BIGINT NOT NULL DEFAULT 0,
+    cache_hits BIGINT NOT NULL DEFAULT 0,
+    not_found BIGINT NOT NULL DEFAULT 0,
+    latency_sum_ms BIGINT NOT NULL DEFAULT 0,
+    latency_buckets BIGINT[] NOT NULL,
+    PRIMARY KEY (api_key_id, month, endpoint)
+);
+
+-- Fold each inserted batch (one COPY from app/services/usage.py) into the
+-- rollup with a single upsert
+CREATE OR REPLACE FUNCTION usage_rollup() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO usage_aggregates AS a (
+        api_key_id, month, endpoint, requests, cache_hits, not_found, latency_sum_ms, latency_buckets
+    )
+    SELECT api_key_id, month, endpoint, sum(requests), sum(cache_hits), sum(not_found),
+           sum(latency_sum_ms), usage_histogram(array_agg(bucket), array_agg(requests))
+    FROM (
+        SELECT api_key_id,
+               date_trunc('month', created_at AT TIME ZONE 'UTC')::DATE AS month,
+               endpoint,
+               width_bucket(COALESCE(response_time_ms, 0), usage_latency_bounds()) AS bucket,
+               count(*) AS requests,
+               count(*) FILTER (WHERE cache_hit) AS cache_hits,
+               count(*) FILTER (WHERE response_status = 404) AS not_found,
+               COALESCE(sum(response_time_ms), 0) AS latency_sum_ms
+        FROM new_rows
+        WHERE api_key_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    ) per_bucket
+    GROUP BY api_key_id, month, endpoint
+    ON CONFLICT (api_key_id, month, endpoint) DO UPDATE SET
+        requests = a.requests + EXCLUDED.requests,
+        cache_hits = a.cache_hits + EXCLUDED.cache_hits,
+        not_found = a.not_found + EXCLUDED.not_found,
+        latency_sum_ms = a.latency_sum_ms + EXCLUDED.latency_sum_ms,
+        latency_buckets = usage_merge_histograms(a.latency_buckets, EXCLUDED.latency_buckets);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS api_usage_rollup ON api_usage;
+CREATE TRIGGER api_usage_rollup
+    AFTER INSERT ON api_usage
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION usage_rollup();
+
+-- Partitions for existing data and the next few months, then move the
+-- old rows over (the trigger rolls them up on the way)
+DO $$
+DECLARE
+    m DATE;
+BEGIN
+    IF to_regclass('api_usage_unpartitioned') IS NOT NULL THEN
+        FOR m IN
+            SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::DATE
+            FROM api_usage_unpartitioned WHERE created_at IS NOT NULL
+        LOOP
+            PERFORM ensure_usage_partition(m);
+        END LOOP;
+    END IF;
+    FOR m IN
+        SELECT generate_series(date_trunc('month', NOW() AT TIME ZONE 'UTC'), date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '2 months', INTERVAL '1 month')::DATE
+    LOOP
+        PERFORM ensure_usage_partition(m);
+    END LOOP;
+    IF to_regclass('api_usage_unpartitioned') IS NOT NULL THEN
+        INSERT INTO api_usage (id, api_key_id, endpoint, ein, response_status, response_time_ms, cache_hit, created_at)
+        SELECT id, api_key_id, endpoint, ein, response_status, response_time_ms, cache_hit, COALESCE(created_at, NOW())
+        FROM api_usage_unpartitioned ORDER BY created_at;
+        DROP TABLE api_usage_unpartitioned;
+    END IF;
+END;
+$$;
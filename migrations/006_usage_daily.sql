@@ -0,0 +1,86 @@
+-- Daily usage rollup for /api/v1/usage, alongside the monthly
+-- usage_aggregates from 005. Same columns; the trigger now feeds both.
+
+CREATE TABLE IF NOT EXISTS usage_daily (
+    api_key_id UUID NOT NULL,
+    day DATE NOT NULL,
+    endpoint VARCHAR(50) NOT NULL,
+    requests BIGINT NOT NULL DEFAULT 0,
+    cache_hits BIGINT NOT NULL DEFAULT 0,
+    not_found BIGINT NOT NULL DEFAULT 0,
+    latency_sum_ms BIGINT NOT NULL DEFAULT 0,
+    latency_buckets BIGINT[] NOT NULL,
+    PRIMARY KEY (api_key_id, day, endpoint)
+);
+
+-- Sum of histograms over any set of rollup rows, so a range's latency
+-- percentiles come from its buckets, never from raw rows
+CREATE OR REPLACE AGGREGATE usage_histogram_sum(BIGINT[]) (
+    SFUNC = usage_merge_histograms,
+    STYPE = BIGINT[]
+);
+
+CREATE OR REPLACE FUNCTION usage_rollup() RETURNS trigger AS $$
+BEGIN
+    WITH batch AS (
+        SELECT api_key_id, day, endpoint, sum(requests) AS requests, sum(cache_hits) AS cache_hits,
+               sum(not_found) AS not_found, sum(latency_sum_ms) AS latency_sum_ms,
+               usage_histogram(array_agg(bucket), array_agg(requests)) AS latency_buckets
+        FROM (
+            SELECT api_key_id,
+                   (created_at AT TIME ZONE 'UTC')::DATE AS day,
+                   endpoint,
+                   width_bucket(COALESCE(response_time_ms, 0), usage_latency_bounds()) AS bucket,
+                   count(*) AS requests,
+                   count(*) FILTER (WHERE cache_hit) AS cache_hits,
+                   count(*) FILTER (WHERE response_status = 404) AS not_found,
+                   COALESCE(sum(response_time_ms), 0) AS latency_sum_ms
+            FROM new_rows
+            WHERE api_key_id IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        ) per_bucket
+        GROUP BY api_key_id, day, endpoint
+    ), daily AS (
+        INSERT INTO usage_daily AS a
+        SELECT * FROM batch
+        ON CONFLICT (api_key_id, day, endpoint) DO UPDATE SET
+            requests = a.requests + EXCLUDED.requests,
+            cache_hits = a.cache_hits + EXCLUDED.cache_hits,
+            not_found = a.not_found + EXCLUDED.not_found,
+            latency_sum_ms = a.latency_sum_ms + EXCLUDED.latency_sum_ms,
+            latency_buckets = usage_merge_histograms(a.latency_buckets, EXCLUDED.latency_buckets)
+    )
+    INSERT INTO usage_aggregates AS a
+    SELECT api_key_id, date_trunc('month', day::TIMESTAMP)::DATE, endpoint, sum(requests), sum(cache_hits),
+           sum(not_found), sum(latency_sum_ms), usage_histogram_sum(latency_buckets)
+    FROM batch
+    GROUP BY 1, 2, 3
+    ON CONFLICT (api_key_id, month, endpoint) DO UPDATE SET
+        requests = a.requests + EXCLUDED.requests,
+        cache_hits = a.cache_hits + EXCLUDED.cache_hits,
+        not_found = a.not_found + EXCLUDED.not_found,
+        latency_sum_ms = a.latency_sum_ms + EXCLUDED.latency_sum_ms,
+        latency_buckets = usage_merge_histograms(a.latency_buckets, EXCLUDED.latency_buckets);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill from the raw rows still retained
+INSERT INTO usage_daily
+SELECT api_key_id, day, endpoint, sum(requests), sum(cache_hits), sum(not_found),
+       sum(latency_sum_ms), usage_histogram(array_agg(bucket), array_agg(requests))
+FROM (
+    SELECT api_key_id,
+           (created_at AT TIME ZONE 'UTC')::DATE AS day,
+           endpoint,
+           width_bucket(COALESCE(response_time_ms, 0), usage_latency_bounds()) AS bucket,
+           count(*) AS requests,
+           count(*) FILTER (WHERE cache_hit) AS cache_hits,
+           count(*) FILTER (WHERE response_status = 404) AS not_found,
+           COALESCE(sum(response_time_ms), 0) AS latency_sum_ms
+    FROM api_usage
+    WHERE api_key_id IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+) per_bucket
+WHERE NOT EXISTS (SELECT 1 FROM usage_daily)
+GROUP BY api_key_id, day, endpoint;
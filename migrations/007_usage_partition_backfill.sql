@@ -0,0 +1,49 @@
+-- ensure_usage_partition() from 005 failed once api_usage_default held rows
+-- for the month being created ("updated partition constraint for default
+-- partition would be violated"), e.g. after the maintenance cron missed a
+-- few months. Now it detaches the default partition, creates the month's
+-- partition, moves that month's rows across and re-attaches the default.
+--
+-- The rows go straight into the new partition, not through api_usage, so
+-- the rollup trigger doesn't count them a second time. DETACH locks
+-- api_usage until the surrounding transaction commits; inserts wait.
+
+CREATE OR REPLACE FUNCTION ensure_usage_partition(month DATE) RETURNS VOID AS $$
+DECLARE
+    first_day DATE := date_trunc('month', month)::DATE;
+    partition_name TEXT := 'api_usage_' || to_char(first_day, 'YYYY_MM');
+    lower_bound TIMESTAMPTZ := first_day::TIMESTAMP AT TIME ZONE 'UTC';
+    upper_bound TIMESTAMPTZ := (first_day + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+    moved_rows BIGINT;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM api_usage_default WHERE created_at >= lower_bound AND created_at < upper_bound
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF api_usage FOR VALUES FROM (%L) TO (%L)',
+            partition_name, lower_bound, upper_bound
+        );
+        RETURN;
+    END IF;
+
+    ALTER TABLE api_usage DETACH PARTITION api_usage_default;
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF api_usage FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, upper_bound
+    );
+    EXECUTE format(
+        'WITH moved AS (
+             DELETE FROM api_usage_default WHERE created_at >= %L AND created_at < %L RETURNING *
+         )
+         INSERT INTO %I SELECT * FROM moved',
+        lower_bound, upper_bound, partition_name
+    );
+    GET DIAGNOSTICS moved_rows = ROW_COUNT;
+    ALTER TABLE api_usage ATTACH PARTITION api_usage_default DEFAULT;
+    RAISE NOTICE 'Moved % rows from api_usage_default to %', moved_rows, partition_name;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Benchmark VerifyResponse serialization cost by response size.
+
+Usage:
+    python -m scripts.bench_serialization [--iterations N]
+
+For responses with 0 to 1000 personnel, compares:
+
+- before: model_dump() for the cache write (plus the codec's json.dumps),
+  then FastAPI's response path, re-validating the dict against
+  response_model and encoding it again
+- dump_verify: the single TypeAdapter.dump_json used now, whose bytes
+  serve both the cache write and the HTTP body
+- orjson: orjson.dumps(model_dump()), for reference, if orjson is installed
+
+and, on a cache hit, decoding + re-validating + encoding (before) against
+sending the cached bytes (now, no serialization at all).
+"""
+
+import argparse
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.schemas import Financials, Person, VerifyResponse
+from app.utils import codec
+from app.utils.serialize import dump_verify
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SIZES = (0, 10, 100, 1000)
+
+
+def _response(personnel: int) -> VerifyResponse:
+    return VerifyResponse(
+        ein="53-0196605",
+        legal_name="American National Red Cross",
+        status="active",
+        subsection="501(c)(3)",
+        city="Washington",
+        state="DC",
+        financials=Financials(tax_year=2023, revenue=3_000_000_000, expenses=2_900_000_000),
+        personnel=[
+            Person(name=f"Person {i}", title="Director", compensation=1000 * i, hours_per_week=2.0)
+            for i in range(personnel)
+        ],
+    )
+
+
+def _fastapi_encode(data: dict) -> bytes:
+    """What FastAPI does with a dict returned for response_model=VerifyResponse."""
+    validated = VerifyResponse.model_validate(data)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _before_miss(result: VerifyResponse) -> bytes:
+    data = result.model_dump()
+    codec.dumps(data)
+    return _fastapi_encode(data)
+
+
+def _time_us(fn, iterations: int) -> float:
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    n = args.iterations
+
+    columns = ["personnel", "bytes", "before µs", "dump_verify µs", "speedup", "hit before µs"]
+    if orjson is not None:
+        columns.insert(4, "orjson µs")
+    print(" ".join(f"{c:>14}" for c in columns))
+    for size in SIZES:
+        result = _response(size)
+        body = dump_verify(result)
+        before = _time_us(lambda: _before_miss(result), n)
+        now = _time_us(lambda: dump_verify(result), n)
+        hit_before = _time_us(lambda: _fastapi_encode(json.loads(body)), n)
+        row = [size, len(body), f"{before:.1f}", f"{now:.1f}", f"{before / now:.1f}x", f"{hit_before:.1f}"]
+        if orjson is not None:
+            row.insert(4, f"{_time_us(lambda: orjson.dumps(result.model_dump()), n):.1f}")
+        print(" ".join(f"{v:>14}" for v in row))
+
+
+if __name__ == "__main__":
+    main()
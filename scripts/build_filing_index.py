@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Build the local EIN → 990 filing index from the IRS yearly index CSVs.
+
+Usage:
+    python -m scripts.build_filing_index [path] [year ...]
+    python -m scripts.build_filing_index --refresh [path] [year ...]
+
+Defaults to FILING_INDEX_PATH and the current year plus 2 prior. --refresh
+fetches only the bytes appended to each CSV since the last run (run it from
+cron every few hours); serving workers remap the rewritten file on their own.
+"""
+
+import asyncio
+import logging
+import sys
+
+from app.services.filing_index import build_index, refresh_index
+
+
+async def main():
+    args = sys.argv[1:]
+    refresh = "--refresh" in args
+    args = [a for a in args if a != "--refresh"]
+    path = args[0] if args else None
+    years = [int(y) for y in args[1:]] or None
+
+    if refresh:
+        merged = await refresh_index(path, years)
+        print(f"Filing index refreshed: {merged} new filings merged")
+    else:
+        count = await build_index(path, years)
+        print(f"Filing index built: {count} EINs")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
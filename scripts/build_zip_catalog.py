@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Harvest IRS e-file ZIP central directories into the OBJECT_ID catalog.
+
+Usage:
+    python -m scripts.build_zip_catalog [catalog_path] [index_path]
+
+Archives are taken from the filing index (see scripts/build_filing_index.py);
+ones already in the catalog are skipped unless the IRS has republished
+them (size or ETag changed), so run it after each index refresh.
+Defaults to ZIP_CATALOG_PATH and FILING_INDEX_PATH.
+"""
+
+import asyncio
+import logging
+import sys
+
+from app.config import settings
+from app.services.filing_index import FilingIndex
+from app.services.zip_catalog import update_catalog
+
+
+async def main():
+    catalog_path = sys.argv[1] if len(sys.argv) > 1 else None
+    index_path = sys.argv[2] if len(sys.argv) > 2 else settings.filing_index_path
+
+    index = FilingIndex(index_path)
+    try:
+        archives = index.archives()
+    finally:
+        index.close()
+
+    harvested = await update_catalog(archives, catalog_path)
+    print(f"ZIP catalog updated: {harvested} of {len(archives)} archives harvested")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
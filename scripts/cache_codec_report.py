@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Report how much Redis memory the cache codec saves, and optionally migrate.
+
+Usage:
+    python -m scripts.cache_codec_report [--migrate] [pattern...]
+
+Scans the cache keyspace (default: verify:*, 990filing:*, 990index:*,
+state:*) and compares each value's stored size with its size under the
+current codec. With --migrate, legacy plain-JSON values are rewritten in
+the new format, keeping their remaining TTL.
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+
+from app.utils import codec
+from app.utils.cache import close_redis, get_cache_redis
+
+DEFAULT_PATTERNS = ("verify:*", "990filing:*", "990index:*", "state:*")
+SCAN_COUNT = 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("patterns", nargs="*", default=DEFAULT_PATTERNS)
+    parser.add_argument("--migrate", action="store_true")
+    args = parser.parse_args()
+
+    r = await get_cache_redis()
+    # prefix → [keys, legacy keys, stored bytes, re-encoded bytes]
+    totals: dict[str, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    migrated = 0
+    try:
+        for pattern in args.patterns:
+            prefix = pattern.rstrip("*")
+            async for key in r.scan_iter(match=pattern, count=SCAN_COUNT):
+                data = await r.get(key)
+                if not data:
+                    continue
+                encoded = codec.encode(codec.decode(data))
+                row = totals[prefix]
+                row[0] += 1
+                row[2] += len(data)
+                row[3] += len(encoded)
+                if codec.is_legacy(data):
+                    row[1] += 1
+                    if args.migrate:
+                        ttl_ms = await r.pttl(key)
+                        if ttl_ms > 0:
+                            await r.set(key, encoded, px=ttl_ms)
+                            migrated += 1
+    finally:
+        await close_redis()
+
+    print(f"{'prefix':<12} {'keys':>10} {'legacy':>10} {'stored MB':>12} {'encoded MB':>12} {'saved':>7}")
+    all_stored = all_encoded = 0
+    for prefix, (keys, legacy, stored, encoded) in sorted(totals.items()):
+        all_stored += stored
+        all_encoded += encoded
+        saved = 1 - encoded / stored if stored else 0
+        print(f"{prefix:<12} {keys:>10} {legacy:>10} {stored / 1e6:>12.2f} {encoded / 1e6:>12.2f} {saved:>7.1%}")
+    if all_stored:
+        print(f"total: {all_stored / 1e6:.2f} MB → {all_encoded / 1e6:.2f} MB "
+              f"({1 - all_encoded / all_stored:.1%} saved)")
+    if args.migrate:
+        print(f"Migrated {migrated} legacy values")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Bulk-load IRS 990 e-file archives into the Postgres filings tables.
+
+Usage:
+    python -m scripts.ingest_990s [--workers N] [--keep-zips] [archive...]
+
+Archives are "{year}/{zip_filename}" (e.g. 2023/2023_TEOS_XML_01A); with
+none given, every archive in the filing index is loaded. Archives already
+recorded in filing_ingest_progress are skipped, so an interrupted run can
+simply be restarted. Apply migrations/003_filings.sql first, then set
+FILING_STORE=true.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import settings
+from app.database import close_pool, get_pool
+from app.services.bulk_ingest import ingest
+from app.services.filing_index import FilingIndex
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("archives", nargs="*")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--keep-zips", action="store_true")
+    args = parser.parse_args()
+
+    archives = args.archives
+    if not archives:
+        index = FilingIndex(settings.filing_index_path)
+        try:
+            archives = index.archives()
+        finally:
+            index.close()
+
+    pool = await get_pool()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            loaded = await ingest(pool, archives, executor, keep_zips=args.keep_zips)
+    finally:
+        await close_pool()
+    print(f"Ingested {loaded} of {len(archives)} archives")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
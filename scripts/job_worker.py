@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Run bulk verification job workers outside the API.
+
+Usage:
+    python -m scripts.job_worker [--concurrency N]
+
+Each of the N coroutines consumes one chunk of a job at a time from the
+jobs:stream queue (see app/services/jobs.py). Run as many of these
+processes as throughput needs; set JOB_WORKERS=0 to keep the API
+processes from consuming jobs themselves.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.database import close_pool
+from app.services import jobs, usage
+from app.utils.cache import close_redis
+from app.utils.http import close_clients
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    recorder = asyncio.create_task(usage.run_usage_recorder())
+    workers = [asyncio.create_task(jobs.run_worker(jobs.consumer_name(i))) for i in range(args.concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        recorder.cancel()
+        await asyncio.gather(*workers, recorder, return_exceptions=True)
+        await close_clients()
+        await close_pool()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
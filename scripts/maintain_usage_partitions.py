@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Create upcoming api_usage partitions and drop expired ones.
+
+Usage:
+    python -m scripts.maintain_usage_partitions [--dry-run]
+
+Run daily (e.g. from cron). Creates partitions for this month and the next
+USAGE_PARTITIONS_AHEAD months, plus any month whose rows landed in
+api_usage_default while it didn't run (moving them in), and drops partitions
+older than USAGE_RETENTION_MONTHS. usage_aggregates is never touched. Apply
+migrations/005_usage_partitions.sql and 007_usage_partition_backfill.sql first.
+"""
+
+import argparse
+import asyncio
+
+from app.config import settings
+from app.database import close_pool, get_pool
+from app.services.usage import drop_expired_partitions, ensure_partitions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dry-run", action="store_true", help="roll back instead of committing")
+    args = parser.parse_args()
+
+    pool = await get_pool()
+    try:
+        async with pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                months = await ensure_partitions(conn, settings.usage_partitions_ahead)
+                dropped = await drop_expired_partitions(conn, settings.usage_retention_months)
+            except Exception:
+                await tx.rollback()
+                raise
+            if args.dry_run:
+                await tx.rollback()
+            else:
+                await tx.commit()
+    finally:
+        await close_pool()
+
+    print(f"Partitions through {months[-1]:%Y-%m} exist")
+    print(f"Dropped: {', '.join(dropped) or 'none'}" + (" (dry run)" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import io
+import struct
+import zipfile
+
+import httpx
+import pytest
+
+from app.services.async_zip import (
+    ZipReadError,
+    _apply_zip64_extra,
+    read_central_directory,
+    read_member,
+)
+
+URL = "https://apps.irs.gov/pub/epostcard/990/xml/2023/2023_TEOS_XML_01A.zip"
+XML_A = b"<Return>" + b"A" * 50000 + b"</Return>"
+XML_B = b"<Return>stored</Return>"
+
+
+def _make_zip(comment: bytes = b"") -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("2023_TEOS_XML_01A/202301349349300100_public.xml", XML_A, compress_type=zipfile.ZIP_DEFLATED)
+        z.writestr("2023_TEOS_XML_01A/202301349349300200_public.xml", XML_B, compress_type=zipfile.ZIP_STORED)
+        z.comment = comment
+    return buf.getvalue()
+
+
+def range_transport(data: bytes, seen: list | None = None) -> httpx.MockTransport:
+    """Serve data honoring Range headers, including suffix ranges."""
+
+    def handler(request):
+        if seen is not None:
+            seen.append(request.headers["range"])
+        start, end = request.headers["range"].removeprefix("bytes=").split("-")
+        if start == "":
+            start, end = max(len(data) - int(end), 0), len(data) - 1
+        else:
+            start, end = int(start), min(int(end), len(data) - 1)
+        return httpx.Response(
+            206,
+            content=data[start:end + 1],
+            headers={"Content-Range": f"bytes {start}-{end}/{len(data)}"},
+        )
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_read_central_directory_small_archive():
+    data = _make_zip()
+    seen: list = []
+    async with httpx.AsyncClient(transport=range_transport(data, seen)) as client:
+        members = await read_central_directory(client, URL)
+
+    # Whole archive fits in the tail request
+    assert len(seen) == 1
+    names = [m["name"] for m in members]
+    assert names == [
+        "2023_TEOS_XML_01A/202301349349300100_public.xml",
+        "2023_TEOS_XML_01A/202301349349300200_public.xml",
+    ]
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        infos = z.infolist()
+    assert members[0]["header_offset"] == infos[0].header_offset
+    assert members[1]["compress_size"] == infos[1].compress_size
+    assert members[1]["crc32"] == infos[1].CRC
+
+
+@pytest.mark.asyncio
+async def test_read_central_directory_fetches_directory_separately():
+    # A maximal archive comment pushes the central directory out of the tail request
+    data = _make_zip(comment=b"x" * 0xFFFF)
+    seen: list = []
+    async with httpx.AsyncClient(transport=range_transport(data, seen)) as client:
+        members = await read_central_directory(client, URL)
+        assert await read_member(client, URL, members[0]) == XML_A
+
+    assert len(seen) == 3
+    assert len(members) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_member_deflated_and_stored():
+    data = _make_zip()
+    async with httpx.AsyncClient(transport=range_transport(data)) as client:
+        members = await read_central_directory(client, URL)
+        assert await read_member(client, URL, members[0]) == XML_A
+        assert await read_member(client, URL, members[1]) == XML_B
+
+
+@pytest.mark.asyncio
+async def test_read_member_crc_mismatch():
+    data = _make_zip()
+    async with httpx.AsyncClient(transport=range_transport(data)) as client:
+        member = (await read_central_directory(client, URL))[1]
+        member["crc32"] ^= 1
+        with pytest.raises(ZipReadError):
+            await read_member(client, URL, member)
+
+
+@pytest.mark.asyncio
+async def test_missing_eocd():
+    async with httpx.AsyncClient(transport=range_transport(b"not a zip file")) as client:
+        with pytest.raises(ZipReadError):
+            await read_central_directory(client, URL)
+
+
+def test_apply_zip64_extra():
+    extra = struct.pack("<HHQQ", 0x0001, 16, 5_000_000_000, 4_900_000_000)
+    assert _apply_zip64_extra(extra, 0xFFFFFFFF, 0xFFFFFFFF, 1234) == (5_000_000_000, 4_900_000_000, 1234)
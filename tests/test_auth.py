@@ -0,0 +1,112 @@
+import hashlib
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.middleware import auth
+
+KEY = "npv_test"
+KEY_HASH = hashlib.sha256(KEY.encode()).hexdigest()
+KEY_ID = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def _empty_caches():
+    auth._keys.clear()
+    auth._last_used.clear()
+    yield
+    auth._keys.clear()
+    auth._last_used.clear()
+
+
+def _pool(row=None, execute=None):
+    conn = MagicMock()
+    conn.fetchrow = AsyncMock(return_value=row)
+    conn.execute = execute or AsyncMock()
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    return pool, conn
+
+
+def _row(is_active=True):
+    return {"id": KEY_ID, "name": "test", "plan": "free", "monthly_limit": 100, "is_active": is_active}
+
+
+async def test_repeat_requests_skip_postgres():
+    pool, conn = _pool(_row())
+    with patch("app.middleware.auth.get_pool", new_callable=AsyncMock, return_value=pool):
+        first = await auth.verify_api_key(KEY)
+        second = await auth.verify_api_key(KEY)
+
+    assert first == second == _row()
+    conn.fetchrow.assert_awaited_once()
+    conn.execute.assert_not_awaited()  # last_used_at is deferred
+    assert KEY_ID in auth._last_used
+
+
+async def test_notify_evicts_cached_key():
+    pool, conn = _pool(_row())
+    with patch("app.middleware.auth.get_pool", new_callable=AsyncMock, return_value=pool):
+        await auth.verify_api_key(KEY)
+        auth._on_key_change(None, 1, auth.KEY_CHANGES_CHANNEL, KEY_HASH)
+        conn.fetchrow.return_value = _row(is_active=False)
+        with pytest.raises(HTTPException) as exc_info:
+            await auth.verify_api_key(KEY)
+
+    assert exc_info.value.status_code == 403
+
+
+async def test_unknown_key_rejected():
+    pool, _ = _pool(None)
+    with patch("app.middleware.auth.get_pool", new_callable=AsyncMock, return_value=pool):
+        with pytest.raises(HTTPException) as exc_info:
+            await auth.verify_api_key(KEY)
+
+    assert exc_info.value.status_code == 401
+    assert not auth._keys
+
+
+async def test_flush_writes_last_used_in_one_update():
+    other = uuid.uuid4()
+    auth._last_used[KEY_ID] = "t1"
+    auth._last_used[other] = "t2"
+    pool, conn = _pool()
+    with patch("app.middleware.auth.get_pool", new_callable=AsyncMock, return_value=pool):
+        await auth.flush_last_used()
+
+    conn.execute.assert_awaited_once()
+    sql, *args = conn.execute.await_args.args
+    assert "FROM unnest($1::uuid[], $2::timestamptz[])" in sql
+    assert args == [[KEY_ID, other], ["t1", "t2"]]
+    assert not auth._last_used
+
+
+async def test_flush_uses_two_parameters_for_many_keys():
+    for n in range(20_000):
+        auth._last_used[uuid.uuid4()] = n
+    pool, conn = _pool()
+    with patch("app.middleware.auth.get_pool", new_callable=AsyncMock, return_value=pool):
+        await auth.flush_last_used()
+
+    conn.execute.assert_awaited_once()
+    _, ids, times = conn.execute.await_args.args
+    assert len(ids) == len(times) == 20_000
+    assert not auth._last_used
+
+
+async def test_failed_flush_keeps_newer_times():
+    auth._last_used[KEY_ID] = "old"
+    pool, conn = _pool()
+
+    async def fail(*args):
+        auth._last_used[KEY_ID] = "new"  # used again meanwhile
+        raise ConnectionError
+
+    conn.execute = AsyncMock(side_effect=fail)
+    with patch("app.middleware.auth.get_pool", new_callable=AsyncMock, return_value=pool):
+        await auth.flush_last_used()
+
+    assert auth._last_used == {KEY_ID: "new"}
@@ -1,9 +1,12 @@
-from unittest.mock import AsyncMock, patch
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from app.models.schemas import BatchVerifyRequest, VerifyResponse
-from app.routes.verify import verify_batch
+from app.models.schemas import BatchVerifyRequest, BatchVerifyResponse, VerifyResponse
+from app.routes import verify as verify_routes
+from app.utils.codec import Document
 
 MOCK_API_KEY_INFO = {
     "id": 1,
@@ -15,13 +18,49 @@ def _make_verify_response(ein: str, name: str) -> VerifyResponse:
     return VerifyResponse(ein=ein, legal_name=name, status="active")
 
 
+async def verify_batch(request, **kwargs) -> BatchVerifyResponse:
+    """Call the route and parse the JSON body it assembles."""
+    response = await verify_routes.verify_batch(request, **kwargs)
+    return BatchVerifyResponse.model_validate_json(response.body)
+
+
+@pytest.fixture(autouse=True)
+def _lease_always_granted():
+    """Every lookup wins its singleflight lease, so none touch real Redis."""
+    redis = MagicMock()
+    redis.set = AsyncMock(return_value=True)
+    redis.eval = AsyncMock(return_value=1)
+    with patch("app.utils.singleflight.get_redis", new_callable=AsyncMock, return_value=redis):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _cache_get_many_via_cache_get():
+    """Route cache_get_many through the (patched) cache_get so tests can stub one function."""
+    from app.services import verification
+
+    async def cache_get_many(keys):
+        found = {}
+        for key in keys:
+            value = await verification.cache_get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    with patch("app.services.verification.cache_get_many", side_effect=cache_get_many) as mock_many:
+        yield mock_many
+
+
+QUOTA = {"limit": 100, "remaining": 90, "reset": 1767225600, "count": 10, "allowed": True}
+
+
 def _patches():
     return (
-        patch("app.routes.verify.check_rate_limit_batch", new_callable=AsyncMock),
-        patch("app.routes.verify.verify_organization", new_callable=AsyncMock),
-        patch("app.routes.verify.cache_get", new_callable=AsyncMock),
-        patch("app.routes.verify.cache_set", new_callable=AsyncMock),
-        patch("app.routes.verify._record_usage", new_callable=AsyncMock),
+        patch("app.routes.verify.check_rate_limit_batch", new_callable=AsyncMock, return_value=QUOTA),
+        patch("app.services.verification.verify_organization", new_callable=AsyncMock),
+        patch("app.services.verification.cache_get", new_callable=AsyncMock),
+        patch("app.services.verification.cache_set", new_callable=AsyncMock),
+        patch("app.routes.verify._record_usage"),
     )
 
 
@@ -83,7 +122,7 @@ async def test_batch_invalid_ein_rejected():
     p_rl, p_vo, p_cg, p_cs, p_ru = _patches()
     with p_rl, p_vo, p_cg, p_cs, p_ru:
         with pytest.raises(HTTPException) as exc_info:
-            await verify_batch(
+            await verify_routes.verify_batch(
                 BatchVerifyRequest(eins=["bad-ein"]),
                 api_key_info=MOCK_API_KEY_INFO,
             )
@@ -154,3 +193,124 @@ async def test_batch_rate_limit_per_ein():
     mock_rl.assert_called_once()
     call_args = mock_rl.call_args
     assert call_args[0][1] == 3  # second positional arg is count
+
+
+@pytest.mark.asyncio
+async def test_batch_serves_stale_and_refreshes_in_background():
+    """Past the soft TTL the cached result is returned and refreshed behind the response."""
+    stale = {
+        "_swr": 1,
+        "soft_expires_at": 0,
+        "hard_expires_at": 4102444800,
+        "value": _make_verify_response("53-0196605", "RED CROSS").model_dump(),
+    }
+    p_rl, p_vo, p_cg, p_cs, p_ru = _patches()
+    with (
+        p_rl, p_vo as mock_vo, p_cg as mock_cg, p_cs, p_ru,
+        patch("app.services.verification.singleflight.refresh_in_background") as mock_refresh,
+    ):
+        mock_cg.return_value = stale
+        result = await verify_batch(
+            BatchVerifyRequest(eins=["53-0196605"]),
+            api_key_info=MOCK_API_KEY_INFO,
+        )
+
+    assert result.results[0].data.legal_name == "RED CROSS"
+    mock_vo.assert_not_called()
+    mock_refresh.assert_called_once()
+    assert mock_refresh.call_args.args[0] == "verify:530196605"
+
+
+@pytest.mark.asyncio
+async def test_batch_caches_with_soft_and_hard_expiry():
+    p_rl, p_vo, p_cg, p_cs, p_ru = _patches()
+    with p_rl, p_vo as mock_vo, p_cg as mock_cg, p_cs as mock_cs, p_ru:
+        mock_cg.return_value = None
+        mock_vo.return_value = _make_verify_response("53-0196605", "RED CROSS")
+        await verify_batch(BatchVerifyRequest(eins=["53-0196605"]), api_key_info=MOCK_API_KEY_INFO)
+
+    key, entry, ttl = mock_cs.call_args.args
+    assert key == "verify:530196605"
+    assert isinstance(entry, Document)
+    assert VerifyResponse.model_validate_json(entry.body).legal_name == "RED CROSS"
+    assert entry.soft_expires_at < entry.hard_expires_at
+
+
+@pytest.mark.asyncio
+async def test_batch_splices_cached_bodies_verbatim():
+    """Cached bodies are copied into the response, never re-validated."""
+    body = b'{"ein":"53-0196605","legal_name":"RED CROSS","status":"active"}'
+    p_rl, p_vo, p_cg, p_cs, p_ru = _patches()
+    with p_rl, p_vo as mock_vo, p_cg as mock_cg, p_cs, p_ru:
+        mock_cg.return_value = Document(body, 4102444800, 4102444800)
+        response = await verify_routes.verify_batch(
+            BatchVerifyRequest(eins=["53-0196605", "530196605"]),
+            api_key_info=MOCK_API_KEY_INFO,
+        )
+
+    mock_vo.assert_not_called()
+    assert response.media_type == "application/json"
+    assert response.body.count(body) == 2
+    assert response.body.startswith(b'{"total":2,"succeeded":2,"failed":0,')
+
+
+@pytest.mark.asyncio
+async def test_verify_hit_returns_cached_bytes():
+    body = b'{"ein":"53-0196605","legal_name":"RED CROSS","status":"active"}'
+    with (
+        patch("app.routes.verify.check_rate_limit", new_callable=AsyncMock, return_value=QUOTA),
+        patch("app.services.verification.cache_get", new_callable=AsyncMock,
+              return_value=Document(body, 4102444800, 4102444800)),
+        patch("app.routes.verify._record_usage"),
+    ):
+        response = await verify_routes.verify_nonprofit("53-0196605", api_key_info=MOCK_API_KEY_INFO)
+
+    assert response.body == body
+    assert response.headers["X-RateLimit-Remaining"] == "90"
+    assert response.headers["X-RateLimit-Reset"] == "1767225600"
+
+
+@pytest.mark.asyncio
+async def test_batch_resolves_hits_in_one_round_trip(_cache_get_many_via_cache_get):
+    """All cache keys go to one cache_get_many; only misses reach the enricher."""
+    hit = _make_verify_response("53-0196605", "RED CROSS").model_dump()
+    p_rl, p_vo, p_cg, p_cs, p_ru = _patches()
+    with p_rl, p_vo as mock_vo, p_cg as mock_cg, p_cs, p_ru:
+        mock_cg.side_effect = lambda key: hit if key == "verify:530196605" else None
+        mock_vo.return_value = _make_verify_response("13-1837418", "DOCTORS WITHOUT BORDERS")
+        result = await verify_batch(
+            BatchVerifyRequest(eins=["53-0196605", "13-1837418", "530196605"]),
+            api_key_info=MOCK_API_KEY_INFO,
+        )
+
+    _cache_get_many_via_cache_get.assert_called_once_with(["verify:530196605", "verify:131837418"])
+    mock_vo.assert_called_once()
+    assert [r.data.legal_name for r in result.results] == [
+        "RED CROSS", "DOCTORS WITHOUT BORDERS", "RED CROSS",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_batch_ndjson_streams_in_completion_order():
+    """Cache hits are written first; the last line summarizes the batch."""
+    hit = _make_verify_response("53-0196605", "RED CROSS").model_dump()
+
+    async def slow_verify(normalized):
+        await asyncio.sleep(0.02)
+        return _make_verify_response(normalized, "DOCTORS WITHOUT BORDERS")
+
+    p_rl, p_vo, p_cg, p_cs, p_ru = _patches()
+    with p_rl, p_vo as mock_vo, p_cg as mock_cg, p_cs, p_ru:
+        mock_cg.side_effect = lambda key: hit if key == "verify:530196605" else None
+        mock_vo.side_effect = slow_verify
+        response = await verify_routes.verify_batch(
+            BatchVerifyRequest(eins=["13-1837418", "53-0196605", "530196605"]),
+            api_key_info=MOCK_API_KEY_INFO,
+            accept="application/x-ndjson",
+        )
+        lines = [json.loads(line) async for chunk in response.body_iterator for line in chunk.splitlines()]
+
+    assert response.media_type == "application/x-ndjson"
+    assert [line.get("ein") for line in lines[:3]] == ["53-0196605", "53-0196605", "13-1837418"]
+    assert lines[2]["data"]["legal_name"] == "DOCTORS WITHOUT BORDERS"
+    assert lines[3] == {"total": 3, "succeeded": 3, "failed": 0}
@@ -0,0 +1,145 @@
+import asyncio
+import csv
+import io
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.auth import verify_api_key
+from app.models.schemas import Financials, VerifyResponse
+from app.routes.bulk_csv import ENRICHED_COLUMNS
+from app.utils.codec import Document
+
+UPLOAD = (
+    "Grantee,EIN\r\n"
+    '"Red Cross, The",53-0196605\r\n'
+    "Duplicate,530196605\r\n"
+    "Typo,12-34\r\n"
+    "Unknown,99-9999999\r\n"
+)
+
+
+def _document(ein: str, name: str) -> Document:
+    body = VerifyResponse(
+        ein=ein, legal_name=name, status="active", financials=Financials(revenue=1000)
+    ).model_dump_json().encode()
+    return Document(body, 4102444800, 4102444800)
+
+
+def _patches():
+    return (
+        patch("app.routes.bulk_csv.check_rate_limit_batch", new_callable=AsyncMock),
+        patch("app.routes.bulk_csv.cached_verify_many", new_callable=AsyncMock,
+              return_value={"53-0196605": _document("53-0196605", "RED CROSS")}),
+        patch("app.routes.bulk_csv.verify_coalesced", new_callable=AsyncMock,
+              return_value=Document(b"null", 4102444800, 4102444800, not_found=True)),
+        patch("app.routes.bulk_csv.usage.record"),
+    )
+
+
+def _post(body: str, **params):
+    app.dependency_overrides[verify_api_key] = lambda: {"id": 1, "monthly_limit": 100}
+    p_rl, p_cached, p_verify, p_usage = _patches()
+    try:
+        with p_rl as mock_rl, p_cached, p_verify, p_usage:
+            response = TestClient(app).post(
+                "/api/v1/verify/csv", content=body.encode(), params=params,
+                headers={"Content-Type": "text/csv"},
+            )
+        return response, mock_rl
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_csv_is_enriched_validated_and_verified_once_per_ein():
+    response, mock_rl = _post(UPLOAD, ein_column="EIN")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == ["Grantee", "EIN", *ENRICHED_COLUMNS]
+    by_name = {row["Grantee"]: row for row in rows}
+    assert set(by_name) == {"Red Cross, The", "Duplicate", "Typo", "Unknown"}
+    assert by_name["Red Cross, The"]["npv_legal_name"] == "RED CROSS"
+    assert by_name["Duplicate"]["npv_legal_name"] == "RED CROSS"
+    assert by_name["Red Cross, The"]["npv_revenue"] == "1000"
+    assert by_name["Typo"]["npv_error"].startswith("Invalid EIN format")
+    assert by_name["Unknown"]["npv_error"] == "No nonprofit found with EIN 99-9999999"
+    assert mock_rl.await_args.args[1] == 2  # unique valid EINs
+
+
+def test_repeat_after_its_ein_resolved_is_written_at_once():
+    # Windows of one EIN: the repeat arrives after the first window was flushed
+    with patch("app.routes.bulk_csv.MAX_BATCH_SIZE", 1):
+        response, mock_rl = _post(UPLOAD + "Again,53-0196605\r\n", ein_column="EIN")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["Grantee"] for row in rows if row["npv_legal_name"] == "RED CROSS"] == [
+        "Red Cross, The", "Duplicate", "Again",
+    ]
+    assert mock_rl.await_count == 2
+
+
+def test_eins_over_the_cap_fail_but_repeats_still_resolve():
+    with patch("app.routes.bulk_csv.MAX_CSV_EINS", 1):
+        response, mock_rl = _post(UPLOAD, ein_column="EIN")
+
+    by_name = {row["Grantee"]: row for row in csv.DictReader(io.StringIO(response.text))}
+    assert by_name["Duplicate"]["npv_legal_name"] == "RED CROSS"
+    assert by_name["Unknown"]["npv_error"].startswith("More than 1 EINs")
+    assert mock_rl.await_args.args[1] == 1
+
+
+def test_csv_without_the_named_column_is_rejected():
+    response, _ = _post(UPLOAD, ein_column="tax_id")
+    assert response.status_code == 400
+    assert "tax_id" in response.json()["detail"]
+
+
+def test_csv_over_size_limit_is_rejected():
+    with patch("app.routes.bulk_csv.MAX_CSV_BYTES", 20):
+        response, mock_rl = _post(UPLOAD, ein_column="EIN")
+    assert response.status_code == 413
+    mock_rl.assert_not_called()
+
+
+async def test_body_sent_over_many_messages_is_read_in_full():
+    """Like uvicorn (ASGI 2.3): rows trickle in while StreamingResponse also calls receive()."""
+    rows = [f"Org {i},{i:02d}-0000001\r\n".encode() for i in range(30)]
+    messages = [b"Grantee,EIN\r\n", *rows]
+    connected = asyncio.Event()
+
+    async def receive():
+        if messages:
+            await asyncio.sleep(0.005)
+            body = messages.pop(0)
+            return {"type": "http.request", "body": body, "more_body": bool(messages)}
+        await connected.wait()  # client stays connected
+        return {"type": "http.disconnect"}
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/v1/verify/csv", "raw_path": b"/api/v1/verify/csv",
+        "query_string": b"ein_column=EIN", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"text/csv")],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    app.dependency_overrides[verify_api_key] = lambda: {"id": 1, "monthly_limit": 100}
+    p_rl, p_cached, p_verify, p_usage = _patches()
+    try:
+        with p_rl, p_cached as mock_cached, p_verify, p_usage:
+            mock_cached.return_value = {}
+            await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert sent[0]["status"] == 200
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    result = list(csv.DictReader(io.StringIO(body.decode())))
+    assert sorted(row["Grantee"] for row in result) == sorted(f"Org {i}" for i in range(30))
@@ -0,0 +1,143 @@
+import contextlib
+import json
+import zipfile
+from unittest.mock import AsyncMock, patch
+
+
+from app.services import bulk_ingest
+from app.services.bulk_ingest import (
+    load_archive,
+    member_names,
+    parse_archive,
+    parse_member,
+    rows_from_filing,
+)
+from app.services.irs_990 import _filing_from_row, get_filing_data
+from tests.test_irs_990 import SAMPLE_990_XML_FULL
+
+ARCHIVE = "2023/2023_TEOS_XML_01A"
+HEADER = b"""<ReturnHeader>
+    <TaxPeriodEndDt>2022-12-31</TaxPeriodEndDt>
+    <ReturnTypeCd>%s</ReturnTypeCd>
+    <Filer><EIN>%s</EIN></Filer>
+  </ReturnHeader>
+  <ReturnData>"""
+
+
+def _with_header(ein: str, return_type: str = "990") -> bytes:
+    return SAMPLE_990_XML_FULL.replace(b"<ReturnData>", HEADER % (return_type.encode(), ein.encode()), 1)
+
+
+def _make_zip(path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("2023_TEOS_XML_01A/202301000000000100_public.xml", _with_header("530196605"))
+        z.writestr("2023_TEOS_XML_01A/202301000000000200_public.xml", _with_header("131624100"))
+        z.writestr("2023_TEOS_XML_01A/202301000000000300_public.xml", _with_header("111111111", "990T"))
+        z.writestr("2023_TEOS_XML_01A/README.txt", b"not a filing")
+    return str(path)
+
+
+class FakeConn:
+    def __init__(self):
+        self.executed = []
+        self.copied = {}
+
+    @contextlib.asynccontextmanager
+    async def _transaction(self):
+        yield
+
+    def transaction(self):
+        return self._transaction()
+
+    async def execute(self, sql, *args):
+        self.executed.append((sql, args))
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copied.setdefault(table, []).extend(records)
+
+
+def test_rows_from_filing():
+    parsed = bulk_ingest.extract(_with_header("530196605"), bulk_ingest.SECTIONS + ("filer",))
+    filing, officers, schedule_j = rows_from_filing(202301000000000100, ARCHIVE, parsed)
+
+    assert filing[:5] == (202301000000000100, "530196605", 202212, "990", ARCHIVE)
+    assert len(filing) == len(bulk_ingest.FILING_COLUMNS)
+    assert officers[0][:3] == (202301000000000100, 0, "Jane Doe")
+    assert [row[1] for row in officers] == list(range(len(officers)))
+    assert schedule_j[0][2] == "Jane Doe"
+
+
+def test_rows_from_filing_skips_unsupported_returns():
+    parsed = bulk_ingest.extract(_with_header("111111111", "990T"), bulk_ingest.SECTIONS + ("filer",))
+    assert rows_from_filing(1, ARCHIVE, parsed) is None
+
+
+def test_parse_member(tmp_path):
+    path = _make_zip(tmp_path / "a.zip")
+    names = member_names(path)
+    assert len(names) == 3
+
+    rows = parse_member(path, ARCHIVE, names[1])
+    assert rows[0][1] == "131624100"
+
+
+async def test_parse_archive_bounds_in_flight(tmp_path):
+    path = _make_zip(tmp_path / "a.zip")
+    names = member_names(path)
+
+    results = [rows async for rows in parse_archive(path, ARCHIVE, names, None, max_pending=1)]
+
+    assert sorted(rows[0][1] for rows in results) == ["131624100", "530196605"]
+
+
+async def test_load_archive_copies_in_batches(tmp_path):
+    path = _make_zip(tmp_path / "a.zip")
+    conn = FakeConn()
+
+    count = await load_archive(
+        conn, ARCHIVE, parse_archive(path, ARCHIVE, member_names(path), None), batch_size=1
+    )
+
+    assert count == 2
+    assert len(conn.copied["stage_filings"]) == 2
+    assert {row[0] for row in conn.copied["stage_officers"]} == {
+        row[0] for row in conn.copied["stage_filings"]
+    }
+    progress = [args for sql, args in conn.executed if "filing_ingest_progress" in sql]
+    assert progress == [(ARCHIVE, 2)]
+    replace = [args for sql, args in conn.executed if sql.startswith("DELETE FROM filings")]
+    assert replace == [(ARCHIVE,)]
+
+
+def test_filing_from_row():
+    row = {
+        "contributions_and_grants": 100, "program_service_revenue": None,
+        "investment_income": None, "other_revenue": None, "total_revenue": 100,
+        "program_services": None, "management_and_general": None,
+        "fundraising": None, "total_expenses": None,
+        "officers": json.dumps([{"name": "Jane Doe", "title": "ED",
+                                 "compensation": 1, "hours_per_week": 40.0}]),
+        "schedule_j": "[]",
+    }
+    data = _filing_from_row(row)
+    assert data["revenue_breakdown"]["total_revenue"] == 100
+    assert data["expense_breakdown"] is None
+    assert data["officers"][0]["name"] == "Jane Doe"
+    assert data["schedule_j"] == []
+
+
+async def test_get_filing_data_reads_store():
+    stored = {"officers": [], "revenue_breakdown": None, "expense_breakdown": None, "schedule_j": []}
+    with (
+        patch("app.services.irs_990.settings") as mock_settings,
+        patch("app.services.irs_990.cache_get", new_callable=AsyncMock, return_value=None),
+        patch("app.services.irs_990.cache_set", new_callable=AsyncMock) as mock_set,
+        patch("app.services.irs_990._select_stored_filing", new_callable=AsyncMock, return_value=stored),
+        patch("app.services.irs_990._iter_filings") as mock_iter,
+    ):
+        mock_settings.filing_store = True
+        result = await get_filing_data("530196605")
+
+    assert result == stored
+    mock_iter.assert_not_called()
+    mock_set.assert_awaited_once()
@@ -0,0 +1,192 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.utils import cache, codec
+from app.utils.local_cache import LocalCache
+
+
+@pytest.fixture(autouse=True)
+def _empty_l1():
+    cache._l1.clear()
+    yield
+    cache._l1.clear()
+
+
+def _redis(stored: dict | None = None):
+    r = MagicMock()
+    r.get = AsyncMock(side_effect=lambda key: (stored or {}).get(key))
+    r.set = AsyncMock()
+    r.publish = AsyncMock()
+    r.mget = AsyncMock(side_effect=lambda keys: [(stored or {}).get(k) for k in keys])
+    return r
+
+
+def _patch_redis(r):
+    return patch("app.utils.cache.get_cache_redis", new_callable=AsyncMock, return_value=r)
+
+
+def test_local_cache_evicts_by_bytes():
+    l1 = LocalCache(max_bytes=1600, ttl=60)
+    for i in range(20):
+        l1.set(f"verify:{i}", {"i": i}, size=100)
+    assert l1.bytes == 1600
+    assert len(l1) == 16
+    assert l1.get("verify:0") is None
+    assert l1.get("verify:19") == {"i": 19}
+    assert l1.evictions == 4
+
+
+def test_local_cache_keeps_recently_used():
+    l1 = LocalCache(max_bytes=1600, ttl=60)
+    for i in range(16):
+        l1.set(f"verify:{i}", i, size=100)
+    l1.get("verify:0")
+    l1.set("verify:new", "x", size=100)
+    assert l1.get("verify:0") == 0
+    assert l1.get("verify:1") is None
+
+
+def test_local_cache_skips_oversized_entries():
+    l1 = LocalCache(max_bytes=1600, ttl=60)
+    l1.set("verify:big", "x", size=500)
+    assert l1.get("verify:big") is None
+
+
+def test_local_cache_expires():
+    l1 = LocalCache(max_bytes=1600, ttl=60)
+    l1.set("verify:1", "x", size=10, ttl=0)
+    assert l1.get("verify:1") is None
+    assert l1.bytes == 0
+
+
+async def test_cache_get_serves_hot_keys_from_l1():
+    r = _redis({"verify:530196605": codec.encode({"legal_name": "RED CROSS"})})
+    with _patch_redis(r):
+        first = await cache.cache_get("verify:530196605")
+        second = await cache.cache_get("verify:530196605")
+
+    assert first == second == {"legal_name": "RED CROSS"}
+    assert r.get.await_count == 1
+
+
+async def test_cache_get_bypasses_l1_for_other_keys():
+    r = _redis({"990index:530196605": json.dumps({"year": 2023}).encode()})
+    with _patch_redis(r):
+        await cache.cache_get("990index:530196605")
+        await cache.cache_get("990index:530196605")
+
+    assert r.get.await_count == 2
+
+
+async def test_cache_set_updates_l1_and_publishes():
+    r = _redis()
+    with _patch_redis(r):
+        await cache.cache_set("state:CA:530196605", {"state": "CA"}, 60)
+        assert await cache.cache_get("state:CA:530196605") == {"state": "CA"}
+
+    r.get.assert_not_awaited()
+    channel, message = r.publish.await_args.args
+    assert channel == cache.INVALIDATION_CHANNEL
+    assert message.endswith(" state:CA:530196605")
+
+
+async def test_invalidation_from_other_worker_evicts():
+    cache._l1.set("verify:1", {"a": 1}, 10)
+    cache._l1.set("verify:2", {"b": 2}, 10)
+    messages = [
+        {"type": "subscribe", "data": 1},
+        {"type": "message", "data": "otherworker verify:1"},
+        {"type": "message", "data": f"{cache._WORKER_ID} verify:2"},
+    ]
+    seen = asyncio.Event()
+
+    async def listen():
+        for message in messages:
+            yield message
+        seen.set()
+        await asyncio.sleep(3600)
+
+    pubsub = MagicMock()
+    pubsub.subscribe = AsyncMock()
+    pubsub.aclose = AsyncMock()
+    pubsub.listen = listen
+    r = MagicMock()
+    r.pubsub.return_value = pubsub
+
+    with patch("app.utils.cache.get_redis", new_callable=AsyncMock, return_value=r):
+        task = asyncio.create_task(cache.listen_for_invalidations())
+        await asyncio.wait_for(seen.wait(), 1)
+        assert cache._l1.get("verify:1") is None
+        assert cache._l1.get("verify:2") == {"b": 2}
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+async def test_cache_set_writes_encoded_bytes():
+    r = _redis()
+    with _patch_redis(r):
+        await cache.cache_set("990index:530196605", {"year": 2023}, 60)
+
+    key, data = r.set.await_args.args
+    assert data == b'\x01{"year":2023}'
+
+
+def test_swr_fresh_then_stale_then_expired():
+    document = cache.swr_document(b'{"legal_name":"RED CROSS"}', soft_ttl=100, hard_ttl=1000)
+    assert cache.swr_unwrap(document) == (document, False)
+
+    with patch("app.utils.cache.time.time", return_value=document.soft_expires_at + 1):
+        assert cache.swr_unwrap(document) == (document, True)
+    with patch("app.utils.cache.time.time", return_value=document.hard_expires_at + 1):
+        assert cache.swr_unwrap(document) == (None, False)
+
+
+def test_swr_soft_expiry_is_jittered():
+    soft = {round(cache.swr_document(b"{}", 1000, 5000).soft_expires_at % 1000, 3) for _ in range(20)}
+    assert len(soft) > 1
+    document = cache.swr_document(b"{}", 1000, 5000)
+    assert document.soft_expires_at - document.hard_expires_at <= -4000
+
+
+def test_swr_legacy_values_become_documents():
+    document, stale = cache.swr_unwrap({"legal_name": "RED CROSS"})
+    assert document.body == b'{"legal_name":"RED CROSS"}'
+    assert not stale and not document.not_found
+
+    envelope = {"_swr": 1, "soft_expires_at": 0, "hard_expires_at": 4102444800, "value": {"_not_found": True}}
+    document, stale = cache.swr_unwrap(envelope)
+    assert document.not_found and stale
+    assert cache.swr_unwrap(None) == (None, False)
+
+
+async def test_cache_get_many_one_round_trip_after_l1():
+    cache._l1.set("verify:1", {"a": 1}, 10)
+    r = _redis({"verify:2": codec.encode({"b": 2}), "990index:3": codec.encode({"c": 3})})
+    with _patch_redis(r):
+        found = await cache.cache_get_many(["verify:1", "verify:2", "990index:3", "verify:4"])
+
+    assert found == {"verify:1": {"a": 1}, "verify:2": {"b": 2}, "990index:3": {"c": 3}}
+    r.mget.assert_awaited_once_with(["verify:2", "990index:3", "verify:4"])
+    assert cache._l1.get("verify:2") == {"b": 2}
+
+
+async def test_cache_set_many_pipelines_writes():
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    r = _redis()
+    r.pipeline = MagicMock(return_value=pipe)
+    with _patch_redis(r):
+        await cache.cache_set_many([("verify:1", {"a": 1}, 60), ("990index:2", {"b": 2}, 30)])
+
+    assert [c.args[0] for c in pipe.set.call_args_list] == ["verify:1", "990index:2"]
+    assert [c.kwargs["ex"] for c in pipe.set.call_args_list] == [60, 30]
+    pipe.publish.assert_called_once()
+    pipe.execute.assert_awaited_once()
+    r.set.assert_not_awaited()
+    assert cache._l1.get("verify:1") == {"a": 1}
@@ -0,0 +1,70 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import codec
+
+LARGE = {
+    "legal_name": "American National Red Cross",
+    "personnel": [
+        {"name": f"Person {i}", "title": "Director", "compensation": 1000 * i, "hours_per_week": 2.0}
+        for i in range(100)
+    ],
+}
+
+
+def test_small_values_stay_uncompressed():
+    data = codec.encode({"_not_found": True})
+    assert data == b'\x01{"_not_found":true}'
+    assert codec.decode(data) == {"_not_found": True}
+
+
+def test_large_values_are_compressed():
+    data = codec.encode(LARGE)
+    assert data[0] == codec.ZLIB
+    assert len(data) < len(json.dumps(LARGE)) / 4
+    assert codec.decode(data) == LARGE
+
+
+def test_reads_legacy_plain_json():
+    legacy = json.dumps(LARGE, default=str).encode()
+    assert codec.is_legacy(legacy)
+    assert codec.decode(legacy) == LARGE
+    assert not codec.is_legacy(codec.encode(LARGE))
+
+
+def test_decode_sized_reports_json_size():
+    value, size = codec.decode_sized(codec.encode(LARGE))
+    assert value == LARGE
+    assert size == len(codec.dumps(LARGE))
+
+
+def test_zstd_falls_back_to_zlib_when_missing():
+    with (
+        patch("app.utils.codec.settings") as mock_settings,
+        patch("app.utils.codec.zstandard", None),
+    ):
+        mock_settings.cache_compression = "zstd"
+        mock_settings.cache_compress_min_bytes = 1024
+        assert codec.encode(LARGE)[0] == codec.ZLIB
+
+
+def test_unknown_zstd_value_without_package():
+    with patch("app.utils.codec.zstandard", None):
+        with pytest.raises(codec.CodecError):
+            codec.decode(bytes((codec.ZSTD,)) + b"junk")
+
+
+def test_documents_keep_their_body_bytes():
+    body = json.dumps(LARGE, separators=(",", ":")).encode()
+    document = codec.Document(body, 100.0, 200.0)
+    data = codec.encode(document)
+    assert data[0] == codec.DOCUMENT_ZLIB
+    assert codec.decode_sized(data) == (document, len(body))
+
+    not_found = codec.Document(b"null", 1.5, 2.5, not_found=True)
+    data = codec.encode(not_found)
+    assert data[0] == codec.DOCUMENT
+    assert codec.decode(data) == not_found
+    assert not codec.is_legacy(data)
@@ -0,0 +1,110 @@
+from app.services.efile_extractor import FORM_SPECS, RETURN_TYPES, extract
+
+SAMPLE_990EZ_XML = b"""<?xml version="1.0" encoding="utf-8"?>
+<Return xmlns="http://www.irs.gov/efile" returnVersion="2022v5.0">
+  <ReturnHeader><ReturnTypeCd>990EZ</ReturnTypeCd></ReturnHeader>
+  <ReturnData>
+    <IRS990EZ>
+      <ContributionsGiftsGrantsEtcAmt>150000</ContributionsGiftsGrantsEtcAmt>
+      <ProgramServiceRevenueAmt>20000</ProgramServiceRevenueAmt>
+      <InvestmentIncomeAmt>500</InvestmentIncomeAmt>
+      <OtherRevenueTotalAmt>0</OtherRevenueTotalAmt>
+      <TotalRevenueAmt>170500</TotalRevenueAmt>
+      <TotalExpensesAmt>160000</TotalExpensesAmt>
+      <TotalProgramServiceExpensesAmt>140000</TotalProgramServiceExpensesAmt>
+      <OfficerDirectorTrusteeEmplGrp>
+        <PersonNm>MARY JONES</PersonNm>
+        <TitleTxt>PRESIDENT</TitleTxt>
+        <AverageHrsPerWkDevotedToPosRt>10.00</AverageHrsPerWkDevotedToPosRt>
+        <CompensationAmt>30000</CompensationAmt>
+        <EmployeeBenefitProgramAmt>2000</EmployeeBenefitProgramAmt>
+      </OfficerDirectorTrusteeEmplGrp>
+      <OfficerDirectorTrusteeEmplGrp>
+        <PersonNm>BOB LEE</PersonNm>
+        <TitleTxt>TREASURER</TitleTxt>
+        <AverageHrsPerWkDevotedToPosRt>1.00</AverageHrsPerWkDevotedToPosRt>
+      </OfficerDirectorTrusteeEmplGrp>
+    </IRS990EZ>
+  </ReturnData>
+</Return>"""
+
+SAMPLE_990PF_XML = b"""<?xml version="1.0" encoding="utf-8"?>
+<Return xmlns="http://www.irs.gov/efile" returnVersion="2022v5.0">
+  <ReturnData>
+    <IRS990PF>
+      <AnalysisOfRevenueAndExpenses>
+        <ContriRcvdRevAndExpnssAmt>1000000</ContriRcvdRevAndExpnssAmt>
+        <InterestOnSavRevAndExpnssAmt>5000</InterestOnSavRevAndExpnssAmt>
+        <DividendsRevAndExpnssAmt>45000</DividendsRevAndExpnssAmt>
+        <OtherIncomeRevAndExpnssAmt>1000</OtherIncomeRevAndExpnssAmt>
+        <TotalRevAndExpnssAmt>1051000</TotalRevAndExpnssAmt>
+        <TotalExpensesRevAndExpnssAmt>800000</TotalExpensesRevAndExpnssAmt>
+        <TotalExpensesDsbrsChrtblAmt>750000</TotalExpensesDsbrsChrtblAmt>
+      </AnalysisOfRevenueAndExpenses>
+      <OfficerDirTrstKeyEmplInfoGrp>
+        <OfficerDirTrstKeyEmplGrp>
+          <BusinessName>
+            <BusinessNameLine1Txt>FIRST BANK TRUST CO</BusinessNameLine1Txt>
+          </BusinessName>
+          <TitleTxt>TRUSTEE</TitleTxt>
+          <AverageHrsPerWkDevotedToPosRt>2.00</AverageHrsPerWkDevotedToPosRt>
+          <CompensationAmt>25000</CompensationAmt>
+        </OfficerDirTrstKeyEmplGrp>
+      </OfficerDirTrstKeyEmplInfoGrp>
+    </IRS990PF>
+  </ReturnData>
+</Return>"""
+
+
+def test_return_types():
+    assert set(RETURN_TYPES) == {"990", "990EZ", "990PF"}
+    assert set(FORM_SPECS["990"].sections) | {"schedule_j"} == {
+        "officers", "revenue_breakdown", "expense_breakdown", "schedule_j",
+    }
+
+
+def test_extract_990ez():
+    result = extract(SAMPLE_990EZ_XML)
+    assert result["officers"] == [
+        {"name": "Mary Jones", "title": "PRESIDENT", "compensation": 32000, "hours_per_week": 10.0},
+        {"name": "Bob Lee", "title": "TREASURER", "compensation": None, "hours_per_week": 1.0},
+    ]
+    assert result["revenue_breakdown"] == {
+        "contributions_and_grants": 150000,
+        "program_service_revenue": 20000,
+        "investment_income": 500,
+        "other_revenue": 0,
+        "total_revenue": 170500,
+    }
+    assert result["expense_breakdown"] == {
+        "program_services": 140000,
+        "management_and_general": None,
+        "fundraising": None,
+        "total_expenses": 160000,
+    }
+    assert result["schedule_j"] == []
+
+
+def test_extract_990pf():
+    result = extract(SAMPLE_990PF_XML)
+    assert result["officers"] == [
+        {"name": "First Bank Trust Co", "title": "TRUSTEE", "compensation": 25000, "hours_per_week": 2.0},
+    ]
+    assert result["revenue_breakdown"]["investment_income"] == 50000
+    assert result["revenue_breakdown"]["program_service_revenue"] is None
+    assert result["revenue_breakdown"]["total_revenue"] == 1051000
+    assert result["expense_breakdown"]["program_services"] == 750000
+    assert result["expense_breakdown"]["total_expenses"] == 800000
+
+
+def test_extract_stops_after_main_form_without_schedule_j():
+    # A 990-EZ can't carry Schedule J, so nothing after </IRS990EZ> is read
+    xml = SAMPLE_990EZ_XML.replace(b"</IRS990EZ>", b"</IRS990EZ><IRS990ScheduleO><broken")
+    result = extract(xml)
+    assert len(result["officers"]) == 2
+    assert result["schedule_j"] == []
+
+
+def test_extract_requested_sections_only():
+    result = extract(SAMPLE_990PF_XML, sections=("officers",))
+    assert list(result) == ["officers"]
@@ -1,3 +1,5 @@
+import asyncio
+import time
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -240,3 +242,52 @@ async def test_verify_no_state_registrations():
     assert result is not None
     assert result.state_registrations == []
     assert result.data_sources.state_registries is None
+
+
+def _delayed(seconds, value):
+    async def fetch(*args):
+        await asyncio.sleep(seconds)
+        return value
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_verify_fetches_sources_concurrently():
+    """A cold lookup costs the slowest upstream, not the sum."""
+    p1, p2, p3 = _patch_enricher()
+    with p1 as mock_pp, p2 as mock_990, p3 as mock_state:
+        mock_pp.side_effect = _delayed(0.1, MOCK_PROPUBLICA)
+        mock_990.side_effect = _delayed(0.1, MOCK_FILING_DATA)
+        mock_state.side_effect = _delayed(0.1, [])
+        start = time.perf_counter()
+        result = await verify_organization("53-0196605")
+        elapsed = time.perf_counter() - start
+
+    assert result is not None
+    assert result.personnel[0].name == "Jane Doe"
+    assert elapsed < 0.25
+
+
+@pytest.mark.asyncio
+async def test_verify_stub_cancels_speculative_fetches():
+    cancelled = []
+
+    async def slow(*args):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    p1, p2, p3 = _patch_enricher()
+    with p1 as mock_pp, p2 as mock_990, p3 as mock_state:
+        mock_pp.side_effect = _delayed(0.01, {
+            "organization": {"name": "Unknown Organization", "subsection_code": None, "ruling_date": None},
+            "filings_with_data": [],
+        })
+        mock_990.side_effect = slow
+        mock_state.side_effect = slow
+        result = await verify_organization("99-9999999")
+
+    assert result is None
+    assert len(cancelled) == 2
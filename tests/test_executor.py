@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.utils import executor
+from app.utils.executor import parser_stats, run_parser, shutdown_executor
+
+
+def _thread_name(x):
+    return threading.current_thread().name, x * 2
+
+
+def _boom():
+    raise ValueError("bad document")
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    shutdown_executor()
+    yield
+    shutdown_executor()
+
+
+@pytest.mark.asyncio
+async def test_runs_off_event_loop_thread():
+    name, value = await run_parser(_thread_name, 21)
+    assert value == 42
+    assert name.startswith("parser")
+
+
+@pytest.mark.asyncio
+async def test_inline_mode():
+    with patch.object(executor.settings, "parser_executor", "inline"):
+        name, _ = await run_parser(_thread_name, 1)
+    assert name == threading.current_thread().name
+
+
+@pytest.mark.asyncio
+async def test_failure_propagates_and_is_counted():
+    before = parser_stats()["failed"]
+    with pytest.raises(ValueError):
+        await run_parser(_boom)
+    stats = parser_stats()
+    assert stats["failed"] == before + 1
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pending_calls_are_bounded():
+    gate = threading.Event()
+    running = []
+
+    def _blocking(i):
+        running.append(i)
+        gate.wait(5)
+        return i
+
+    with patch.object(executor.settings, "parser_max_pending", 2):
+        tasks = [asyncio.create_task(run_parser(_blocking, i)) for i in range(5)]
+        await asyncio.sleep(0.1)
+        assert parser_stats()["in_flight"] == 2
+        assert parser_stats()["waiting"] == 3
+        gate.set()
+        assert sorted(await asyncio.gather(*tasks)) == [0, 1, 2, 3, 4]
+    assert parser_stats()["waiting"] == 0
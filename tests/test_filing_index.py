@@ -0,0 +1,197 @@
+import csv
+import io
+
+import httpx
+import pytest
+
+from app.services import filing_index
+from app.services.filing_index import FilingIndex, _ingest_year, ingest_rows, write_index
+
+INDEX_2023_CSV = """RETURN_ID,FILING_TYPE,EIN,TAX_PERIOD,SUB_DATE,TAXPAYER_NAME,RETURN_TYPE,DLN,OBJECT_ID,XML_BATCH_ID
+1,EFILE,530196605,202206,2023,"AMERICAN NATIONAL RED CROSS, THE",990,93493,202301349349300100,2023_TEOS_XML_01A
+2,EFILE,131837418,202212,2023,DOCTORS WITHOUT BORDERS,990,93493,202301349349300200,2023_TEOS_XML_01A
+3,EFILE,123456789,202212,2023,SMALL ORG UBIT,990T,93491,202301349149300300,2023_TEOS_XML_02A
+"""
+
+INDEX_2024_CSV = """RETURN_ID,FILING_TYPE,EIN,TAX_PERIOD,SUB_DATE,TAXPAYER_NAME,RETURN_TYPE,DLN,OBJECT_ID,XML_BATCH_ID
+4,EFILE,530196605,202306,2024,AMERICAN NATIONAL RED CROSS,990,93493,202401349349300400,2024_TEOS_XML_03A
+"""
+
+
+def _rows(text: str):
+    return csv.reader(io.StringIO(text))
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    records: dict[int, tuple] = {}
+    ingest_rows(_rows(INDEX_2023_CSV), 2023, records)
+    ingest_rows(_rows(INDEX_2024_CSV), 2024, records)
+    path = str(tmp_path / "filing_index.bin")
+    write_index(path, records)
+    return path
+
+
+def test_ingest_skips_header_and_other_forms():
+    records: dict[int, tuple] = {}
+    accepted = ingest_rows(_rows(INDEX_2023_CSV), 2023, records)
+    assert accepted == 2
+    assert set(records) == {530196605, 131837418}
+
+
+def test_ingest_accepts_990ez_and_990pf():
+    rows = [
+        ["5", "EFILE", "111111111", "202212", "2023", "SMALL ORG", "990EZ", "1", "202301000000000500", "2023_TEOS_XML_01A"],
+        ["6", "EFILE", "222222222", "202212", "2023", "FAMILY FDN", "990PF", "1", "202301000000000600", "2023_TEOS_XML_01A"],
+    ]
+    records: dict[int, tuple] = {}
+    assert ingest_rows(rows, 2023, records) == 2
+    assert records[111111111][4] == "990EZ"
+    assert records[222222222][4] == "990PF"
+
+
+def test_lookup_returns_latest_filing(index_path):
+    idx = FilingIndex(index_path)
+    try:
+        result = idx.lookup("530196605")
+    finally:
+        idx.close()
+    assert result == {
+        "year": 2024,
+        "object_id": "202401349349300400",
+        "zip_filename": "2024_TEOS_XML_03A",
+        "tax_period": "202306",
+        "return_type": "990",
+    }
+
+
+def test_lookup_missing_ein(index_path):
+    idx = FilingIndex(index_path)
+    try:
+        assert len(idx) == 2
+        assert idx.lookup("999999999") is None
+        assert idx.lookup("000000001") is None
+        assert idx.lookup("131837418")["object_id"] == "202301349349300200"
+    finally:
+        idx.close()
+
+
+def test_open_index_sets_ready_flag(index_path):
+    try:
+        assert filing_index.open_index(index_path) is True
+        assert filing_index.is_ready()
+        assert filing_index.lookup("131837418")["year"] == 2023
+    finally:
+        filing_index.close_index()
+    assert not filing_index.is_ready()
+
+
+def test_open_index_missing_file(tmp_path):
+    assert filing_index.open_index(str(tmp_path / "missing.bin")) is False
+    assert not filing_index.is_ready()
+
+
+# --- Incremental refresh ---
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_ingest_year_full_then_tail():
+    body = INDEX_2023_CSV.encode()
+    tail = b"5,EFILE,131837418,202306,2023,DOCTORS WITHOUT BORDERS,990,93493,202301349349300500,2023_TEOS_XML_04A\n"
+    seen_headers = []
+
+    def handler(request):
+        seen_headers.append(request.headers)
+        if "range" not in request.headers:
+            return httpx.Response(200, content=body, headers={"etag": '"v1"'})
+        assert request.headers["range"] == f"bytes={len(body)}-"
+        assert request.headers["if-range"] == '"v1"'
+        return httpx.Response(206, content=tail, headers={"etag": '"v2"'})
+
+    records: dict[int, tuple] = {}
+    async with _client(handler) as client:
+        state, accepted = await _ingest_year(client, 2023, records, None)
+        assert accepted == 2
+        assert state["length"] == len(body)
+
+        state, accepted = await _ingest_year(client, 2023, records, state)
+
+    assert accepted == 1
+    assert state == {"length": len(body) + len(tail), "etag": '"v2"', "last_modified": None}
+    assert records[131837418][2] == "202301349349300500"
+
+
+@pytest.mark.asyncio
+async def test_ingest_year_partial_last_line_not_consumed():
+    body = INDEX_2024_CSV.encode() + b"9,EFILE,1111"
+
+    def handler(request):
+        return httpx.Response(200, content=body)
+
+    records: dict[int, tuple] = {}
+    async with _client(handler) as client:
+        state, accepted = await _ingest_year(client, 2024, records, None)
+    assert accepted == 1
+    assert state["length"] == len(INDEX_2024_CSV.encode())
+
+
+@pytest.mark.asyncio
+async def test_ingest_year_unterminated_last_row_ingested_and_reread():
+    head = INDEX_2024_CSV.encode()
+    last = b"9,EFILE,131837418,202312,2024,DOCTORS WITHOUT BORDERS,990,93493,202401349349300900,2024_TEOS_XML_05A"
+    ranges = []
+
+    def handler(request):
+        ranges.append(request.headers.get("range"))
+        if "range" not in request.headers:
+            return httpx.Response(200, content=head + last)
+        return httpx.Response(206, content=last)
+
+    records: dict[int, tuple] = {}
+    async with _client(handler) as client:
+        state, accepted = await _ingest_year(client, 2024, records, None)
+        assert accepted == 2
+        assert state["length"] == len(head)
+        assert records[131837418][2] == "202401349349300900"
+
+        state, accepted = await _ingest_year(client, 2024, records, state)
+    assert ranges[1] == f"bytes={len(head)}-"
+    assert accepted == 1
+    assert state["length"] == len(head)
+    assert records[131837418][2] == "202401349349300900"
+
+
+@pytest.mark.asyncio
+async def test_ingest_year_unchanged_returns_416():
+    state = {"length": 100, "etag": '"v1"', "last_modified": None}
+
+    def handler(request):
+        return httpx.Response(416)
+
+    records: dict[int, tuple] = {}
+    async with _client(handler) as client:
+        new_state, accepted = await _ingest_year(client, 2024, records, state)
+    assert accepted == 0
+    assert new_state == state
+    assert records == {}
+
+
+def test_reload_if_changed(index_path):
+    try:
+        filing_index.open_index(index_path)
+        assert filing_index.reload_if_changed() is False
+
+        idx = FilingIndex(index_path)
+        records = idx.records()
+        idx.close()
+        del records[131837418]
+        write_index(index_path, records)
+
+        assert filing_index.reload_if_changed() is True
+        assert filing_index.lookup("131837418") is None
+    finally:
+        filing_index.close_index()
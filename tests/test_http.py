@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.utils import http
+
+
+@pytest.fixture(autouse=True)
+async def _reset_clients():
+    yield
+    await http.close_clients()
+
+
+async def test_client_reused_per_upstream():
+    a = http.get_client("propublica", timeout=10.0)
+    assert http.get_client("propublica", timeout=10.0) is a
+    assert http.get_client("irs", timeout=30.0) is not a
+
+
+async def test_client_keeps_no_cookies():
+    client = http.get_client("state:CA", timeout=15.0)
+    request = httpx.Request("GET", "https://example.org/")
+    response = httpx.Response(200, headers={"Set-Cookie": "session=abc"}, request=request)
+    client.cookies.extract_cookies(response)
+    assert not client.cookies
+
+
+async def test_close_clients():
+    client = http.get_client("irs", timeout=30.0)
+    await http.close_clients()
+    assert client.is_closed
+    assert http.get_client("irs", timeout=30.0) is not client
+
+
+async def test_http2_falls_back_without_h2():
+    with (
+        patch("app.utils.http.settings") as mock_settings,
+        patch.dict("sys.modules", {"h2": None}),
+    ):
+        mock_settings.http_2 = True
+        assert http._http2_available() is False
@@ -1,15 +1,13 @@
-import xml.etree.ElementTree as ET
+from unittest.mock import patch
 
+import httpx
 import pytest
 
+from app.services.efile_extractor import title_case
 from app.services.irs_990 import (
+    _fetch_and_parse_all,
     _parse_all_from_xml,
-    _parse_expense_breakdown,
-    _parse_officers_from_xml,
-    _parse_revenue_breakdown,
-    _parse_schedule_j,
-    _title_case,
-    IRS_NS,
+    _search_year_index,
 )
 
 SAMPLE_990_XML = b"""<?xml version="1.0" encoding="utf-8"?>
@@ -88,8 +86,12 @@ SAMPLE_990_XML_FULL = b"""<?xml version="1.0" encoding="utf-8"?>
 </Return>"""
 
 
+def _officers(xml: bytes) -> list[dict]:
+    return _parse_all_from_xml(xml, sections=("officers",))["officers"]
+
+
 def test_parse_officers_basic():
-    officers = _parse_officers_from_xml(SAMPLE_990_XML)
+    officers = _officers(SAMPLE_990_XML)
     assert len(officers) == 3
 
     ed = officers[0]
@@ -100,7 +102,7 @@ def test_parse_officers_basic():
 
 
 def test_parse_officers_board_member():
-    officers = _parse_officers_from_xml(SAMPLE_990_XML)
+    officers = _officers(SAMPLE_990_XML)
     board = officers[1]
     assert board["name"] == "John Smith"
     assert board["title"] == "Board Chair"
@@ -109,7 +111,7 @@ def test_parse_officers_board_member():
 
 
 def test_parse_officers_business_name():
-    officers = _parse_officers_from_xml(SAMPLE_990_XML)
+    officers = _officers(SAMPLE_990_XML)
     biz = officers[2]
     assert biz["name"] == "Acme Consulting Llc"
     assert biz["title"] == "Fiscal Agent"
@@ -120,118 +122,141 @@ def test_parse_officers_empty_xml():
     <Return xmlns="http://www.irs.gov/efile">
       <ReturnData><IRS990></IRS990></ReturnData>
     </Return>"""
-    officers = _parse_officers_from_xml(xml)
+    officers = _officers(xml)
     assert officers == []
 
 
 def test_title_case_all_caps():
-    assert _title_case("GAIL MCGOVERN") == "Gail Mcgovern"
+    assert title_case("GAIL MCGOVERN") == "Gail Mcgovern"
 
 
 def test_title_case_already_mixed():
-    assert _title_case("Jane O'Brien") == "Jane O'Brien"
+    assert title_case("Jane O'Brien") == "Jane O'Brien"
 
 
 def test_title_case_single_word():
-    assert _title_case("PRESIDENT") == "President"
-
-
-# --- Revenue Breakdown Tests ---
-
-
-def test_parse_revenue_breakdown():
-    root = ET.fromstring(SAMPLE_990_XML_FULL)
-    result = _parse_revenue_breakdown(root)
-    assert result is not None
-    assert result["contributions_and_grants"] == 2000000
-    assert result["program_service_revenue"] == 500000
-    assert result["investment_income"] == 100000
-    assert result["other_revenue"] == 50000
-    assert result["total_revenue"] == 2650000
-
-
-def test_parse_revenue_breakdown_missing():
-    xml = b"""<?xml version="1.0"?>
-    <Return xmlns="http://www.irs.gov/efile">
-      <ReturnData><IRS990></IRS990></ReturnData>
-    </Return>"""
-    root = ET.fromstring(xml)
-    result = _parse_revenue_breakdown(root)
-    assert result is None
-
-
-# --- Expense Breakdown Tests ---
-
-
-def test_parse_expense_breakdown():
-    root = ET.fromstring(SAMPLE_990_XML_FULL)
-    result = _parse_expense_breakdown(root)
-    assert result is not None
-    assert result["program_services"] == 1800000
-    assert result["management_and_general"] == 300000
-    assert result["fundraising"] == 200000
-    assert result["total_expenses"] == 2300000
+    assert title_case("PRESIDENT") == "President"
+
+
+# --- Sections (fixed expected values, all forms share FORM_SPECS) ---
+
+EXPECTED_FULL = {
+    "officers": [
+        {"name": "Jane Doe", "title": "Executive Director", "compensation": 140000, "hours_per_week": 40.0},
+        {"name": "John Smith", "title": "Board Chair", "compensation": 0, "hours_per_week": 2.0},
+    ],
+    "revenue_breakdown": {
+        "contributions_and_grants": 2000000,
+        "program_service_revenue": 500000,
+        "investment_income": 100000,
+        "other_revenue": 50000,
+        "total_revenue": 2650000,
+    },
+    "schedule_j": [
+        {
+            "name": "Jane Doe",
+            "base_compensation": 120000,
+            "bonus_and_incentive": 5000,
+            "other_compensation": 10000,
+            "deferred_compensation": 3000,
+            "nontaxable_benefits": 2000,
+            "total_compensation": 140000,
+        },
+    ],
+    "expense_breakdown": {
+        "program_services": 1800000,
+        "management_and_general": 300000,
+        "fundraising": 200000,
+        "total_expenses": 2300000,
+    },
+}
+
+EMPTY_990_XML = b"""<?xml version="1.0"?>
+<Return xmlns="http://www.irs.gov/efile">
+  <ReturnData><IRS990></IRS990></ReturnData>
+</Return>"""
 
 
-def test_parse_expense_breakdown_missing():
-    xml = b"""<?xml version="1.0"?>
-    <Return xmlns="http://www.irs.gov/efile">
-      <ReturnData><IRS990></IRS990></ReturnData>
-    </Return>"""
-    root = ET.fromstring(xml)
-    result = _parse_expense_breakdown(root)
-    assert result is None
+def test_parse_all_returns_all_sections():
+    assert _parse_all_from_xml(SAMPLE_990_XML_FULL) == EXPECTED_FULL
 
 
-# --- Schedule J Tests ---
+@pytest.mark.parametrize("section", ["officers", "revenue_breakdown", "expense_breakdown", "schedule_j"])
+def test_parse_single_section(section):
+    assert _parse_all_from_xml(SAMPLE_990_XML_FULL, sections=(section,)) == {section: EXPECTED_FULL[section]}
 
 
-def test_parse_schedule_j():
-    root = ET.fromstring(SAMPLE_990_XML_FULL)
-    result = _parse_schedule_j(root)
-    assert len(result) == 1
-    entry = result[0]
-    assert entry["name"] == "Jane Doe"
-    assert entry["base_compensation"] == 120000
-    assert entry["bonus_and_incentive"] == 5000
-    assert entry["other_compensation"] == 10000
-    assert entry["deferred_compensation"] == 3000
-    assert entry["nontaxable_benefits"] == 2000
-    assert entry["total_compensation"] == 140000
+def test_parse_all_empty_xml():
+    assert _parse_all_from_xml(EMPTY_990_XML) == {
+        "officers": [],
+        "revenue_breakdown": None,
+        "expense_breakdown": None,
+        "schedule_j": [],
+    }
 
 
-def test_parse_schedule_j_missing():
+def test_parse_partial_revenue_keeps_first_value():
     xml = b"""<?xml version="1.0"?>
     <Return xmlns="http://www.irs.gov/efile">
-      <ReturnData><IRS990></IRS990></ReturnData>
+      <ReturnData><IRS990>
+        <CYTotalRevenueAmt>1000</CYTotalRevenueAmt>
+        <CYTotalRevenueAmt>2000</CYTotalRevenueAmt>
+      </IRS990></ReturnData>
     </Return>"""
-    root = ET.fromstring(xml)
-    result = _parse_schedule_j(root)
-    assert result == []
-
-
-# --- parse_all Tests ---
-
-
-def test_parse_all_returns_all_sections():
-    result = _parse_all_from_xml(SAMPLE_990_XML_FULL)
-    assert "officers" in result
-    assert "revenue_breakdown" in result
-    assert "expense_breakdown" in result
-    assert "schedule_j" in result
-    assert len(result["officers"]) == 2
-    assert result["revenue_breakdown"]["total_revenue"] == 2650000
-    assert result["expense_breakdown"]["total_expenses"] == 2300000
-    assert len(result["schedule_j"]) == 1
+    assert _parse_all_from_xml(xml)["revenue_breakdown"] == {
+        "contributions_and_grants": None,
+        "program_service_revenue": None,
+        "investment_income": None,
+        "other_revenue": None,
+        "total_revenue": 1000,
+    }
+
+
+def test_streaming_stops_once_sections_complete():
+    # Everything after </IRS990> is never read when only Form 990 sections are requested
+    xml = SAMPLE_990_XML.replace(b"</IRS990>", b"</IRS990><IRS990ScheduleO><broken")
+    result = _parse_all_from_xml(xml, sections=("officers", "revenue_breakdown"))
+    assert set(result) == {"officers", "revenue_breakdown"}
+    assert len(result["officers"]) == 3
+    assert result["revenue_breakdown"] is None
 
 
-def test_parse_all_empty_xml():
-    xml = b"""<?xml version="1.0"?>
-    <Return xmlns="http://www.irs.gov/efile">
-      <ReturnData><IRS990></IRS990></ReturnData>
-    </Return>"""
-    result = _parse_all_from_xml(xml)
-    assert result["officers"] == []
-    assert result["revenue_breakdown"] is None
-    assert result["expense_breakdown"] is None
-    assert result["schedule_j"] == []
+# --- Streaming index search ---
+
+INDEX_CSV = b"""RETURN_ID,FILING_TYPE,EIN,TAX_PERIOD,SUB_DATE,TAXPAYER_NAME,RETURN_TYPE,DLN,OBJECT_ID,XML_BATCH_ID
+1,EFILE,111111111,202212,2023,SMALL ORG,990EZ,1,202301000000000100,2023_TEOS_XML_01A
+2,EFILE,222222222,202212,2023,FAMILY FDN,990PF,1,202301000000000200,2023_TEOS_XML_01A
+3,EFILE,333333333,202212,2023,UBIT FILER,990T,1,202301000000000300,2023_TEOS_XML_02A
+"""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ein,return_type,object_id", [
+    ("111111111", "990EZ", "202301000000000100"),
+    ("222222222", "990PF", "202301000000000200"),
+])
+async def test_search_year_index_finds_ez_and_pf(ein, return_type, object_id):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=INDEX_CSV)))
+    with patch("app.services.irs_990.get_client", return_value=client):
+        result = await _search_year_index(ein, 2023)
+    assert result["return_type"] == return_type
+    assert result["object_id"] == object_id
+    assert result["zip_filename"] == "2023_TEOS_XML_01A"
+
+
+@pytest.mark.asyncio
+async def test_search_year_index_skips_unsupported_forms():
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=INDEX_CSV)))
+    with patch("app.services.irs_990.get_client", return_value=client):
+        assert await _search_year_index("333333333", 2023) is None
+
+
+async def test_failed_catalogued_read_falls_back_to_central_directory():
+    filing = {"year": 2023, "object_id": "202301349349300100", "zip_filename": "2023_TEOS_XML_01A"}
+    with (
+        patch("app.services.irs_990._fetch_catalogued_xml", side_effect=ValueError("CRC mismatch")),
+        patch("app.services.irs_990._fetch_zip_xml", return_value=SAMPLE_990_XML) as mock_zip,
+    ):
+        result = await _fetch_and_parse_all(filing)
+    mock_zip.assert_awaited_once_with(filing)
+    assert result["officers"][0]["name"] == "Jane Doe"
@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import socket
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.models.schemas import JobRequest
+from app.routes import jobs as job_routes
+from app.services import jobs
+from app.utils.codec import Document
+
+API_KEY_INFO = {"id": "key-1", "monthly_limit": 100_000}
+QUOTA = {"limit": 100_000, "remaining": 99_997, "reset": 1767225600, "count": 3, "allowed": True}
+HIT = Document(b'{"ein":"53-0196605","legal_name":"RED CROSS"}', 4102444800, 4102444800)
+MISS = Document(b'{"ein":"13-1837418","legal_name":"MSF"}', 4102444800, 4102444800)
+
+
+def _status(**overrides):
+    status = {
+        "job_id": "abc", "api_key_id": "key-1", "status": "running", "total": 3, "processed": 0,
+        "succeeded": 0, "failed": 0, "pages": 2, "pages_ready": 1, "created_at": 1,
+        "completed_at": None, "callback_url": None,
+    }
+    return {**status, **overrides}
+
+
+async def test_start_job_dedupes_and_charges_unique_eins():
+    with (
+        patch("app.routes.jobs.check_callback_url", new_callable=AsyncMock, return_value=None),
+        patch("app.routes.jobs.check_rate_limit_batch", new_callable=AsyncMock, return_value=QUOTA) as mock_rl,
+        patch("app.routes.jobs.create_job", new_callable=AsyncMock, return_value=_status(status="queued")) as mock_create,
+    ):
+        response = await job_routes.start_job(
+            JobRequest(eins=["53-0196605", "530196605", "13-1837418"], callback_url="https://example.org/hook"),
+            api_key_info=API_KEY_INFO,
+        )
+
+    assert mock_rl.await_args.args[1] == 2
+    assert mock_create.await_args.args == ("key-1", ["53-0196605", "13-1837418"], "https://example.org/hook")
+    assert response.status_code == 202
+    assert "api_key_id" not in json.loads(response.body)
+
+
+async def test_start_job_rejects_non_http_callback():
+    with pytest.raises(HTTPException) as exc_info:
+        await job_routes.start_job(
+            JobRequest(eins=["53-0196605"], callback_url="file:///etc/passwd"), api_key_info=API_KEY_INFO
+        )
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/hook",
+    "http://localhost:8000/hook",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.1/hook",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+])
+async def test_start_job_rejects_internal_callback(url):
+    with pytest.raises(HTTPException) as exc_info:
+        await job_routes.start_job(JobRequest(eins=["53-0196605"], callback_url=url), api_key_info=API_KEY_INFO)
+    assert exc_info.value.status_code == 400
+    assert "public address" in exc_info.value.detail
+
+
+def _resolves_to(*addresses):
+    infos = [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, 443)) for address in addresses]
+    return patch("asyncio.BaseEventLoop.getaddrinfo", new_callable=AsyncMock, return_value=infos)
+
+
+async def test_check_callback_url_checks_every_resolved_address():
+    with _resolves_to("93.184.215.14"):
+        assert await jobs.check_callback_url("https://example.org/hook") is None
+    with _resolves_to("93.184.215.14", "10.1.2.3"):
+        assert await jobs.check_callback_url("https://example.org/hook") is not None
+
+
+async def test_send_callback_signs_body():
+    redis = MagicMock()
+    redis.hget = AsyncMock(return_value="s3cret")
+    client = MagicMock()
+    client.post = AsyncMock(return_value=MagicMock())
+    with (
+        _resolves_to("93.184.215.14"),
+        patch("app.services.jobs.get_redis", new_callable=AsyncMock, return_value=redis),
+        patch("app.services.jobs.get_client", return_value=client),
+    ):
+        await jobs._send_callback(_status(status="complete", callback_url="https://example.org/hook"))
+
+    body = client.post.await_args.kwargs["content"]
+    signature = client.post.await_args.kwargs["headers"]["X-NPV-Signature"]
+    timestamp, digest = (part.split("=", 1)[1] for part in signature.split(","))
+    expected = hmac.new(b"s3cret", f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    assert digest == expected
+    assert "api_key_id" not in json.loads(body)
+
+
+async def test_send_callback_skips_host_now_resolving_internally():
+    client = MagicMock()
+    client.post = AsyncMock()
+    with _resolves_to("10.1.2.3"), patch("app.services.jobs.get_client", return_value=client):
+        await jobs._send_callback(_status(status="complete", callback_url="https://example.org/hook"))
+    client.post.assert_not_called()
+
+
+async def test_results_splice_page_and_link_next_cursor():
+    with (
+        patch("app.routes.jobs.job_status", new_callable=AsyncMock, side_effect=lambda job_id: _status()),
+        patch("app.routes.jobs.result_page", new_callable=AsyncMock, return_value=b'{"ein":"53-0196605"}'),
+    ):
+        response = await job_routes.get_job_results("abc", cursor=None, api_key_info=API_KEY_INFO)
+
+    assert json.loads(response.body) == {
+        "job_id": "abc", "cursor": "0", "next_cursor": "1", "results": [{"ein": "53-0196605"}],
+    }
+
+
+async def test_results_not_ready_and_foreign_jobs():
+    with (
+        patch("app.routes.jobs.job_status", new_callable=AsyncMock, side_effect=lambda job_id: _status()),
+        patch("app.routes.jobs.result_page", new_callable=AsyncMock, return_value=None),
+    ):
+        response = await job_routes.get_job_results("abc", cursor="1", api_key_info=API_KEY_INFO)
+        assert response.status_code == 202
+        with pytest.raises(HTTPException):
+            await job_routes.get_job_results("abc", cursor="2", api_key_info=API_KEY_INFO)
+        with pytest.raises(HTTPException):
+            await job_routes.get_job("abc", api_key_info={"id": "someone-else"})
+
+
+async def test_process_chunk_stores_page_and_completes_job():
+    redis = MagicMock()
+    redis.hmget = AsyncMock(return_value=["key-1", "queued"])
+    redis.sismember = AsyncMock(return_value=False)
+    redis.hset = AsyncMock()
+    redis.ttl = AsyncMock(return_value=3600)
+    script = AsyncMock(return_value=[1, 1])
+
+    with (
+        patch("app.services.jobs.get_redis", new_callable=AsyncMock, return_value=redis),
+        patch("app.services.jobs.cache_get", new_callable=AsyncMock, return_value=["53-0196605", "13-1837418", "99-9999999"]),
+        patch("app.services.jobs.cache_set", new_callable=AsyncMock) as mock_set,
+        patch("app.services.jobs.cached_verify_many", new_callable=AsyncMock, return_value={"53-0196605": HIT}),
+        patch("app.services.jobs.verify_coalesced", new_callable=AsyncMock,
+              side_effect=[MISS, Document(b"null", 4102444800, 4102444800, not_found=True)]),
+        patch("app.services.jobs._finish_chunk", new_callable=AsyncMock, return_value=script),
+        patch("app.services.jobs.usage.record") as mock_record,
+        patch("app.services.jobs._notify", new_callable=AsyncMock) as mock_notify,
+    ):
+        await jobs.process_chunk("abc", 0)
+
+    key, page, ttl = mock_set.await_args.args
+    assert key == "job:abc:page:0"
+    results = json.loads(b"[" + page.body + b"]")
+    assert [r["success"] for r in results] == [True, True, False]
+    assert results[0]["data"]["legal_name"] == "RED CROSS"
+    assert script.await_args.kwargs["args"][:3] == [0, 2, 1]
+    assert mock_record.call_count == 3
+    mock_notify.assert_awaited_once_with("abc")
+
+
+async def test_retried_chunk_completes_job_without_recording_usage_again():
+    # The chunk was counted but the worker stopped before the callback
+    redis = MagicMock()
+    redis.hmget = AsyncMock(return_value=["key-1", "complete"])
+    redis.sismember = AsyncMock(return_value=True)
+    script = AsyncMock(return_value=[0, 1])
+
+    with (
+        patch("app.services.jobs.get_redis", new_callable=AsyncMock, return_value=redis),
+        patch("app.services.jobs.cache_get", new_callable=AsyncMock, return_value=["53-0196605"]),
+        patch("app.services.jobs.cached_verify_many", new_callable=AsyncMock) as mock_verify,
+        patch("app.services.jobs._finish_chunk", new_callable=AsyncMock, return_value=script),
+        patch("app.services.jobs.usage.record") as mock_record,
+        patch("app.services.jobs._notify", new_callable=AsyncMock) as mock_notify,
+    ):
+        await jobs.process_chunk("abc", 1)
+
+    mock_verify.assert_not_called()
+    mock_record.assert_not_called()
+    assert script.await_args.kwargs["args"][:3] == [1, 0, 0]
+    mock_notify.assert_awaited_once_with("abc")
+
+
+async def test_usage_not_recorded_when_another_attempt_counted_the_chunk():
+    redis = MagicMock()
+    redis.hmget = AsyncMock(return_value=["key-1", "running"])
+    redis.sismember = AsyncMock(return_value=False)
+    redis.ttl = AsyncMock(return_value=3600)
+    script = AsyncMock(return_value=[0, 0])
+
+    with (
+        patch("app.services.jobs.get_redis", new_callable=AsyncMock, return_value=redis),
+        patch("app.services.jobs.cache_get", new_callable=AsyncMock, return_value=["53-0196605"]),
+        patch("app.services.jobs.cache_set", new_callable=AsyncMock),
+        patch("app.services.jobs.cached_verify_many", new_callable=AsyncMock, return_value={"53-0196605": HIT}),
+        patch("app.services.jobs._finish_chunk", new_callable=AsyncMock, return_value=script),
+        patch("app.services.jobs.usage.record") as mock_record,
+        patch("app.services.jobs._notify", new_callable=AsyncMock) as mock_notify,
+    ):
+        await jobs.process_chunk("abc", 1)
+
+    mock_record.assert_not_called()
+    mock_notify.assert_not_called()
+
+
+async def test_worker_dead_letters_chunk_after_max_deliveries():
+    redis = MagicMock()
+    redis.xgroup_create = AsyncMock()
+    redis.xautoclaim = AsyncMock(return_value=["0-0", [("1-0", {"job": "abc", "chunk": "1"})], []])
+    redis.xpending_range = AsyncMock(return_value=[{"message_id": "1-0", "times_delivered": 6}])
+    redis.xadd = AsyncMock()
+    redis.xack = AsyncMock(side_effect=asyncio.CancelledError)
+    redis.ttl = AsyncMock(return_value=3600)
+    script = AsyncMock(return_value=[1, 0])
+
+    with (
+        patch("app.services.jobs.get_redis", new_callable=AsyncMock, return_value=redis),
+        patch("app.services.jobs.settings.job_max_deliveries", 5),
+        patch("app.services.jobs.cache_get", new_callable=AsyncMock, return_value=["53-0196605"]),
+        patch("app.services.jobs.cache_set", new_callable=AsyncMock) as mock_set,
+        patch("app.services.jobs._finish_chunk", new_callable=AsyncMock, return_value=script),
+        patch("app.services.jobs.process_chunk", new_callable=AsyncMock) as mock_process,
+        pytest.raises(asyncio.CancelledError),
+    ):
+        await jobs.run_worker("worker-1")
+
+    mock_process.assert_not_called()
+    assert redis.xadd.await_args.args[0] == jobs.DEAD_STREAM
+    results = json.loads(b"[" + mock_set.await_args.args[1].body + b"]")
+    assert results[0]["success"] is False
+    assert "6 attempts" in results[0]["error"]
+    assert script.await_args.kwargs["args"][:3] == [1, 0, 1]
+    redis.xack.assert_awaited_once_with(jobs.STREAM, jobs.GROUP, "1-0")
+
+
+async def test_send_callback_connects_to_checked_address():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        redis = MagicMock()
+        redis.hget = AsyncMock(return_value=None)
+        with (
+            _resolves_to("93.184.215.14"),
+            patch("app.services.jobs.get_redis", new_callable=AsyncMock, return_value=redis),
+            patch("app.services.jobs.get_client", return_value=client),
+        ):
+            await jobs._send_callback(_status(status="complete", callback_url="https://user:pw@example.org:8443/hook?x=1"))
+
+    request = requests[0]
+    assert str(request.url) == "https://93.184.215.14:8443/hook?x=1"
+    assert request.headers["host"] == "example.org:8443"
+    assert request.headers["authorization"].startswith("Basic ")
+    assert request.extensions["sni_hostname"] == "example.org"
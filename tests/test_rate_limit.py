@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.middleware import rate_limit
+
+API_KEY_INFO = {"id": 1, "monthly_limit": 100}
+
+
+def _patch_script(count: int):
+    script = AsyncMock(return_value=count)
+    return patch("app.middleware.rate_limit._consume", new_callable=AsyncMock, return_value=script), script
+
+
+async def test_check_is_one_script_call_with_remaining_quota():
+    p, script = _patch_script(40)
+    with p:
+        quota = await rate_limit.check_rate_limit(API_KEY_INFO)
+
+    script.assert_awaited_once()
+    keys, args = script.await_args.kwargs["keys"], script.await_args.kwargs["args"]
+    assert keys[0].startswith("ratelimit:1:")
+    assert args == [1, 100, rate_limit.MONTHLY_TTL_SECONDS, 0]
+    assert quota["remaining"] == 60
+    assert rate_limit.rate_limit_headers(quota)["X-RateLimit-Remaining"] == "60"
+
+
+async def test_single_over_limit_is_rejected_with_headers():
+    p, _ = _patch_script(101)
+    with p, pytest.raises(HTTPException) as exc_info:
+        await rate_limit.check_rate_limit(API_KEY_INFO)
+
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["X-RateLimit-Remaining"] == "0"
+
+
+async def test_rejected_batch_is_refunded():
+    p, script = _patch_script(105)  # 95 used before this batch of 10
+    with p, pytest.raises(HTTPException) as exc_info:
+        await rate_limit.check_rate_limit_batch(API_KEY_INFO, 10)
+
+    assert script.await_args.kwargs["args"] == [10, 100, rate_limit.MONTHLY_TTL_SECONDS, 1]
+    assert exc_info.value.headers["X-RateLimit-Remaining"] == "5"
+
+
+def test_monthly_reset_rolls_over_the_year():
+    now = datetime(2025, 12, 31, 23, 59, tzinfo=timezone.utc)
+    assert rate_limit._next_month(now) == datetime(2026, 1, 1, tzinfo=timezone.utc)
@@ -0,0 +1,24 @@
+import json
+
+from app.models.schemas import BatchVerifyResponse, Person, VerifyResponse
+from app.utils.serialize import batch_body, batch_result, dump_verify
+
+
+def test_dump_verify_matches_model_json():
+    result = VerifyResponse(
+        ein="53-0196605", legal_name="Café \"Red\" Cross", personnel=[Person(name="A", hours_per_week=1.5)]
+    )
+    assert json.loads(dump_verify(result)) == json.loads(result.model_dump_json())
+
+
+def test_batch_body_is_a_valid_batch_response():
+    data = dump_verify(VerifyResponse(ein="53-0196605", legal_name="RED CROSS"))
+    body = batch_body(2, 1, 1, [
+        batch_result("53-0196605", data, None),
+        batch_result("99-9999999", None, 'No "nonprofit" found'),
+    ])
+
+    parsed = BatchVerifyResponse.model_validate_json(body)
+    assert parsed.results[0].data.legal_name == "RED CROSS"
+    assert parsed.results[1].success is False
+    assert parsed.results[1].error == 'No "nonprofit" found'
@@ -0,0 +1,116 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.utils import singleflight
+
+
+def _redis(lease_granted: bool, lease_exists: bool = True):
+    redis = MagicMock()
+    redis.set = AsyncMock(return_value=lease_granted)
+    redis.eval = AsyncMock(return_value=1)
+    redis.exists = AsyncMock(return_value=lease_exists)
+    return redis
+
+
+def _patch_redis(redis):
+    return patch("app.utils.singleflight.get_redis", new_callable=AsyncMock, return_value=redis)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_computation():
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"legal_name": "RED CROSS"}
+
+    redis = _redis(lease_granted=True)
+    with _patch_redis(redis):
+        results = await asyncio.gather(*[
+            singleflight.run("verify:530196605", compute, AsyncMock(return_value=None))
+            for _ in range(50)
+        ])
+
+    assert calls == 1
+    assert all(r == {"legal_name": "RED CROSS"} for r in results)
+    redis.set.assert_awaited_once()
+    redis.eval.assert_awaited_once()  # lease released
+    assert singleflight.inflight() == 0
+
+
+@pytest.mark.asyncio
+async def test_waits_for_lease_holder_result():
+    compute = AsyncMock()
+    lookup = AsyncMock(side_effect=[None, {"legal_name": "RED CROSS"}])
+
+    with _patch_redis(_redis(lease_granted=False)):
+        result = await singleflight.run("verify:530196605", compute, lookup)
+
+    assert result == {"legal_name": "RED CROSS"}
+    compute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_computes_when_holder_releases_without_result():
+    compute = AsyncMock(return_value={"_not_found": True})
+    lookup = AsyncMock(return_value=None)
+
+    with _patch_redis(_redis(lease_granted=False, lease_exists=False)):
+        result = await singleflight.run("verify:999999999", compute, lookup)
+
+    assert result == {"_not_found": True}
+    compute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_computes_locally_when_redis_down():
+    compute = AsyncMock(return_value={"legal_name": "RED CROSS"})
+
+    with patch("app.utils.singleflight.get_redis", new_callable=AsyncMock, side_effect=ConnectionError):
+        result = await singleflight.run("verify:530196605", compute, AsyncMock())
+
+    assert result == {"legal_name": "RED CROSS"}
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_are_not_cached():
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    with _patch_redis(_redis(lease_granted=True)):
+        results = await asyncio.gather(
+            singleflight.run("verify:530196605", compute, AsyncMock()),
+            singleflight.run("verify:530196605", compute, AsyncMock()),
+            return_exceptions=True,
+        )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert singleflight.inflight() == 0
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_runs_once():
+    compute = AsyncMock()
+    redis = _redis(lease_granted=True)
+    with _patch_redis(redis):
+        singleflight.refresh_in_background("verify:530196605", compute)
+        singleflight.refresh_in_background("verify:530196605", compute)
+        await asyncio.sleep(0.01)
+
+    compute.assert_awaited_once()
+    redis.eval.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_background_refresh_skips_when_lease_held():
+    compute = AsyncMock()
+    with _patch_redis(_redis(lease_granted=False)):
+        singleflight.refresh_in_background("verify:530196605", compute)
+        await asyncio.sleep(0.01)
+
+    compute.assert_not_awaited()
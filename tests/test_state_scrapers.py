@@ -246,6 +246,7 @@ class TestCaliforniaIntegration:
         # Mock both cache and httpx
         mock_get_resp = AsyncMock()
         mock_get_resp.status_code = 200
+        mock_get_resp.cookies = {"ASP.NET_SessionId": "abc123"}
         mock_get_resp.text = """
         <html><body>
         <form>
@@ -279,6 +280,8 @@ class TestCaliforniaIntegration:
         assert result["state"] == "CA"
         assert result["registration_number"] == "CT-0012345"
         mock_cache_set.assert_called_once()
+        _, kwargs = mock_client.post.call_args
+        assert kwargs["headers"] == {"Cookie": "ASP.NET_SessionId=abc123"}
 
     @pytest.mark.asyncio
     async def test_http_error_returns_none(self):
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import uuid
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import settings
+from app.services import usage
+
+KEY_ID = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def _empty_buffer(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "usage_spill_path", str(tmp_path / "spill.jsonl"))
+    usage._buffer.clear()
+    usage._flush_due.clear()
+    yield
+    usage._buffer.clear()
+
+
+async def test_flush_copies_buffered_rows_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, "usage_flush_rows", 2)
+    for i in range(5):
+        usage.record(KEY_ID, "batch", f"53-019660{i}", 200, 12, False)
+    with patch("app.services.usage._copy", new_callable=AsyncMock) as mock_copy:
+        assert await usage.flush() == 5
+
+    assert [len(c.args[0]) for c in mock_copy.await_args_list] == [2, 2, 1]
+    row = mock_copy.await_args_list[0].args[0][0]
+    assert row[:6] == (KEY_ID, "batch", "53-0196600", 200, 12, False)
+    assert not usage._buffer
+
+
+async def test_failed_flush_keeps_rows_in_order():
+    usage.record(KEY_ID, "verify", "1", 200, 1, True)
+    usage.record(KEY_ID, "verify", "2", 200, 1, True)
+    with patch("app.services.usage._copy", new_callable=AsyncMock, side_effect=ConnectionError):
+        assert await usage.flush() == 0
+
+    assert [row[2] for row in usage._buffer] == ["1", "2"]
+
+
+async def test_full_buffer_drops(monkeypatch):
+    monkeypatch.setattr(settings, "usage_buffer_max_rows", 3)
+    dropped = usage._stats["dropped"]
+    for i in range(5):
+        usage.record(KEY_ID, "verify", str(i), 200, 1, False)
+
+    assert len(usage._buffer) == 3
+    assert usage._stats["dropped"] == dropped + 2
+
+
+async def test_full_buffer_spills_and_reloads(monkeypatch):
+    monkeypatch.setattr(settings, "usage_buffer_max_rows", 1)
+    monkeypatch.setattr(settings, "usage_overflow", "spill")
+    usage.record(KEY_ID, "verify", "1", 200, 1, False)
+    usage.record(KEY_ID, "verify", "2", 404, 1, True)
+
+    with patch("app.services.usage._copy", new_callable=AsyncMock) as mock_copy:
+        assert await usage.flush() == 2
+
+    spilled = mock_copy.await_args_list[1].args[0][0]
+    assert spilled[:6] == (KEY_ID, "verify", "2", 404, 1, True)
+    assert spilled[6].tzinfo is not None
+
+
+async def test_spill_reloads_in_batches_and_keeps_unloaded_rows(monkeypatch):
+    monkeypatch.setattr(settings, "usage_overflow", "spill")
+    monkeypatch.setattr(settings, "usage_flush_rows", 2)
+    usage._spill([(KEY_ID, "verify", str(i), 200, 1, False, "2026-01-01T00:00:00+00:00") for i in range(5)])
+
+    with patch("app.services.usage._copy", new_callable=AsyncMock, side_effect=[None, ConnectionError]) as mock_copy:
+        assert await usage.flush() == 2
+    assert [len(c.args[0]) for c in mock_copy.await_args_list] == [2, 2]
+
+    with patch("app.services.usage._copy", new_callable=AsyncMock) as mock_copy:
+        assert await usage.flush() == 3
+    assert [[row[2] for row in c.args[0]] for c in mock_copy.await_args_list] == [["2", "3"], ["4"]]
+
+
+async def test_unreadable_spill_line_is_dropped_not_retried(monkeypatch):
+    monkeypatch.setattr(settings, "usage_overflow", "spill")
+    usage._spill([(KEY_ID, "verify", "1", 200, 1, False, "2026-01-01T00:00:00+00:00")])
+    with open(settings.usage_spill_path, "a") as f:
+        f.write('["' + str(KEY_ID) + '", "verify", "2", 2\n')  # cut short by a crash
+    usage._spill([(KEY_ID, "verify", "3", 200, 1, False, "2026-01-01T00:00:00+00:00")])
+    dropped = usage._stats["dropped"]
+
+    with patch("app.services.usage._copy", new_callable=AsyncMock) as mock_copy:
+        assert await usage.flush() == 2
+        assert await usage.flush() == 0
+
+    assert [row[2] for row in mock_copy.await_args.args[0]] == ["1", "3"]
+    assert usage._stats["dropped"] == dropped + 1
+    assert not os.path.exists(settings.usage_spill_path)
+
+
+async def test_recorder_flushes_when_batch_fills_and_on_shutdown(monkeypatch):
+    monkeypatch.setattr(settings, "usage_flush_rows", 2)
+    monkeypatch.setattr(settings, "usage_flush_interval_ms", 60_000)
+    with patch("app.services.usage._copy", new_callable=AsyncMock) as mock_copy:
+        task = asyncio.create_task(usage.run_usage_recorder())
+        usage.record(KEY_ID, "verify", "1", 200, 1, False)
+        usage.record(KEY_ID, "verify", "2", 200, 1, False)
+        await asyncio.sleep(0.01)
+        assert mock_copy.await_count == 1
+
+        usage.record(KEY_ID, "verify", "3", 200, 1, False)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert mock_copy.await_count == 2
+    assert not usage._buffer
+
+
+def test_add_months_crosses_years():
+    assert usage._add_months(date(2025, 11, 1), 2) == date(2026, 1, 1)
+    assert usage._add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+
+
+async def test_ensure_partitions_backfills_months_stranded_in_default():
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[{"month": date(2020, 3, 1)}])
+    conn.execute = AsyncMock()
+
+    months = await usage.ensure_partitions(conn, 1)
+
+    this_month = usage.datetime.now(usage.timezone.utc).date().replace(day=1)
+    assert months == [date(2020, 3, 1), this_month, usage._add_months(this_month, 1)]
+    assert [c.args[1] for c in conn.execute.await_args_list] == months
+
+
+async def test_maintenance_script_commits_backfill_and_drops(monkeypatch):
+    from scripts import maintain_usage_partitions as script
+
+    conn = MagicMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [{"month": date(2020, 3, 1)}],  # stranded in api_usage_default
+        [{"relname": "api_usage_2020_03"}, {"relname": "api_usage_default"}],
+    ])
+    conn.execute = AsyncMock()
+    tx = MagicMock(start=AsyncMock(), commit=AsyncMock(), rollback=AsyncMock())
+    conn.transaction = MagicMock(return_value=tx)
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr("sys.argv", ["maintain_usage_partitions"])
+
+    with (
+        patch("scripts.maintain_usage_partitions.get_pool", new_callable=AsyncMock, return_value=pool),
+        patch("scripts.maintain_usage_partitions.close_pool", new_callable=AsyncMock),
+    ):
+        await script.main()
+
+    statements = [c.args for c in conn.execute.await_args_list]
+    assert statements[0] == ("SELECT ensure_usage_partition($1)", date(2020, 3, 1))
+    assert statements[-1] == ('DROP TABLE "api_usage_2020_03"',)
+    tx.commit.assert_awaited_once()
+    tx.rollback.assert_not_called()
+
+
+async def test_drop_expired_partitions_keeps_recent_and_default():
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[
+        {"relname": "api_usage_2020_01"},
+        {"relname": "api_usage_2099_01"},
+        {"relname": "api_usage_default"},
+    ])
+    conn.execute = AsyncMock()
+
+    assert await usage.drop_expired_partitions(conn, 13) == ["api_usage_2020_01"]
+    conn.execute.assert_awaited_once_with('DROP TABLE "api_usage_2020_01"')
+
+
+def test_latency_percentile_interpolates_within_bucket():
+    buckets = [0] * 12
+    buckets[4] = 100  # 50-100 ms
+    assert usage.latency_percentile(buckets, 0.5) == 75
+    assert usage.latency_percentile([0] * 12, 0.5) is None
+
+    buckets[11] = 100  # >= 10 s
+    assert usage.latency_percentile(buckets, 0.99) == 10000
+
+
+async def test_usage_report_merges_period_histograms():
+    day1 = [0] * 12
+    day1[2] = 10  # 10-25 ms
+    day2 = [0] * 12
+    day2[6] = 10  # 250-500 ms
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[
+        {"period": date(2026, 1, 1), "requests": 10, "cache_hits": 8, "not_found": 1,
+         "latency_sum_ms": 150, "latency_buckets": day1},
+        {"period": date(2026, 1, 2), "requests": 10, "cache_hits": 0, "not_found": 0,
+         "latency_sum_ms": 3000, "latency_buckets": day2},
+    ])
+
+    report = await usage.usage_report(conn, KEY_ID, "day", date(2026, 1, 1), date(2026, 1, 31))
+
+    assert conn.fetch.await_args.args[1:] == (KEY_ID, date(2026, 1, 1), date(2026, 1, 31), None)
+    assert [p["cache_hit_ratio"] for p in report["periods"]] == [0.8, 0.0]
+    total = report["total"]
+    assert total["requests"] == 20
+    assert total["not_found_rate"] == 0.05
+    assert total["latency_ms"]["avg"] == 157.5
+    assert total["latency_ms"]["p50"] == 25
+    assert 250 < total["latency_ms"]["p95"] < 500
@@ -0,0 +1,148 @@
+import io
+import zipfile
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import zip_catalog
+from app.services.zip_catalog import (
+    ZipCatalog,
+    entries_from_members,
+    harvest_archive,
+    object_id_from_name,
+    read_member,
+    update_catalog,
+    write_catalog,
+)
+from app.services.async_zip import ZipReadError
+from tests.test_async_zip import range_transport
+
+ARCHIVE = "2023/2023_TEOS_XML_01A"
+XML_A = b"<Return>" + b"A" * 5000 + b"</Return>"
+XML_B = b"<Return>stored</Return>"
+
+
+def _make_zip() -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        z.writestr("2023_TEOS_XML_01A/202301349349300100_public.xml", XML_A, compress_type=zipfile.ZIP_DEFLATED)
+        z.writestr("2023_TEOS_XML_01A/202301349349300200_public.xml", XML_B, compress_type=zipfile.ZIP_STORED)
+        z.writestr("2023_TEOS_XML_01A/README.txt", b"not a filing")
+    return buf.getvalue()
+
+
+ZIP_BYTES = _make_zip()
+
+
+def _entries() -> dict[int, tuple]:
+    with zipfile.ZipFile(io.BytesIO(ZIP_BYTES)) as z:
+        members = [
+            {
+                "name": info.filename,
+                "header_offset": info.header_offset,
+                "compress_size": info.compress_size,
+                "file_size": info.file_size,
+                "crc32": info.CRC,
+                "compress_type": info.compress_type,
+                "name_len": len(info.filename),
+            }
+            for info in z.infolist()
+        ]
+    return entries_from_members(ARCHIVE, members)
+
+
+def test_object_id_from_name():
+    assert object_id_from_name("2023_TEOS_XML_01A/202301349349300100_public.xml") == 202301349349300100
+    assert object_id_from_name("202301349349300100_public.xml") == 202301349349300100
+    assert object_id_from_name("2023_TEOS_XML_01A/README.txt") is None
+
+
+def test_catalog_roundtrip(tmp_path):
+    path = str(tmp_path / "zip_catalog.bin")
+    write_catalog(path, _entries(), [ARCHIVE, "2023/2023_TEOS_XML_02A"])
+
+    catalog = ZipCatalog(path)
+    try:
+        assert len(catalog) == 2
+        # Archives with no members are still recorded as harvested
+        assert catalog.archives == [ARCHIVE, "2023/2023_TEOS_XML_02A"]
+        member = catalog.lookup("202301349349300200")
+        assert member["archive"] == ARCHIVE
+        assert member["compress_type"] == zipfile.ZIP_STORED
+        assert catalog.lookup("202301349349300999") is None
+    finally:
+        catalog.close()
+
+
+@pytest.mark.asyncio
+async def test_harvest_archive():
+    async with httpx.AsyncClient(transport=range_transport(ZIP_BYTES)) as client:
+        entries = await harvest_archive(client, ARCHIVE)
+    assert entries == _entries()
+
+
+@pytest.mark.asyncio
+async def test_read_member_single_ranged_get():
+    entries = _entries()
+    seen: list = []
+    async with httpx.AsyncClient(transport=range_transport(ZIP_BYTES, seen)) as client:
+        deflated = await read_member(client, zip_catalog._entry_to_member(entries[202301349349300100]))
+        stored = await read_member(client, zip_catalog._entry_to_member(entries[202301349349300200]))
+
+    assert deflated == XML_A
+    assert stored == XML_B
+    assert len(seen) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_member_rejects_bad_offset():
+    member = zip_catalog._entry_to_member(_entries()[202301349349300100])
+    member["header_offset"] += 1
+    async with httpx.AsyncClient(transport=range_transport(ZIP_BYTES)) as client:
+        with pytest.raises(ZipReadError):
+            await read_member(client, member)
+
+
+@pytest.mark.asyncio
+async def test_update_catalog_reharvests_republished_archive(tmp_path):
+    path = str(tmp_path / "zip_catalog.bin")
+    served = {"data": ZIP_BYTES, "etag": '"v1"'}
+    seen: list = []
+
+    def handler(request):
+        if request.method == "HEAD":
+            return httpx.Response(
+                200, headers={"Content-Length": str(len(served["data"])), "ETag": served["etag"]}
+            )
+        seen.append(request.headers["range"])
+        return range_transport(served["data"]).handle_request(request)
+
+    real_client = httpx.AsyncClient
+
+    def client_factory(**kwargs):
+        return real_client(transport=httpx.MockTransport(handler))
+
+    with patch("app.services.zip_catalog.httpx.AsyncClient", side_effect=client_factory):
+        assert await update_catalog([ARCHIVE], path) == 1
+        assert zip_catalog.load_state(path)[ARCHIVE] == {"size": len(ZIP_BYTES), "etag": '"v1"'}
+
+        # Unchanged: only the HEAD is sent
+        seen.clear()
+        assert await update_catalog([ARCHIVE], path) == 0
+        assert seen == []
+
+        # Republished with one filing moved to the front
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as z:
+            z.writestr("2023_TEOS_XML_01A/202301349349300200_public.xml", XML_B + b" ", compress_type=zipfile.ZIP_STORED)
+        served.update(data=buf.getvalue(), etag='"v2"')
+        assert await update_catalog([ARCHIVE], path) == 1
+
+    catalog = ZipCatalog(path)
+    try:
+        assert len(catalog) == 1
+        assert catalog.lookup("202301349349300100") is None
+        assert catalog.lookup("202301349349300200")["file_size"] == len(XML_B) + 1
+    finally:
+        catalog.close()